@@ -0,0 +1,59 @@
+"""Compare the epoch-aligned keyed fixed window with KeyedFixedWindow.
+
+Run from the repository root with
+``python -m benchmarks.bench_aligned_fixed_window``.
+Reports the cost of a decision, the bytes held per key, and the time of the
+first decision after a window boundary, when every key expires.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import KeyedAlignedFixedWindow, KeyedFixedWindow
+
+KEYS = 200_000
+DECISIONS = 400_000
+
+
+def fill(store) -> float:
+    """Send DECISIONS requests over KEYS keys, return seconds per decision."""
+    start = time.perf_counter()
+    for i in range(DECISIONS):
+        store.allow_request(i % KEYS)
+    return (time.perf_counter() - start) / DECISIONS
+
+
+def run(name, factory):
+    gc.collect()
+    tracemalloc.start()
+    clock = ManualClock(1000.0)
+    store = factory(clock)
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(KEYS):
+        store.allow_request(i)
+    size = (tracemalloc.get_traced_memory()[0] - before) / KEYS
+    tracemalloc.stop()
+    clock = ManualClock(1000.0)
+    store = factory(clock)
+    cost = fill(store)
+    clock.advance(61)
+    start = time.perf_counter()
+    store.allow_request("first after the boundary")
+    boundary = time.perf_counter() - start
+    print(
+        f"{name:<26} {cost * 1e9:8.0f} ns/decision {size:6.0f} bytes/key"
+        f" {boundary * 1e3:8.3f} ms at the boundary"
+    )
+
+
+if __name__ == "__main__":
+    run(
+        "KeyedFixedWindow",
+        lambda clock: KeyedFixedWindow(10, 60, max_keys=KEYS, clock=clock),
+    )
+    run(
+        "KeyedAlignedFixedWindow",
+        lambda clock: KeyedAlignedFixedWindow(10, 60, max_keys=KEYS, clock=clock),
+    )
@@ -0,0 +1,54 @@
+"""Compare decision throughput with each clock.
+
+Run from the repository root with ``python -m benchmarks.bench_clock``.
+The coarse clock is ticked once per batch of 1,000 decisions, as a gateway
+would tick it once per event-loop iteration.
+"""
+
+import time
+
+from src.rate_limiting.clock import CoarseClock, ManualClock
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import SlidingWindowLog
+from src.rate_limiting.token_bucket import TokenBucket
+
+DECISIONS = 200_000
+BATCH = 1_000
+
+LIMITERS = {
+    "TokenBucket": lambda clock: TokenBucket(100, 10, clock=clock),
+    "FixedWindow": lambda clock: FixedWindow(100, 1, clock=clock),
+    "SlidingWindowLog": lambda clock: SlidingWindowLog(100, 1, clock=clock),
+    "SlidingWindowCounter": lambda clock: SlidingWindowCounter(100, 1, 10, clock=clock),
+    "KeyedTokenBucket": lambda clock: KeyedTokenBucket(100, 10, clock=clock),
+}
+
+
+def bench(factory, clock, tick) -> float:
+    """Return ns/decision, calling tick between batches."""
+    limiter = factory(clock)
+    allow = limiter.allow_request
+    args = ("key",) if isinstance(limiter, KeyedTokenBucket) else ()
+    start = time.perf_counter_ns()
+    for _ in range(DECISIONS // BATCH):
+        tick()
+        for _ in range(BATCH):
+            allow(*args)
+    return (time.perf_counter_ns() - start) / DECISIONS
+
+
+def main():
+    print(f"{'limiter':<22} {'monotonic':>10} {'coarse':>8} {'manual':>8}  ns/decision")
+    for name, factory in LIMITERS.items():
+        monotonic = bench(factory, time.monotonic, lambda: None)
+        coarse_clock = CoarseClock()
+        coarse = bench(factory, coarse_clock, coarse_clock.tick)
+        manual_clock = ManualClock()
+        manual = bench(factory, manual_clock, lambda: manual_clock.advance(0.01))
+        print(f"{name:<22} {monotonic:>10.0f} {coarse:>8.0f} {manual:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare decision throughput of a globally locked and a lock-striped store.
+
+Run from the repository root with ``python -m benchmarks.bench_contention``.
+On a build with the GIL, threads serialize on the interpreter anyway, so the
+numbers mostly show locking overhead; striping pays off on free-threaded
+builds where unrelated keys can be decided in parallel.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+from src.rate_limiting.synchronized import SynchronizedLimiter
+
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+REQUESTS_PER_THREAD = 20_000
+KEYS = 1_024
+
+
+def throughput(limiter, threads: int) -> float:
+    """Return decisions per second with threads deciding distinct keys."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset):
+        allow = limiter.allow_request
+        keys = [(offset * 31 + i) % KEYS for i in range(REQUESTS_PER_THREAD)]
+        barrier.wait()
+        for key in keys:
+            allow(key)
+
+    with ThreadPoolExecutor(threads) as pool:
+        futures = [pool.submit(worker, offset) for offset in range(threads)]
+        barrier.wait()
+        start = time.perf_counter()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    return threads * REQUESTS_PER_THREAD / elapsed
+
+
+def main():
+    print(f"{'threads':>8} {'global lock/s':>14} {'striped/s':>12}")
+    for threads in THREAD_COUNTS:
+        global_lock = throughput(
+            SynchronizedLimiter(KeyedTokenBucket(10, 5, max_keys=KEYS)), threads
+        )
+        striped = throughput(
+            KeyedTokenBucket(10, 5, max_keys=KEYS, thread_safe=True), threads
+        )
+        print(f"{threads:>8} {global_lock:>14.0f} {striped:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cost of attack traffic with and without the deny-until cache.
+
+Run from the repository root with ``python -m benchmarks.bench_deny_cache``.
+A few attacking keys send nine requests in ten, far over their limit, while
+10,000 clients stay under it. Every keyed algorithm is run with and without
+``deny_cache`` on the same traffic; the decisions must match, and the time
+per decision is reported for the attack traffic and for the clients.
+"""
+
+import random
+import time
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import (
+    KeyedFixedWindow,
+    KeyedGCRA,
+    KeyedLeakyBucket,
+    KeyedSlidingWindowCounter,
+    KeyedSlidingWindowLog,
+    KeyedTokenBucket,
+)
+
+REQUESTS = 300_000
+ATTACKERS = 10
+CLIENTS = 10_000
+STEP = 1e-4
+
+STORES = {
+    "KeyedTokenBucket": lambda **kw: KeyedTokenBucket(100, 10, **kw),
+    "KeyedGCRA": lambda **kw: KeyedGCRA(100, 10, **kw),
+    "KeyedFixedWindow": lambda **kw: KeyedFixedWindow(100, 10, **kw),
+    "KeyedSlidingWindowLog": lambda **kw: KeyedSlidingWindowLog(100, 10, **kw),
+    "KeyedSlidingWindowCounter": lambda **kw: KeyedSlidingWindowCounter(
+        100, 10, 10, weighted=True, **kw
+    ),
+    "KeyedLeakyBucket": lambda **kw: KeyedLeakyBucket(100, 10, **kw),
+}
+
+
+def traffic() -> list:
+    rng = random.Random(3)
+    return [
+        (
+            (True, f"attacker-{rng.randrange(ATTACKERS)}")
+            if rng.random() < 0.9
+            else (False, f"client-{rng.randrange(CLIENTS)}")
+        )
+        for _ in range(REQUESTS)
+    ]
+
+
+def run(factory, requests, deny_cache) -> tuple:
+    """Return the decisions and ns per attack and per client decision."""
+    clock = ManualClock(1000.0)
+    store = factory(clock=clock, deny_cache=deny_cache)
+    allow = store.allow_request
+    perf_counter = time.perf_counter
+    decisions = []
+    spent = [0.0, 0.0]
+    counts = [0, 0]
+    for attack, key in requests:
+        clock.advance(STEP)
+        start = perf_counter()
+        allowed = allow(key)
+        spent[attack] += perf_counter() - start
+        counts[attack] += 1
+        decisions.append(allowed)
+    return decisions, spent[1] / counts[1] * 1e9, spent[0] / counts[0] * 1e9
+
+
+if __name__ == "__main__":
+    requests = traffic()
+    print(f"{'':<26} {'attack ns':>10} {'cached':>8} {'client ns':>10} {'cached':>8}")
+    for name, factory in STORES.items():
+        plain, attack, client = run(factory, requests, False)
+        cached, cached_attack, cached_client = run(factory, requests, True)
+        assert plain == cached, f"{name} decides differently with the cache"
+        print(
+            f"{name:<26} {attack:10.0f} {cached_attack:8.0f}"
+            f" {client:10.0f} {cached_client:8.0f}"
+        )
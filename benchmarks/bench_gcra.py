@@ -0,0 +1,48 @@
+"""Compare GCRA with the token bucket in speed and memory per key.
+
+Run from the repository root with ``python -m benchmarks.bench_gcra``.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from src.rate_limiting.gcra import GCRA
+from src.rate_limiting.keyed_store import KeyedGCRA, KeyedTokenBucket
+from src.rate_limiting.token_bucket import TokenBucket
+
+DECISIONS = 200_000
+KEYS = 100_000
+
+
+def per_decision(allow, args) -> float:
+    start = time.perf_counter()
+    for arg in args:
+        allow(*arg)
+    return (time.perf_counter() - start) / len(args) * 1e9
+
+
+def bytes_per_key(factory) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = factory()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(KEYS):
+        store.allow_request(i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / KEYS
+
+
+if __name__ == "__main__":
+    plain = [()] * DECISIONS
+    keyed = [(i % KEYS,) for i in range(DECISIONS)]
+    print(f"{'':<18} {'ns/decision':>12} {'keyed ns':>9} {'bytes/key':>10}")
+    for name, single, store in [
+        ("TokenBucket", TokenBucket, KeyedTokenBucket),
+        ("GCRA", GCRA, KeyedGCRA),
+    ]:
+        single_ns = per_decision(single(DECISIONS // 2, 1_000).allow_request, plain)
+        keyed_ns = per_decision(store(10, 1, max_keys=KEYS).allow_request, keyed)
+        size = bytes_per_key(lambda: store(10, 1, max_keys=KEYS))
+        print(f"{name:<18} {single_ns:12.0f} {keyed_ns:9.0f} {size:10.0f}")
@@ -0,0 +1,75 @@
+"""Measure the overhead of metrics on rate limiting decisions.
+
+Run from the repository root with ``python -m benchmarks.bench_metrics``.
+Compares an uninstrumented limiter with the instrumentation options, and with
+an external wrapper that polls ``get_state()`` for the fill level.
+"""
+
+import time
+
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+from src.rate_limiting.metrics import Metrics
+from src.rate_limiting.token_bucket import TokenBucket
+
+DECISIONS = 200_000
+KEYS = [f"{'free' if i % 3 else 'paid'}:client-{i}" for i in range(1_000)]
+
+
+def per_decision(allow, args) -> float:
+    start = time.perf_counter()
+    for arg in args:
+        allow(*arg)
+    return (time.perf_counter() - start) / len(args) * 1e9
+
+
+def external_wrapper(limiter):
+    counts = {True: 0, False: 0}
+
+    def allow_request(*args):
+        allowed = limiter.allow_request(*args)
+        counts[allowed] += 1
+        limiter.get_state()
+        return allowed
+
+    return allow_request
+
+
+def run(name, factory, args, **options):
+    limiter = factory()
+    if options.pop("external", False):
+        allow = external_wrapper(limiter)
+    elif options.pop("off", False):
+        allow = limiter.allow_request
+    else:
+        Metrics().instrument(limiter, name, **options)
+        allow = limiter.allow_request
+    print(f"{name:<28} {per_decision(allow, args):8.0f} ns/decision")
+
+
+if __name__ == "__main__":
+    plain = [()] * DECISIONS
+    keyed = [(KEYS[i % len(KEYS)],) for i in range(DECISIONS)]
+
+    def bucket():
+        return TokenBucket(DECISIONS // 2, 1_000)
+
+    def store():
+        return KeyedTokenBucket(DECISIONS // 2, 1_000)
+
+    print("TokenBucket")
+    run("  off", bucket, plain, off=True)
+    run("  counters", bucket, plain)
+    run("  counters, latency 1/100", bucket, plain, sample_every=100)
+    run("  counters, latency always", bucket, plain, sample_every=1)
+    run("  external wrapper", bucket, plain, external=True)
+    print("KeyedTokenBucket, 1000 keys")
+    run("  off", store, keyed, off=True)
+    run("  counters", store, keyed)
+    run("  key groups", store, keyed, group=lambda key: key[:4])
+    run(
+        "  key groups, latency 1/100",
+        store,
+        keyed,
+        group=lambda key: key[:4],
+        sample_every=100,
+    )
@@ -0,0 +1,109 @@
+"""Throughput of the ASGI and WSGI middleware against a no-limit baseline.
+
+Run from the repository root with ``python -m benchmarks.bench_middleware``.
+An in-process client calls the application directly with a prepared scope or
+environ, so the numbers are the cost of the application and middleware alone,
+without a server or sockets. The keyed runs take the key from an API key
+header over 10,000 clients; "denied" sends every request over the limit.
+"""
+
+import asyncio
+import time
+
+from src.rate_limiting.gcra import GCRA
+from src.rate_limiting.keyed_store import KeyedGCRA
+from src.rate_limiting.middleware import ASGIMiddleware, WSGIMiddleware
+
+REQUESTS = 100_000
+CLIENTS = 10_000
+KEY = ["header:X-API-Key", "ip"]
+
+
+async def asgi_hello(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"Hello"})
+
+
+def wsgi_hello(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"Hello"]
+
+
+def asgi_requests() -> list:
+    return [
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/v1/items",
+            "headers": [
+                (b"host", b"example.com"),
+                (b"user-agent", b"bench"),
+                (b"accept", b"*/*"),
+                (b"x-api-key", f"client-{i % CLIENTS}".encode()),
+            ],
+            "client": ("10.0.0.1", 4321),
+        }
+        for i in range(REQUESTS)
+    ]
+
+
+def wsgi_requests() -> list:
+    return [
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": "/v1/items",
+            "REMOTE_ADDR": "10.0.0.1",
+            "HTTP_HOST": "example.com",
+            "HTTP_USER_AGENT": "bench",
+            "HTTP_ACCEPT": "*/*",
+            "HTTP_X_API_KEY": f"client-{i % CLIENTS}",
+        }
+        for i in range(REQUESTS)
+    ]
+
+
+def asgi_throughput(app, scopes) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def client():
+        start = time.perf_counter()
+        for scope in scopes:
+            await app(scope, receive, send)
+        return time.perf_counter() - start
+
+    return len(scopes) / asyncio.run(client())
+
+
+def wsgi_throughput(app, environs) -> float:
+    def start_response(status, headers):
+        pass
+
+    start = time.perf_counter()
+    for environ in environs:
+        app(environ, start_response)
+    return len(environs) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    unlimited = REQUESTS * 10
+    configurations = [
+        ("no limit", lambda app, m: app),
+        ("global GCRA", lambda app, m: m(app, GCRA(unlimited, unlimited))),
+        ("keyed GCRA", lambda app, m: m(app, KeyedGCRA(unlimited, 1), key=KEY)),
+        ("keyed GCRA, denied", lambda app, m: m(app, KeyedGCRA(1, 1e-6), key=KEY)),
+    ]
+    scopes, environs = asgi_requests(), wsgi_requests()
+    print(f"{'':<20} {'ASGI req/s':>12} {'WSGI req/s':>12}")
+    baseline = None
+    for name, wrap in configurations:
+        asgi = asgi_throughput(wrap(asgi_hello, ASGIMiddleware), scopes)
+        wsgi = wsgi_throughput(wrap(wsgi_hello, WSGIMiddleware), environs)
+        baseline = baseline or (asgi, wsgi)
+        print(
+            f"{name:<20} {asgi:12,.0f} {wsgi:12,.0f}"
+            f"   ({asgi / baseline[0]:.0%}, {wsgi / baseline[1]:.0%} of baseline)"
+        )
@@ -0,0 +1,70 @@
+"""Compare private per-process limiters with a limiter in shared memory.
+
+Run from the repository root with ``python -m benchmarks.bench_shared_store``.
+Each worker process decides requests for the same set of keys, like workers
+of a pre-fork server. Private limiters admit the limit once per worker, while
+the shared one admits it once in total, at the cost of a process-shared lock
+and a hash table probe per decision.
+"""
+
+import multiprocessing
+import time
+
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+from src.rate_limiting.shared_store import SharedTokenBucket
+
+WORKER_COUNTS = (1, 2, 4, 8)
+REQUESTS_PER_WORKER = 50_000
+KEYS = 1_000
+CAPACITY = 10
+
+
+def worker(limiter, start, results):
+    keys = [f"client-{i % KEYS}" for i in range(REQUESTS_PER_WORKER)]
+    allow = limiter.allow_request
+    start.wait()
+    began = time.perf_counter()
+    admitted = sum(allow(key) for key in keys)
+    results.put((admitted, time.perf_counter() - began))
+
+
+def run(context, make_limiter, workers: int) -> tuple:
+    """Return (admitted in total, decisions per second over all workers)."""
+    limiter = make_limiter()
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(limiter, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    if isinstance(limiter, SharedTokenBucket):
+        limiter.close()
+        limiter.unlink()
+    admitted = sum(a for a, _ in outcomes)
+    elapsed = max(e for _, e in outcomes)
+    return admitted, workers * REQUESTS_PER_WORKER / elapsed
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("fork")
+    # A rate slow enough that no tokens are refilled during the run
+    limiters = {
+        "private": lambda: KeyedTokenBucket(CAPACITY, 1e-6),
+        "shared": lambda: SharedTokenBucket(
+            CAPACITY, 1e-6, slots=4 * KEYS, context=context
+        ),
+    }
+    print(f"Limit: {CAPACITY * KEYS} requests in total")
+    for workers in WORKER_COUNTS:
+        for name, make_limiter in limiters.items():
+            admitted, rate = run(context, make_limiter, workers)
+            print(
+                f"{workers} workers, {name:<7}: admitted {admitted:>6}, "
+                f"{rate:>10,.0f} decisions/s"
+            )
@@ -0,0 +1,120 @@
+"""Accuracy versus memory of SketchSlidingWindow against the exact counter.
+
+Run from the repository root with ``python -m benchmarks.bench_sketch_window``
+and optionally the number of requests. The traffic mixes a heavy-tailed set
+of scrapers over the limit with a huge number of clients sending one request
+or two. Each sketch sees the same requests as an exact
+`KeyedSlidingWindowCounter`; a sketch denial the exact counter admits is a
+false denial. The requests a sketch admits are replayed through an exact
+counter to check that none exceeds the limit. Memory is what tracemalloc
+attributes to each limiter.
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import KeyedSlidingWindowCounter
+from src.rate_limiting.sketch_window import SketchSlidingWindow
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+CAPACITY = 20
+WINDOW = 60
+BUCKETS = 6
+EPSILONS = (0.01, 0.001, 0.0001)
+
+
+def traffic(requests: int) -> list:
+    """A third of the requests from 1,000 scrapers, the rest from anyone."""
+    rng = random.Random(42)
+    return [
+        (
+            f"scraper-{int(rng.paretovariate(1.0)) % 1_000}"
+            if rng.random() < 1 / 3
+            else f"client-{rng.randrange(16_777_216)}"
+        )
+        for _ in range(requests)
+    ]
+
+
+def decide(limiter, clock, keys, step) -> list:
+    decisions = []
+    for key in keys:
+        clock.advance(step)
+        decisions.append(limiter.allow_request(key))
+    return decisions
+
+
+def over_limit(keys, decisions, step) -> int:
+    """Count sketch admissions an exact counter denies, given the same ones."""
+    clock = ManualClock(1000.0)
+    exact = KeyedSlidingWindowCounter(
+        CAPACITY, WINDOW, BUCKETS, max_keys=len(keys), clock=clock
+    )
+    over = 0
+    for key, allowed in zip(keys, decisions):
+        clock.advance(step)
+        if allowed:
+            over += not exact.allow_request(key)
+    return over
+
+
+def run(factory, keys, step):
+    """Return the decisions, memory held and seconds per decision."""
+    gc.collect()
+    tracemalloc.start()
+    clock = ManualClock(1000.0)
+    limiter = factory(clock)
+    decisions = decide(limiter, clock, keys, step)
+    memory = tracemalloc.get_traced_memory()[0] - sys.getsizeof(decisions)
+    tracemalloc.stop()
+    del limiter
+    # Timed separately, tracemalloc slows down allocations
+    clock = ManualClock(1000.0)
+    limiter = factory(clock)
+    start = time.perf_counter()
+    decide(limiter, clock, keys, step)
+    return decisions, memory, (time.perf_counter() - start) / len(keys)
+
+
+if __name__ == "__main__":
+    keys = traffic(REQUESTS)
+    step = 2 * WINDOW / REQUESTS
+    print(f"{REQUESTS:,} requests from {len(set(keys)):,} keys over two windows")
+    exact, memory, cost = run(
+        lambda clock: KeyedSlidingWindowCounter(
+            CAPACITY, WINDOW, BUCKETS, max_keys=REQUESTS, clock=clock
+        ),
+        keys,
+        step,
+    )
+    admitted = sum(exact)
+    print(
+        f"{'exact':<22} {memory / 2**20:8.2f} MiB {cost * 1e9:7.0f} ns/request"
+        f" {admitted:>9,} admitted"
+    )
+    for epsilon in EPSILONS:
+        for heavy_hitters in (0, 1_000):
+            decisions, memory, cost = run(
+                lambda clock: SketchSlidingWindow(
+                    CAPACITY,
+                    WINDOW,
+                    BUCKETS,
+                    epsilon=epsilon,
+                    heavy_hitters=heavy_hitters,
+                    clock=clock,
+                ),
+                keys,
+                step,
+            )
+            false_denials = sum(e and not d for e, d in zip(exact, decisions))
+            over = over_limit(keys, decisions, step)
+            name = f"epsilon={epsilon}" + (" +hitters" if heavy_hitters else "")
+            print(
+                f"{name:<22} {memory / 2**20:8.2f} MiB {cost * 1e9:7.0f} ns/request"
+                f" {false_denials / admitted:9.3%} falsely denied,"
+                f" {over} over the limit"
+            )
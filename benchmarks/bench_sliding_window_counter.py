@@ -0,0 +1,34 @@
+"""Measure ns/decision of SlidingWindowCounter across bucket counts.
+
+Run from the repository root with
+``python -m benchmarks.bench_sliding_window_counter``.
+"""
+
+import time
+
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+
+BUCKET_COUNTS = (2, 10, 100, 1_000, 10_000)
+DECISIONS = 200_000
+
+
+def bench(bucket_count: int, weighted: bool) -> float:
+    """Return ns/decision for a limiter that admits about half its requests."""
+    limiter = SlidingWindowCounter(DECISIONS // 4, 1, bucket_count, weighted=weighted)
+    allow = limiter.allow_request
+    start = time.perf_counter_ns()
+    for _ in range(DECISIONS):
+        allow()
+    return (time.perf_counter_ns() - start) / DECISIONS
+
+
+def main():
+    print(f"{'buckets':>8} {'exact ns':>10} {'weighted ns':>12}")
+    for bucket_count in BUCKET_COUNTS:
+        exact = bench(bucket_count, weighted=False)
+        weighted = bench(bucket_count, weighted=True)
+        print(f"{bucket_count:>8} {exact:>10.0f} {weighted:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Measure bytes per full SlidingWindowLog for each log implementation.
+
+Run from the repository root with
+``python -m benchmarks.bench_sliding_window_log_memory``.
+"""
+
+import gc
+import tracemalloc
+
+from src.rate_limiting.sliding_window_log import (
+    CompactSlidingWindowLog,
+    SlidingWindowLog,
+)
+
+CAPACITIES = (10, 100, 1_000, 10_000)
+LIMITERS = 20
+
+
+def bytes_per_limiter(factory) -> float:
+    """Return the bytes held by one limiter whose window is full."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    limiters = [factory() for _ in range(LIMITERS)]
+    for limiter in limiters:
+        while limiter.allow_request():
+            pass
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / LIMITERS
+
+
+def main():
+    print(f"{'capacity':>9} {'deque':>10} {'ring':>10} {'approx/16':>10}")
+    for capacity in CAPACITIES:
+        deque_log = bytes_per_limiter(lambda: SlidingWindowLog(capacity, 60))
+        ring_log = bytes_per_limiter(lambda: CompactSlidingWindowLog(capacity, 60))
+        approx_log = bytes_per_limiter(
+            lambda: CompactSlidingWindowLog(capacity, 60, precision=16)
+        )
+        print(f"{capacity:>9} {deque_log:>10.0f} {ring_log:>10.0f} {approx_log:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Time snapshotting and restoring a keyed store with many keys.
+
+Run from the repository root with ``python -m benchmarks.bench_snapshot``.
+Restoring only maps the file, so it is compared with unpickling the records,
+which builds every record up front.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+
+KEYS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+LOOKUPS = 10_000
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    store = KeyedTokenBucket(10, 1, max_keys=KEYS)
+    for i in range(KEYS):
+        store.allow_request(f"client-{i}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.snap")
+        _, elapsed = timed(lambda: store.snapshot(path))
+        size = os.path.getsize(path)
+        print(f"snapshot of {KEYS:,} keys: {elapsed * 1e3:8.1f} ms, {size:,} bytes")
+
+        restored = KeyedTokenBucket(10, 1, max_keys=KEYS)
+        _, elapsed = timed(lambda: restored.restore(path))
+        print(f"restore:                {elapsed * 1e3:8.1f} ms")
+        keys = [f"client-{i * (KEYS // LOOKUPS)}" for i in range(LOOKUPS)]
+        _, elapsed = timed(lambda: [restored.allow_request(key) for key in keys])
+        print(f"first request per key:  {elapsed / LOOKUPS * 1e6:8.1f} us")
+        _, elapsed = timed(lambda: [restored.allow_request(key) for key in keys])
+        print(f"later requests per key: {elapsed / LOOKUPS * 1e6:8.1f} us")
+
+        records = dict(store._records)
+        data, elapsed = timed(lambda: pickle.dumps(records, protocol=5))
+        print(f"pickle dump:            {elapsed * 1e3:8.1f} ms, {len(data):,} bytes")
+        _, elapsed = timed(lambda: pickle.loads(data))
+        print(f"pickle load:            {elapsed * 1e3:8.1f} ms")
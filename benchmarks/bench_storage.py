@@ -0,0 +1,67 @@
+"""Compare per-request and batched decisions against a Redis-protocol server.
+
+Run from the repository root with ``python -m benchmarks.bench_storage``. By
+default an in-process stand-in server is started, whose Python execution
+dominates the cost of a command; pass ``--port`` to measure against a real
+Redis server, where round trips dominate and batching pays off more. As the
+stand-in shares the interpreter with the client, large pipelines also suffer
+from the two threads contending for the GIL.
+"""
+
+import argparse
+import statistics
+import time
+
+from src.rate_limiting.redis_stand_in import StandInRedisServer
+from src.rate_limiting.redis_storage import RedisStorage
+from src.rate_limiting.storage import MemoryStorage, StoredTokenBucket
+
+DECISIONS = 20_000
+KEYS = 1_000
+BATCH_SIZES = (1, 10, 100, 1_000)
+
+
+def measure(limiter, batch_size: int) -> tuple:
+    """Return (decisions per second, p50 and p99 call latency in microseconds)."""
+    keys = [f"client-{i % KEYS}" for i in range(DECISIONS)]
+    latencies = []
+    start = time.perf_counter()
+    for offset in range(0, DECISIONS, batch_size):
+        began = time.perf_counter()
+        if batch_size == 1:
+            limiter.allow_request(keys[offset])
+        else:
+            limiter.allow_batch(keys[offset : offset + batch_size])
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return DECISIONS / elapsed, quantiles[49] * 1e6, quantiles[98] * 1e6
+
+
+def report(name: str, storage) -> None:
+    limiter = StoredTokenBucket(100, 10, storage=storage)
+    limiter.allow_request("warm-up")
+    for batch_size in BATCH_SIZES:
+        rate, p50, p99 = measure(limiter, batch_size)
+        print(
+            f"{name:<10} batch {batch_size:>5}: {rate:>10,.0f} decisions/s, "
+            f"call p50 {p50:>9.1f} us, p99 {p99:>9.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, help="Port of a real Redis server.")
+    args = parser.parse_args()
+
+    report("memory", MemoryStorage())
+    if args.port is None:
+        with StandInRedisServer() as server:
+            storage = RedisStorage(*server.address)
+            report("stand-in", storage)
+            storage.close()
+    else:
+        storage = RedisStorage(args.host, args.port)
+        report("redis", storage)
+        storage.close()
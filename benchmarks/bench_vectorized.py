@@ -0,0 +1,53 @@
+"""Compare per-request and batch decisions for token buckets.
+
+Run from the repository root with ``python -m benchmarks.bench_vectorized``.
+Requires numpy.
+"""
+
+import random
+import time
+
+from src.rate_limiting.keyed_store import KeyedTokenBucket
+from src.rate_limiting.vectorized import TokenBucketArray
+
+KEYS = 100_000
+BATCH_SIZES = (64, 1_024, 8_192)
+ROUNDS = 50
+
+
+class StepClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'batch':>6} {'per-request ns':>15} {'batch ns':>10}")
+    for batch_size in BATCH_SIZES:
+        batches = [
+            [rng.randrange(KEYS) for _ in range(batch_size)] for _ in range(ROUNDS)
+        ]
+        clock = StepClock()
+        keyed = KeyedTokenBucket(5, 1, max_keys=KEYS, clock=clock)
+        start = time.perf_counter_ns()
+        for batch in batches:
+            clock.now += 0.01
+            for key in batch:
+                keyed.allow_request(key)
+        per_request = (time.perf_counter_ns() - start) / (batch_size * ROUNDS)
+
+        clock = StepClock()
+        vectorized = TokenBucketArray(KEYS, 5, 1, clock=clock)
+        start = time.perf_counter_ns()
+        for batch in batches:
+            clock.now += 0.01
+            vectorized.allow_batch(batch)
+        batched = (time.perf_counter_ns() - start) / (batch_size * ROUNDS)
+        print(f"{batch_size:>6} {per_request:>15.0f} {batched:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Adapt the rate of a limiter to the health of the service behind it.
+
+A static rate is either too low, wasting capacity, or too high, overloading
+the service once its capacity drops. `AIMDController` adjusts a rate from the
+outcomes of the requests a limiter let through, with the additive-increase,
+multiplicative-decrease (AIMD) rule of TCP congestion control: while the
+service keeps up, the rate grows by a constant step per interval; when a
+request fails or latency exceeds a target, the rate is cut by a factor. The
+rate thus probes for the capacity of the service and backs off quickly when
+it shrinks.
+
+`TokenBucket` and `LeakyBucket` take a controller as ``adaptive``. The leaky
+bucket measures its handler itself, the token bucket is told the outcomes
+through `TokenBucket.record_outcome`.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from src.rate_limiting.clock import Clock
+
+
+class AIMDController:
+    """Additive-increase, multiplicative-decrease of a rate.
+
+    A failure, or a smoothed latency above ``latency_target``, signals
+    congestion and multiplies the rate by ``decrease``, at most once per
+    ``interval`` seconds, so the many failures caused by one overload count
+    once. Otherwise the rate grows by ``increase`` at most once per
+    ``interval``, and only while outcomes arrive, so an idle limiter does not
+    drift up. The rate stays between ``min_rate`` and ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+        smoothing: float = 0.2,
+        interval: float = 1.0,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            min_rate: Lowest rate (requests per second).
+            max_rate: Highest rate (requests per second).
+            increase: Requests per second added per interval without
+                congestion.
+            decrease: Factor applied to the rate on congestion.
+            latency_target: Seconds of smoothed latency above which the
+                service counts as congested, None to react to failures only.
+            smoothing: Weight of the newest latency in the moving average.
+            interval: Minimum seconds between two changes in the same
+                direction, about the time a change takes to show in outcomes.
+            clock: Callable returning the current time in seconds.
+        """
+        if min_rate <= 0 or max_rate < min_rate:
+            raise ValueError("Rates must be positive with min_rate <= max_rate")
+        if increase <= 0 or not 0 < decrease < 1:
+            raise ValueError("increase must be positive and decrease in (0, 1)")
+        if not 0 < smoothing <= 1 or interval <= 0:
+            raise ValueError("smoothing must be in (0, 1] and interval positive")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._increase = increase
+        self._decrease = decrease
+        self._latency_target = latency_target
+        self._smoothing = smoothing
+        self._interval = interval
+        self._clock = time.monotonic if clock is None else clock
+        self._lock = threading.Lock()
+        self.rate = max_rate
+        self._latency = None
+        self._last_increase = self._last_decrease = float("-inf")
+
+    def reset(self, rate: float) -> float:
+        """Start adapting from rate, clamped to the bounds, and return it."""
+        with self._lock:
+            self.rate = min(max(rate, self.min_rate), self.max_rate)
+            self._latency = None
+            self._last_increase = self._clock()
+            self._last_decrease = float("-inf")
+            return self.rate
+
+    def record(self, latency: float, failed: bool = False) -> float:
+        """
+        Adjust the rate to the outcome of one request.
+
+        Args:
+            latency: Seconds the request took.
+            failed: Whether the request failed, e.g. timed out or was
+                rejected by the overloaded service.
+
+        Returns:
+            float: The new rate.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += self._smoothing * (latency - self._latency)
+            target = self._latency_target
+            if failed or (target is not None and self._latency > target):
+                if now - self._last_decrease >= self._interval:
+                    self.rate = max(self.rate * self._decrease, self.min_rate)
+                    self._last_decrease = self._last_increase = now
+            elif now - self._last_increase >= self._interval:
+                self.rate = min(self.rate + self._increase, self.max_rate)
+                self._last_increase = now
+            return self.rate
+
+    def get_state(self) -> dict:
+        """Returns the current rate and smoothed latency."""
+        return {"rate": self.rate, "latency": self._latency}
+
+
+if __name__ == "__main__":
+    from src.rate_limiting.clock import ManualClock
+
+    clock = ManualClock()
+    controller = AIMDController(1, 100, increase=5, interval=0.5, clock=clock)
+    controller.reset(10)
+    for second in range(20):
+        capacity = 40 if second < 10 else 15
+        for _ in range(10):
+            clock.advance(0.1)
+            controller.record(0.01, failed=controller.rate > capacity)
+        print(f"t={second + 1:>2}s capacity={capacity} rate={controller.rate:.1f}")
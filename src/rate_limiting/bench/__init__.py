@@ -0,0 +1,7 @@
+"""Benchmark suite for the rate limiting algorithms.
+
+Run ``python -m src.rate_limiting.bench --help`` from the repository root.
+The suite measures every algorithm under the same workloads and emits JSON
+that can be compared between runs; one-off comparisons of specific features
+live in the top-level ``benchmarks`` directory.
+"""
@@ -0,0 +1,40 @@
+"""Command line entry point of the benchmark suite."""
+
+import argparse
+import json
+import sys
+
+from src.rate_limiting.bench.suite import ALGORITHMS, WORKLOADS, compare, run_suite
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.rate_limiting.bench",
+        description="Measure ns/decision, allocations and memory per limiter.",
+    )
+    parser.add_argument("--decisions", type=int, default=100_000)
+    parser.add_argument("--algorithm", action="append", choices=list(ALGORITHMS))
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS))
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument(
+        "--compare", metavar="BASELINE", help="JSON report of a previous run."
+    )
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.decisions, args.algorithm, args.workload)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for line in compare(baseline, report):
+            print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Algorithms, workloads and measurements of the benchmark suite.
+
+Every algorithm is configured for the same limit of ``CAPACITY`` requests per
+``WINDOW`` seconds and driven by a `ManualClock`, so workloads are
+deterministic and run without sleeping.
+"""
+
+import gc
+import platform
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.leaky_bucket import LeakyBucket
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import SlidingWindowLog
+from src.rate_limiting.token_bucket import TokenBucket
+
+CAPACITY = 100
+WINDOW = 1
+RATE = CAPACITY / WINDOW
+BATCH = 100
+
+
+class _ManualOutflow:
+    """Stands in for a `LeakyBucketScheduler`, the suite drains buckets itself."""
+
+    def notify(self, bucket) -> None:
+        pass
+
+
+def _discard(request) -> None:
+    pass
+
+
+def _leaky_bucket(clock):
+    bucket = LeakyBucket(CAPACITY, CAPACITY, _discard, scheduler=_ManualOutflow())
+    return bucket, partial(bucket.allow_request, "request")
+
+
+def _drain_leaky_bucket(bucket, seconds: float) -> None:
+    """Remove the requests the bucket would have emitted in seconds."""
+    for _ in range(min(round(seconds * bucket.outflow_rate), bucket.queue.qsize())):
+        bucket.queue.get_nowait()
+
+
+def _plain(limiter_type, *args):
+    def factory(clock):
+        limiter = limiter_type(*args, clock=clock)
+        return limiter, limiter.allow_request
+
+    return factory
+
+
+# name -> (factory returning (limiter, zero-argument decide), settle or None)
+ALGORITHMS = {
+    "token_bucket": (_plain(TokenBucket, CAPACITY, CAPACITY), None),
+    "fixed_window": (_plain(FixedWindow, CAPACITY, WINDOW), None),
+    "sliding_window_log": (_plain(SlidingWindowLog, CAPACITY, WINDOW), None),
+    "sliding_window_counter": (
+        _plain(SlidingWindowCounter, CAPACITY, WINDOW, 10),
+        None,
+    ),
+    "leaky_bucket": (_leaky_bucket, _drain_leaky_bucket),
+}
+
+
+def admit_heavy(decisions: int) -> list:
+    """Requests arrive at half the limit, so nearly all are admitted."""
+    return [2 / RATE] * decisions
+
+
+def deny_heavy(decisions: int) -> list:
+    """Requests arrive at ten times the limit, so most are denied."""
+    return [1 / (10 * RATE)] * decisions
+
+
+def bursty(decisions: int) -> list:
+    """Bursts of twice the capacity at once, separated by two idle windows."""
+    burst = [2 * WINDOW] + [0.0] * (2 * CAPACITY - 1)
+    return (burst * (decisions // len(burst) + 1))[:decisions]
+
+
+WORKLOADS = {
+    "admit_heavy": admit_heavy,
+    "deny_heavy": deny_heavy,
+    "bursty": bursty,
+}
+
+
+def _timed_run(decide, settle, limiter, gaps, clock) -> tuple:
+    """Run the decisions in batches, returning (elapsed ns, admitted)."""
+    advance = clock.advance
+    elapsed = 0
+    admitted = 0
+    for start in range(0, len(gaps), BATCH):
+        batch = gaps[start : start + BATCH]
+        began = time.perf_counter_ns()
+        for gap in batch:
+            advance(gap)
+            admitted += decide()
+        elapsed += time.perf_counter_ns() - began
+        if settle is not None:
+            settle(limiter, sum(batch))
+    return elapsed, admitted
+
+
+def measure_speed(factory, settle, gaps) -> dict:
+    """Time decisions, subtracting the cost of the same loop without a limiter."""
+    clock = ManualClock()
+    limiter, decide = factory(clock)
+    elapsed, admitted = _timed_run(decide, settle, limiter, gaps, clock)
+    baseline, _ = _timed_run(int, None, None, gaps, ManualClock())
+    return {
+        "ns_per_decision": max(elapsed - baseline, 0) / len(gaps),
+        "admit_ratio": admitted / len(gaps),
+    }
+
+
+def measure_allocations(factory, gaps, samples: int = 2_000) -> dict:
+    """Measure memory allocated while deciding, with tracemalloc.
+
+    ``peak_bytes_per_decision`` is the most memory a decision holds at once,
+    including temporaries freed before it returns; ``retained_bytes_per_decision``
+    is the growth of the limiter's state that outlives the decision.
+    """
+    clock = ManualClock()
+    limiter, decide = factory(clock)
+    gaps = gaps[:samples]
+    gc.collect()
+    tracemalloc.start()
+    peak_total = 0
+    before = tracemalloc.get_traced_memory()[0]
+    for gap in gaps:
+        clock.advance(gap)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        decide()
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {
+        "peak_bytes_per_decision": peak_total / len(gaps),
+        "retained_bytes_per_decision": retained / len(gaps),
+    }
+
+
+def measure_resident(factory, gaps, limiters: int = 20, prefix: int = 500) -> dict:
+    """Bytes held per limiter and its clock after running a workload prefix."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for _ in range(limiters):
+        clock = ManualClock()
+        limiter, decide = factory(clock)
+        for gap in gaps[:prefix]:
+            clock.advance(gap)
+            decide()
+        kept.append(limiter)
+    resident = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {"resident_bytes": resident / limiters}
+
+
+def run_suite(decisions: int, algorithms=None, workloads=None) -> dict:
+    """Run every selected algorithm under every selected workload.
+
+    Returns:
+        dict: JSON-serializable report with a ``results`` entry per pair.
+    """
+    results = []
+    for algorithm in algorithms or ALGORITHMS:
+        factory, settle = ALGORITHMS[algorithm]
+        for workload in workloads or WORKLOADS:
+            gaps = WORKLOADS[workload](decisions)
+            result = {"algorithm": algorithm, "workload": workload}
+            result.update(measure_speed(factory, settle, gaps))
+            result.update(measure_allocations(factory, gaps))
+            result.update(measure_resident(factory, gaps))
+            results.append(result)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "decisions": decisions,
+            "capacity": CAPACITY,
+            "window": WINDOW,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, report: dict, threshold: float = 0.1) -> list:
+    """Compare ns/decision of two reports.
+
+    Returns:
+        list: One line per algorithm and workload present in both reports,
+            flagging slowdowns larger than threshold.
+    """
+    previous = {(r["algorithm"], r["workload"]): r for r in baseline["results"]}
+    lines = []
+    for result in report["results"]:
+        old = previous.get((result["algorithm"], result["workload"]))
+        if old is None or not old["ns_per_decision"]:
+            continue
+        ratio = result["ns_per_decision"] / old["ns_per_decision"]
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        lines.append(
+            f"{result['algorithm']:<24} {result['workload']:<12} "
+            f"{old['ns_per_decision']:>8.0f} -> {result['ns_per_decision']:>8.0f} ns "
+            f"({ratio:.2f}x){flag}"
+        )
+    return lines
@@ -0,0 +1,81 @@
+"""Clocks that rate limiters read the current time from.
+
+A clock is any callable taking no arguments and returning the current time in
+seconds as a float. Limiters default to `time.monotonic`.
+"""
+
+import operator
+import threading
+import time
+from functools import partial
+from typing import Callable
+
+Clock = Callable[[], float]
+
+
+class CoarseClock(partial):
+    """Clock returning a cached time that is refreshed explicitly.
+
+    Call `tick` once per event-loop iteration or per batch of requests, or
+    `start` a background thread ticking at a fixed interval, and every
+    decision in between reads the cached value instead of asking the operating
+    system for the time. Readings are at most one tick interval stale.
+
+    The clock is a `functools.partial` around a list lookup, so reading it is
+    a single C-level call without a Python frame.
+    """
+
+    def __new__(cls, source: Clock = time.monotonic):
+        """
+        Args:
+            source: Clock that `tick` reads the time from.
+        """
+        cell = [source()]
+        self = super().__new__(cls, operator.getitem, cell, 0)
+        self._cell = cell
+        self._source = source
+        self._thread = None
+        self._stopped = threading.Event()
+        return self
+
+    def tick(self) -> float:
+        """Refresh the cached time from the source clock and return it."""
+        now = self._source()
+        self._cell[0] = now
+        return now
+
+    def start(self, interval: float = 0.001) -> "CoarseClock":
+        """Tick every interval seconds on a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            self.tick()
+
+    def stop(self) -> None:
+        """Stop the ticking thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class ManualClock:
+    """Clock that only moves when told to, for deterministic tests."""
+
+    def __init__(self, now: float = 0.0):
+        self._now = now
+
+    def __call__(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> float:
+        """Move the clock forward by seconds and return the new time."""
+        self._now += seconds
+        return self._now
+
+    def set(self, now: float) -> None:
+        self._now = now
@@ -0,0 +1,157 @@
+"""Enforce several limits on the same requests in one call.
+
+Admitting a request under per-user, per-tenant and global limits by calling
+each limiter in turn debits the earlier limits even when a later one denies,
+so their tokens leak. A `CompositeLimiter` admits a request against each
+limit in turn and, on a denial, refunds the limits that already admitted it
+before the lock is released, so a request is either counted by every limit
+or by none.
+
+Limits are tried in order and the first denial ends the pass. With
+``reorder``, a limit that denies moves one place forward each time, so the
+limits that deny most settle at the front and denials touch fewer limits.
+List cheap limits, such as token buckets, before expensive ones, such as
+exact sliding window logs.
+"""
+
+import math
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
+
+
+class CompositeDecision(NamedTuple):
+    """Outcome of `CompositeLimiter.check`."""
+
+    allowed: bool
+    denied_by: Optional[str]
+    retry_after: float
+
+
+class CompositeLimiter(AcquireMixin, RateLimiter):
+    """Admit a request only if every one of several limiters admits it.
+
+    The limiters must support refunds and wait times: `TokenBucket`,
+    `FixedWindow`, `SlidingWindowLog` and `SlidingWindowCounter` do. A limiter
+    shared by several composites, e.g. a global limit combined with per-user
+    limits, must only be used through composites sharing the same ``lock``.
+    """
+
+    def __init__(
+        self,
+        limiters: Dict[str, RateLimiter],
+        reorder: bool = True,
+        lock: Optional[threading.Lock] = None,
+    ):
+        """
+        Args:
+            limiters: Limits to enforce by name, in the order to try them.
+            reorder: Move a limit one place forward whenever it denies.
+            lock: Lock serializing the decisions, shared by all composites
+                using a common limiter. A new lock if None.
+        """
+        if not limiters:
+            raise ValueError("At least one limiter is required")
+        for name, limiter in limiters.items():
+            if (
+                type(limiter)._refund is RateLimiter._refund
+                or type(limiter)._wait_time is RateLimiter._wait_time
+            ):
+                raise ValueError(
+                    f"Limiter {name} ({type(limiter).__name__}) does not support "
+                    "refunds"
+                )
+        super().__init__()
+        self._limiters = list(limiters.items())
+        self._reorder = reorder
+        self._lock = threading.Lock() if lock is None else lock
+
+    def _admit(self, cost: int) -> Optional[str]:
+        """Admit the request against every limit, return the denying one's name.
+
+        Called with the lock held.
+        """
+        limiters = self._limiters
+        for i, (name, limiter) in enumerate(limiters):
+            if not limiter.allow_request(cost):
+                for _, admitted in reversed(limiters[:i]):
+                    admitted._refund(cost)
+                if self._reorder and i:
+                    limiters[i - 1], limiters[i] = limiters[i], limiters[i - 1]
+                return name
+        return None
+
+    def allow_request(self, cost: int = 1) -> bool:
+        """
+        Check if the request is allowed by every limit.
+
+        Args:
+            cost: Number of requests this request counts as.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        with self._lock:
+            return self._admit(cost) is None
+
+    def check(self, cost: int = 1) -> CompositeDecision:
+        """
+        Admit the request like `allow_request`, explaining a denial.
+
+        Args:
+            cost: Number of requests this request counts as.
+
+        Returns:
+            CompositeDecision: Whether the request is allowed, the name of the
+                limit that denied it and the seconds until every limit can
+                admit it, infinite if cost exceeds the capacity of a limit.
+        """
+        with self._lock:
+            denied_by = self._admit(cost)
+            if denied_by is None:
+                return CompositeDecision(True, None, 0.0)
+            return CompositeDecision(False, denied_by, self._longest_wait(cost))
+
+    def _longest_wait(self, cost: int) -> float:
+        try:
+            return max(limiter._wait_time(cost) for _, limiter in self._limiters)
+        except ValueError:
+            return math.inf
+
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until every limit can admit the request."""
+        with self._lock:
+            wait = self._longest_wait(cost)
+        if wait == math.inf:
+            raise ValueError(f"Cost {cost} exceeds the capacity of a limit")
+        return wait
+
+    def _refund(self, cost: int = 1) -> None:
+        for _, limiter in self._limiters:
+            limiter._refund(cost)
+
+    def get_state(self) -> dict:
+        """Returns the state of every limit, in the order they are tried."""
+        with self._lock:
+            return {name: limiter.get_state() for name, limiter in self._limiters}
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the rate limit of every limit, in the order they are tried."""
+        return tuple(limiter.get_rate_limit() for _, limiter in self._limiters)
+
+
+if __name__ == "__main__":
+    from src.rate_limiting.sliding_window_log import SlidingWindowLog
+    from src.rate_limiting.token_bucket import TokenBucket
+
+    shared = threading.Lock()
+    global_limit = TokenBucket(capacity=5, rate=1)
+    users = {
+        user: CompositeLimiter(
+            {"user": SlidingWindowLog(3, 1), "global": global_limit}, lock=shared
+        )
+        for user in ("client-a", "client-b")
+    }
+    for user in ["client-a"] * 4 + ["client-b"] * 3:
+        print(user, users[user].check())
@@ -1,31 +1,80 @@
 import time
-from src.rate_limiting.rate_limit_abc import RateLimiter
+from typing import Optional
 
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
 
-class FixedWindow(RateLimiter):
-    def __init__(self, capacity: int, window_size: int):
+
+class FixedWindow(AcquireMixin, RateLimiter):
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        clock: Optional[Clock] = None,
+        aligned: bool = False,
+    ):
+        """
+        Args:
+            capacity: Maximum number of requests allowed in a window.
+            window_size: Size of the window in seconds.
+            clock: Callable returning the current time in seconds.
+            aligned: Align windows to multiples of window_size since the
+                clock's epoch, so that limiters sharing a clock switch windows
+                together, instead of starting a window at the first request
+                after the previous one ended.
+        """
         if capacity <= 0 or window_size <= 0:
             raise ValueError("Capacity and window_size must be positive integers")
+        super().__init__(clock)
         self._capacity = capacity
         self._window_size = window_size
-        self._window_start_time = time.monotonic()
+        self._aligned = aligned
+        now = self._clock()
+        self._window_start_time = now // window_size * window_size if aligned else now
         self._counter = 0
 
-    def allow_request(self) -> bool:
+    def allow_request(self, cost: int = 1) -> bool:
         """
         Check if request can be allowed.
 
+        Args:
+            cost: Number of requests this request counts as.
+
         Returns:
             bool: True if request should be allowed else False.
         """
-        if time.monotonic() - self._window_start_time > self._window_size:
-            self._window_start_time = time.time()
+        now = self._clock()
+        if self._aligned:
+            start = now // self._window_size * self._window_size
+            if start != self._window_start_time:
+                self._window_start_time = start
+                self._counter = 0
+        elif now - self._window_start_time > self._window_size:
+            self._window_start_time = now
             self._counter = 0
-        if self._counter >= self._capacity:
+        if self._counter + cost > self._capacity:
             return False
-        self._counter += 1
+        self._counter += cost
         return True
 
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until the request fits, at the latest when the window ends."""
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        elapsed = self._clock() - self._window_start_time
+        if self._aligned and elapsed >= self._window_size:
+            return 0.0
+        if elapsed > self._window_size or self._counter + cost <= self._capacity:
+            return 0.0
+        return self._window_size - elapsed
+
+    def _refund(self, cost: int = 1) -> None:
+        self._counter -= cost
+
+    def _fill_level(self) -> int:
+        """Requests counted in the current window."""
+        return self._counter
+
     def get_state(self) -> dict:
         """Returns the state of the rate limiter."""
         return {
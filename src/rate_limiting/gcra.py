@@ -0,0 +1,109 @@
+"""Implements the Generic Cell Rate Algorithm (GCRA).
+
+GCRA admits the same traffic as a token bucket of ``capacity`` tokens refilled
+at ``rate`` tokens per second, but keeps a single number: the theoretical
+arrival time (TAT), the time at which the bucket would be full again. Each
+admitted request of cost n pushes the TAT ``n / rate`` seconds further, and a
+request is admitted if the pushed TAT lies at most ``capacity / rate``
+seconds ahead of now.
+
+Tokens are never rounded, so fractional refills are not lost, and the time
+until a denied request fits falls out of the same subtraction.
+"""
+
+import math
+import time
+from typing import Optional
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
+
+# Seconds of tolerance when comparing a TAT with the limit, so that rounding
+# in repeated additions of 1 / rate does not deny the last request of a burst
+_SLACK = 1e-9
+
+
+class GCRA(AcquireMixin, RateLimiter):
+    def __init__(self, capacity: int, rate: float, clock: Optional[Clock] = None):
+        """
+
+        Args:
+            capacity: Maximum burst, like the capacity of a token bucket.
+            rate: Sustained rate (requests per second).
+            clock: Callable returning the current time in seconds.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive")
+        super().__init__(clock)
+        self._capacity = capacity
+        self._rate = rate
+        self._interval = 1 / rate
+        self._tolerance = capacity / rate + _SLACK
+        self._tat = self._clock()
+
+    def allow_request(self, cost: int = 1) -> bool:
+        """Check if request can be allowed.
+
+        Args:
+            cost: Number of requests this request counts as.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        now = self._clock()
+        tat = self._tat
+        if tat < now:
+            tat = now
+        tat += cost * self._interval
+        if tat - now > self._tolerance:
+            return False
+        self._tat = tat
+        return True
+
+    def retry_after(self, cost: int = 1) -> float:
+        """Seconds until a request of the given cost would be allowed.
+
+        Returns:
+            float: 0 if the request would be allowed now, infinite if its cost
+                exceeds the capacity and it never will be.
+        """
+        if cost * self._interval > self._tolerance:
+            return math.inf
+        now = self._clock()
+        tat = max(self._tat, now) + cost * self._interval
+        return max(tat - now - self._tolerance, 0.0)
+
+    def _wait_time(self, cost: int = 1) -> float:
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        return self.retry_after(cost)
+
+    def _refund(self, cost: int = 1) -> None:
+        self._tat -= cost * self._interval
+
+    def _fill_level(self) -> float:
+        """Tokens a token bucket with the same limit would hold."""
+        backlog = max(self._tat - self._clock(), 0.0)
+        return self._capacity - backlog * self._rate
+
+    def get_state(self) -> dict:
+        """Returns state of the rate limiter."""
+        return {
+            "capacity": self._capacity,
+            "rate": self._rate,
+            "tat": self._tat,
+        }
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum burst size."""
+        return self._capacity, 1
+
+
+if __name__ == "__main__":
+    rl = GCRA(5, 2)  # Bursts of up to 5 requests, 2 requests/sec sustained
+    for i in range(20):
+        if rl.allow_request():
+            print(f"Packet {i} forwarded")
+        else:
+            print(f"Packet {i} dropped, retry after {rl.retry_after():.2f}s")
+        time.sleep(0.2)
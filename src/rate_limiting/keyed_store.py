@@ -0,0 +1,1076 @@
+"""Keyed rate limiters holding one compact state record per key.
+
+Each algorithm in this package guards a single stream. The stores in this
+module keep one small ``__slots__`` record per key instead of one limiter
+object, create it lazily on the first request for a key and evict records in
+least-recently-used order once they are idle or when ``max_keys`` is reached.
+"""
+
+import itertools
+import json
+import math
+import operator
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Hashable, Optional
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.gcra import _SLACK as _GCRA_SLACK
+from src.rate_limiting.rate_limit_abc import Decision, RateLimiter
+from src.rate_limiting.snapshot import Snapshot, write_snapshot
+from src.rate_limiting.sliding_window_counter import _CounterRing, _ring_wait
+from src.rate_limiting.sliding_window_log import (
+    _BucketedTimestampRing,
+    _TimestampRing,
+)
+
+
+class _TokenBucketRecord:
+    __slots__ = ("last", "tokens")
+
+    def __init__(self, last: float, tokens: float):
+        self.last = last
+        self.tokens = tokens
+
+
+class _FixedWindowRecord:
+    __slots__ = ("last", "window_start", "counter")
+
+    def __init__(self, last: float, window_start: float, counter: int):
+        self.last = last
+        self.window_start = window_start
+        self.counter = counter
+
+
+class _SlidingWindowLogRecord(_TimestampRing):
+    __slots__ = ("last",)
+
+    def __init__(self, last: float, capacity: int):
+        super().__init__(capacity)
+        self.last = last
+
+
+class _BucketedSlidingWindowLogRecord(_BucketedTimestampRing):
+    __slots__ = ("last",)
+
+    def __init__(self, last: float, precision: int, window_size: float):
+        super().__init__(precision, window_size)
+        self.last = last
+
+
+class _SlidingWindowCounterRecord(_CounterRing):
+    __slots__ = ("last",)
+
+    def __init__(self, last: float, size: int, head: int):
+        super().__init__(size)
+        self.last = last
+        self.head = head
+
+
+class _GCRARecord:
+    __slots__ = ("tat",)
+
+    def __init__(self, tat: float):
+        self.tat = tat
+
+    @property
+    def last(self) -> float:
+        """The record is idle once its TAT has passed."""
+        return self.tat
+
+
+class _LeakyBucketRecord:
+    __slots__ = ("last", "level")
+
+    def __init__(self, last: float, level: float):
+        self.last = last
+        self.level = level
+
+
+class KeyedStore(RateLimiter):
+    """Base class for keyed limiters with bounded memory.
+
+    Records live in an ``OrderedDict`` kept in access order, so the least
+    recently used key is always at the front. A record untouched for ``ttl``
+    seconds is evicted when room is needed for a new key; if none is idle the
+    least recently used key is evicted to keep at most ``max_keys`` records.
+
+    With ``thread_safe`` set, keys are spread by hash over ``stripes`` shards,
+    each holding its own records and lock, so requests for unrelated keys
+    rarely contend. ``max_keys`` is then split evenly between the shards.
+
+    With ``deny_cache`` set, a denied key is remembered with the time its
+    next request can be admitted, and its requests until then are denied by
+    comparing that time with the clock; its record only moves to the most
+    recently used end, as on any decision, so eviction is unchanged. None of
+    the algorithms count denied requests, so the decisions are the same, but
+    a key under attack costs a dict lookup per request instead of a refill or
+    a window cleanup. At most ``max_keys`` denied keys are remembered; beyond
+    that the earliest denied key is forgotten and decided normally again.
+
+    Subclasses define ``_idle_horizon`` (seconds after which an untouched
+    record is equivalent to a fresh one), ``_new_record``, ``_decide``, which
+    applies the algorithm to the record of one key, and ``_record_wait``,
+    which tells how long until it admits a request again. Both take the cost
+    of the request as an optional last argument, defaulting to 1, so every
+    store accepts ``allow_request(key, cost)``. For `snapshot` and
+    `restore` they also define ``_config`` and ``_snapshot_fields``.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        ttl: Optional[float] = None,
+        clock: Optional[Clock] = None,
+        thread_safe: bool = False,
+        stripes: int = 16,
+        deny_cache: bool = False,
+    ):
+        """
+        Args:
+            max_keys: Maximum number of keys to hold state for.
+            ttl: Seconds after which an untouched key may be evicted. Defaults
+                to the algorithm's idle horizon, where eviction is lossless.
+            clock: Callable returning the current time in seconds.
+            thread_safe: Guard records with striped locks for concurrent use.
+            stripes: Number of lock stripes when ``thread_safe`` is set.
+            deny_cache: Deny the requests of a denied key with one comparison
+                until it can be admitted again.
+        """
+        if max_keys <= 0:
+            raise ValueError("max_keys must be a positive integer")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if stripes <= 0:
+            raise ValueError("stripes must be a positive integer")
+        super().__init__(clock)
+        shard_count = stripes if thread_safe else 1
+        self._max_keys = max_keys
+        self._shard_max_keys = -(-max_keys // shard_count)
+        self._ttl = self._idle_horizon() if ttl is None else ttl
+        self._shards = [OrderedDict() for _ in range(shard_count)]
+        self._records = self._shards[0]
+        self._locks = (
+            [threading.Lock() for _ in range(shard_count)] if thread_safe else None
+        )
+        self._denials = [{} for _ in range(shard_count)] if deny_cache else None
+        self._snapshot = None
+        self._snapshot_offset = 0.0
+        self._snapshot_lock = threading.Lock()
+        self._restored = None
+        self._unrestored = 0
+
+    def _idle_horizon(self) -> float:
+        raise NotImplementedError
+
+    def _new_record(self, now: float):
+        raise NotImplementedError
+
+    def _decide(self, record, now: float, *args) -> bool:
+        raise NotImplementedError
+
+    def _record_wait(self, record, now: float, *args) -> float:
+        """Seconds until record admits a request, infinite if it never can."""
+        raise NotImplementedError
+
+    def allow_request(self, key: Hashable, *args) -> bool:
+        """
+        Check if request for key can be allowed.
+
+        Args:
+            key: Key identifying the stream, e.g. an API key or client IP.
+            *args: Passed on to the algorithm, i.e. the cost of the request.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        if self._locks is None:
+            now = self._clock()
+            if self._denials is not None:
+                return self._decide_denying(0, key, now, args)
+            return self._decide(self._lookup(self._records, key, now), now, *args)
+        stripe = hash(key) % len(self._shards)
+        with self._locks[stripe]:
+            now = self._clock()
+            if self._denials is not None:
+                return self._decide_denying(stripe, key, now, args)
+            record = self._lookup(self._shards[stripe], key, now)
+            return self._decide(record, now, *args)
+
+    def _decide_denying(self, stripe: int, key: Hashable, now: float, args) -> bool:
+        """Decide a request through the deny-until cache."""
+        if self._cached_denial(stripe, key, now) is not None:
+            return False
+        record = self._lookup(self._shards[stripe], key, now)
+        if self._decide(record, now, *args):
+            return True
+        self._deny(self._denials[stripe], key, now + self._record_wait(record, now))
+        return False
+
+    def _cached_denial(self, stripe: int, key: Hashable, now: float):
+        """Time until which key is denied by the cache, None to decide it.
+
+        A cached denial moves the key's record to the most recently used end,
+        like a decision, so that ``max_keys`` evicts the same keys as without
+        the cache. A key whose record was evicted is decided afresh.
+        """
+        denials = self._denials[stripe]
+        until = denials.get(key)
+        if until is None:
+            return None
+        records = self._shards[stripe]
+        if now >= until or key not in records:
+            del denials[key]
+            return None
+        records.move_to_end(key)
+        return until
+
+    def _deny(self, denials: dict, key: Hashable, until: float) -> None:
+        """Remember that key is denied until the given time."""
+        if len(denials) >= self._shard_max_keys:
+            del denials[next(iter(denials))]
+        denials[key] = until
+
+    def check(self, key: Hashable, *args) -> Decision:
+        """
+        Decide a request for key like `allow_request`, also telling when to
+        retry.
+
+        Args:
+            key: Key identifying the stream, e.g. an API key or client IP.
+            *args: Passed on to the algorithm, i.e. the cost of the request.
+
+        Returns:
+            Decision: Whether the request is allowed and, if it is denied, the
+                seconds until a request like it can be admitted, infinite if
+                it never can.
+        """
+        stripe = self._shard_of(key)
+        with self._shard_lock(stripe):
+            now = self._clock()
+            denials = None if self._denials is None else self._denials[stripe]
+            if denials is not None and not args:
+                until = self._cached_denial(stripe, key, now)
+                if until is not None:
+                    return Decision(False, until - now)
+            record = self._lookup(self._shards[stripe], key, now)
+            if self._decide(record, now, *args):
+                return Decision(True, 0.0)
+            wait = self._record_wait(record, now, *args)
+            if denials is not None:
+                # Cache the wait of the smallest request, a larger one
+                # would deny smaller requests that fit earlier
+                until = self._record_wait(record, now) if args else wait
+                self._deny(denials, key, now + until)
+            return Decision(False, wait)
+
+    def retry_after(self, key: Hashable, *args) -> float:
+        """
+        Seconds until a request for key would be allowed, without deciding it.
+
+        Args:
+            key: Key identifying the stream, e.g. an API key or client IP.
+            *args: Passed on to the algorithm, i.e. the cost of the request.
+
+        Returns:
+            float: 0 if the request would be allowed now, infinite if never.
+        """
+        stripe = self._shard_of(key)
+        with self._shard_lock(stripe):
+            now = self._clock()
+            record = self._shards[stripe].get(key)
+            if record is None:
+                record = self._new_record(now)
+            return self._record_wait(record, now, *args)
+
+    def _lookup(self, records: OrderedDict, key: Hashable, now: float):
+        """Return the record for key, creating it (and making room) if needed."""
+        record = records.get(key)
+        if record is None:
+            self._make_room(records, now)
+            if self._snapshot is not None:
+                record = self._restore_record(key, now)
+            if record is None:
+                record = self._new_record(now)
+            records[key] = record
+        else:
+            records.move_to_end(key)
+        return record
+
+    def _make_room(self, records: OrderedDict, now: float) -> None:
+        """Evict idle records from the LRU end, then enforce ``max_keys``."""
+        ttl = self._ttl
+        while records:
+            record = next(iter(records.values()))
+            if now - record.last < ttl:
+                break
+            records.popitem(last=False)
+        if len(records) >= self._shard_max_keys:
+            records.popitem(last=False)
+
+    def _shard_lock(self, stripe: int):
+        return nullcontext() if self._locks is None else self._locks[stripe]
+
+    def _shard_of(self, key: Hashable) -> int:
+        return 0 if self._locks is None else hash(key) % len(self._shards)
+
+    def evict_idle(self) -> int:
+        """Evict every record untouched for at least ``ttl`` seconds.
+
+        Returns:
+            int: Number of evicted keys.
+        """
+        evicted = 0
+        for stripe, records in enumerate(self._shards):
+            with self._shard_lock(stripe):
+                now = self._clock()
+                idle = [
+                    key
+                    for key, record in records.items()
+                    if now - record.last >= self._ttl
+                ]
+                for key in idle:
+                    del records[key]
+            evicted += len(idle)
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._shards)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shards[self._shard_of(key)]
+
+    def _fill_level(self) -> int:
+        """Keys holding state."""
+        return len(self)
+
+    def get_state(self) -> dict:
+        """Returns the state of the store."""
+        return {
+            "keys": len(self),
+            "max_keys": self._max_keys,
+            "ttl": self._ttl,
+        }
+
+    def _config(self) -> dict:
+        """Constructor arguments a snapshot must have been taken with."""
+        raise NotImplementedError
+
+    def _snapshot_fields(self) -> list:
+        """Describe the record slots stored in a snapshot.
+
+        Returns:
+            list: ``(slot, typecode, length, conversion)`` tuples. ``length``
+                is 0 for a scalar slot, else the length of the slot's array;
+                ``conversion`` is "time" for timestamps, "bucket" for
+                absolute sub-bucket indexes of ``width`` seconds, or None.
+        """
+        raise NotImplementedError
+
+    def _snapshot_header(self) -> dict:
+        """Store-wide state saved with a snapshot."""
+        return {}
+
+    def _restore_header(self, header: dict, offset: float) -> None:
+        """Restore store-wide state, moving timestamps by offset seconds."""
+
+    def snapshot(self, path: str, wall_clock: Clock = time.time) -> int:
+        """
+        Write the state of every key to a compact binary file.
+
+        Keys must be strings, bytes or integers. Keys restored lazily from an
+        earlier snapshot and not requested since are included.
+
+        Args:
+            path: File to write, see `src.rate_limiting.snapshot`.
+            wall_clock: Clock returning seconds since the epoch.
+
+        Returns:
+            int: Number of keys written.
+        """
+        fields = self._snapshot_fields()
+        keys = []
+        columns = {slot: array(typecode) for slot, typecode, _, _ in fields}
+
+        def add(items, records):
+            keys.extend(items)
+            for slot, _, length, _ in fields:
+                values = map(operator.attrgetter(slot), records)
+                if length:
+                    values = itertools.chain.from_iterable(values)
+                columns[slot].extend(values)
+
+        for stripe, records in enumerate(self._shards):
+            with self._shard_lock(stripe):
+                add(records.keys(), records.values())
+        with self._snapshot_lock:
+            pending = self._snapshot
+            if pending is not None:
+                now = self._clock()
+                rows = [row for row in range(len(pending)) if not self._restored[row]]
+                add(
+                    [pending.key(row) for row in rows],
+                    [self._record_from_row(pending, row, now) for row in rows],
+                )
+        header = {
+            "algorithm": type(self).__name__,
+            "config": self._config(),
+            "clock": self._clock(),
+            "wall": wall_clock(),
+            **self._snapshot_header(),
+        }
+        write_snapshot(path, header, keys, columns)
+        return len(keys)
+
+    def restore(self, path: str, wall_clock: Clock = time.time) -> int:
+        """
+        Restore the keys of a snapshot into this empty store.
+
+        The file is memory-mapped and each key's record is only built on the
+        key's first request, so restoring takes about the same time for any
+        number of keys. Until then the key does not count towards ``len``.
+
+        Clocks such as `time.monotonic` have a different origin in every
+        process, so timestamps are converted using the wall clock: a
+        timestamp taken s seconds before the snapshot is restored as s
+        seconds plus the wall time since the snapshot before now.
+
+        Args:
+            path: File written by `snapshot` from a store of the same type and
+                configuration.
+            wall_clock: Clock returning seconds since the epoch.
+
+        Returns:
+            int: Number of keys in the snapshot.
+        """
+        if len(self) or self._snapshot is not None:
+            raise ValueError("Snapshots can only be restored into an empty store")
+        snapshot = Snapshot(path)
+        header = snapshot.header
+        config = json.loads(json.dumps(self._config()))
+        if header["algorithm"] != type(self).__name__ or header["config"] != config:
+            snapshot.close()
+            raise ValueError(
+                f"Snapshot of {header['algorithm']} {header['config']} does not "
+                f"match {type(self).__name__} {config}"
+            )
+        offset = self._clock() - header["clock"] - (wall_clock() - header["wall"])
+        self._snapshot_offset = offset
+        self._restore_header(header, offset)
+        if not len(snapshot):
+            snapshot.close()
+            return 0
+        self._restored = bytearray(len(snapshot))
+        self._unrestored = len(snapshot)
+        self._snapshot = snapshot
+        return len(snapshot)
+
+    def _restore_record(self, key: Hashable, now: float):
+        """Build the record of key from the snapshot, None if it has none."""
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return None
+            row = snapshot.find(key)
+            if row is None or self._restored[row]:
+                return None
+            self._restored[row] = 1
+            self._unrestored -= 1
+            record = self._record_from_row(snapshot, row, now)
+            if not self._unrestored:
+                self._snapshot = None
+                self._restored = None
+                snapshot.close()
+            return record
+
+    def _record_from_row(self, snapshot: Snapshot, row: int, now: float):
+        record = self._new_record(now)
+        offset = self._snapshot_offset
+        for slot, typecode, length, conversion in self._snapshot_fields():
+            column = snapshot.columns[slot]
+            if not length:
+                value = column[row]
+                setattr(record, slot, value + offset if conversion else value)
+                continue
+            values = column[row * length : (row + 1) * length].tolist()
+            if conversion == "time":
+                values = [value + offset for value in values]
+            elif conversion == "bucket":
+                # Round up, keeping restored requests in the window longer
+                shift = math.ceil(offset / record.width)
+                values = [value + shift for value in values]
+            target = getattr(record, slot)
+            target[:] = array(typecode, values) if isinstance(target, array) else values
+        return record
+
+    def get_key_state(self, key: Hashable) -> Optional[dict]:
+        """Returns the stored state of one key, or None if it holds no state."""
+        stripe = self._shard_of(key)
+        with self._shard_lock(stripe):
+            record = self._shards[stripe].get(key)
+            if record is None:
+                return None
+            return {
+                slot: getattr(record, slot)
+                for cls in reversed(type(record).__mro__)
+                for slot in cls.__dict__.get("__slots__", ())
+            }
+
+
+class KeyedTokenBucket(KeyedStore):
+    """Token bucket per key.
+
+    Tokens are kept as floats so that partial refills between frequent
+    requests accumulate instead of being truncated.
+    """
+
+    def __init__(self, capacity: int, rate: int, **kwargs):
+        """
+        Args:
+            capacity: Maximum number of tokens each key's bucket can hold.
+            rate: Rate (token per second) at which tokens are added.
+            **kwargs: Passed to `KeyedStore`.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive integers")
+        self._capacity = capacity
+        self._rate = rate
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._capacity / self._rate
+
+    def _config(self) -> dict:
+        return {"capacity": self._capacity, "rate": self._rate}
+
+    def _snapshot_fields(self) -> list:
+        return [("last", "d", 0, "time"), ("tokens", "d", 0, None)]
+
+    def _new_record(self, now: float) -> _TokenBucketRecord:
+        return _TokenBucketRecord(now, self._capacity)
+
+    def _decide(
+        self, record: _TokenBucketRecord, now: float, tokens_needed: int = 1
+    ) -> bool:
+        """Refill the bucket and take ``tokens_needed`` tokens if available."""
+        tokens = record.tokens + (now - record.last) * self._rate
+        if tokens > self._capacity:
+            tokens = self._capacity
+        record.last = now
+        if tokens >= tokens_needed:
+            record.tokens = tokens - tokens_needed
+            return True
+        record.tokens = tokens
+        return False
+
+    def _record_wait(
+        self, record: _TokenBucketRecord, now: float, tokens_needed: int = 1
+    ) -> float:
+        if tokens_needed > self._capacity:
+            return math.inf
+        tokens = record.tokens + (now - record.last) * self._rate
+        return max(tokens_needed - tokens, 0.0) / self._rate
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum tokens that can be consumed."""
+        return self._capacity, 1
+
+
+class KeyedGCRA(KeyedStore):
+    """GCRA per key, see `src.rate_limiting.gcra`.
+
+    Each record holds one float, the key's theoretical arrival time. A key is
+    idle, and evicting it lossless, once that time has passed, so ``ttl``
+    counts from then rather than from the key's last request.
+    """
+
+    def __init__(self, capacity: int, rate: float, **kwargs):
+        """
+        Args:
+            capacity: Maximum burst of each key.
+            rate: Sustained rate (requests per second) of each key.
+            **kwargs: Passed to `KeyedStore`.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive")
+        self._capacity = capacity
+        self._rate = rate
+        self._interval = 1 / rate
+        self._tolerance = capacity / rate + _GCRA_SLACK
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return 0.0
+
+    def _config(self) -> dict:
+        return {"capacity": self._capacity, "rate": self._rate}
+
+    def _snapshot_fields(self) -> list:
+        return [("tat", "d", 0, "time")]
+
+    def _new_record(self, now: float) -> _GCRARecord:
+        return _GCRARecord(now)
+
+    def _decide(self, record: _GCRARecord, now: float, cost: int = 1) -> bool:
+        tat = record.tat
+        if tat < now:
+            tat = now
+        tat += cost * self._interval
+        if tat - now > self._tolerance:
+            return False
+        record.tat = tat
+        return True
+
+    def _record_wait(self, record: _GCRARecord, now: float, cost: int = 1) -> float:
+        if cost * self._interval > self._tolerance:
+            return math.inf
+        tat = max(record.tat, now) + cost * self._interval
+        return max(tat - now - self._tolerance, 0.0)
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum burst size."""
+        return self._capacity, 1
+
+
+class KeyedFixedWindow(KeyedStore):
+    """Fixed window counter per key."""
+
+    def __init__(self, capacity: int, window_size: int, **kwargs):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window_size must be positive integers")
+        self._capacity = capacity
+        self._window_size = window_size
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._window_size
+
+    def _config(self) -> dict:
+        return {"capacity": self._capacity, "window_size": self._window_size}
+
+    def _snapshot_fields(self) -> list:
+        return [
+            ("last", "d", 0, "time"),
+            ("window_start", "d", 0, "time"),
+            ("counter", "q", 0, None),
+        ]
+
+    def _new_record(self, now: float) -> _FixedWindowRecord:
+        return _FixedWindowRecord(now, now, 0)
+
+    def _decide(self, record: _FixedWindowRecord, now: float, cost: int = 1) -> bool:
+        record.last = now
+        if now - record.window_start > self._window_size:
+            record.window_start = now
+            record.counter = 0
+        if record.counter + cost > self._capacity:
+            return False
+        record.counter += cost
+        return True
+
+    def _record_wait(
+        self, record: _FixedWindowRecord, now: float, cost: int = 1
+    ) -> float:
+        if cost > self._capacity:
+            return math.inf
+        elapsed = now - record.window_start
+        if elapsed > self._window_size or record.counter + cost <= self._capacity:
+            return 0.0
+        return self._window_size - elapsed
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum number of requests"""
+        return self._capacity, self._window_size
+
+
+class KeyedAlignedFixedWindow(RateLimiter):
+    """Fixed window counter per key, with windows aligned to the clock's epoch.
+
+    Window n spans ``[n * window_size, (n + 1) * window_size)`` for every
+    key, so n, the generation, is shared by all keys instead of each key
+    keeping the start of its own window. The counts of the current generation
+    live in a plain dict from key to count; when the generation changes, the
+    dict is swapped for an empty one, which expires every key at once. A
+    decision is a dict lookup and store, without a record or timestamp per key
+    and without least-recently-used bookkeeping.
+
+    At most ``max_keys`` keys are counted per window. Beyond that the key
+    first counted in the window is dropped, restarting its count. With
+    ``thread_safe`` set, keys are spread over lock-striped shards like in
+    `KeyedStore`, each switching generation on its own.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: float,
+        max_keys: int = 100_000,
+        clock: Optional[Clock] = None,
+        thread_safe: bool = False,
+        stripes: int = 16,
+    ):
+        """
+        Args:
+            capacity: Maximum number of requests of each key in a window.
+            window_size: Size of the window in seconds.
+            max_keys: Maximum number of keys counted in a window.
+            clock: Callable returning the current time in seconds.
+            thread_safe: Guard the counts with striped locks.
+            stripes: Number of lock stripes when ``thread_safe`` is set.
+        """
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window_size must be positive")
+        if max_keys <= 0 or stripes <= 0:
+            raise ValueError("max_keys and stripes must be positive integers")
+        super().__init__(clock)
+        shard_count = stripes if thread_safe else 1
+        self._capacity = capacity
+        self._window_size = window_size
+        self._max_keys = max_keys
+        self._shard_max_keys = -(-max_keys // shard_count)
+        generation = self._generation()
+        self._shards = [{} for _ in range(shard_count)]
+        self._generations = [generation] * shard_count
+        self._locks = (
+            [threading.Lock() for _ in range(shard_count)] if thread_safe else None
+        )
+
+    def _generation(self) -> int:
+        return int(self._clock() // self._window_size)
+
+    def allow_request(self, key: Hashable, cost: int = 1) -> bool:
+        """
+        Check if request for key can be allowed.
+
+        Args:
+            key: Key identifying the stream, e.g. an API key or client IP.
+            cost: Number of requests this request counts as.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        if self._locks is None:
+            return self._decide(0, key, cost)
+        stripe = hash(key) % len(self._shards)
+        with self._locks[stripe]:
+            return self._decide(stripe, key, cost)
+
+    def _decide(self, stripe: int, key: Hashable, cost: int) -> bool:
+        generation = self._generation()
+        counts = self._shards[stripe]
+        if generation != self._generations[stripe]:
+            counts = self._shards[stripe] = {}
+            self._generations[stripe] = generation
+        count = counts.get(key)
+        if count is None:
+            if cost > self._capacity:
+                return False
+            if len(counts) >= self._shard_max_keys:
+                del counts[next(iter(counts))]
+            counts[key] = cost
+            return True
+        if count + cost > self._capacity:
+            return False
+        counts[key] = count + cost
+        return True
+
+    def check(self, key: Hashable, cost: int = 1) -> Decision:
+        """
+        Decide a request for key like `allow_request`, also telling when to
+        retry.
+
+        Returns:
+            Decision: Whether the request is allowed and, if it is denied, the
+                seconds until the next window, infinite if cost exceeds the
+                capacity.
+        """
+        # Not through allow_request, which metrics count separately
+        if self._locks is None:
+            allowed = self._decide(0, key, cost)
+        else:
+            stripe = hash(key) % len(self._shards)
+            with self._locks[stripe]:
+                allowed = self._decide(stripe, key, cost)
+        if allowed:
+            return Decision(True, 0.0)
+        if cost > self._capacity:
+            return Decision(False, math.inf)
+        now = self._clock()
+        return Decision(False, (now // self._window_size + 1) * self._window_size - now)
+
+    def _current(self, stripe: int) -> dict:
+        """Counts of a shard, empty if its generation is over."""
+        if self._generations[stripe] != self._generation():
+            return {}
+        return self._shards[stripe]
+
+    def __len__(self) -> int:
+        return sum(len(self._current(stripe)) for stripe in range(len(self._shards)))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get_key_state(key) is not None
+
+    def _fill_level(self) -> int:
+        """Keys counted in the current window."""
+        return len(self)
+
+    def get_key_state(self, key: Hashable) -> Optional[dict]:
+        """Returns the count of one key, or None if it holds no state."""
+        stripe = 0 if self._locks is None else hash(key) % len(self._shards)
+        count = self._current(stripe).get(key)
+        return None if count is None else {"counter": count}
+
+    def get_state(self) -> dict:
+        """Returns the state of the store."""
+        return {
+            "keys": len(self),
+            "max_keys": self._max_keys,
+            "window_start": self._generation() * self._window_size,
+        }
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum number of requests"""
+        return self._capacity, self._window_size
+
+
+class KeyedSlidingWindowLog(KeyedStore):
+    """Sliding window log per key.
+
+    Each key holds a preallocated ring of ``capacity`` timestamps, or with
+    ``precision`` set, an approximate log of sub-buckets as described in
+    `CompactSlidingWindowLog`.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        precision: Optional[int] = None,
+        **kwargs,
+    ):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window size must be positive integers")
+        if precision is not None and precision <= 0:
+            raise ValueError("Precision must be a positive integer")
+        self._capacity = capacity
+        self._window_size = window_size
+        self._precision = precision
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        if self._precision is None:
+            return self._window_size
+        return self._window_size + self._window_size / self._precision
+
+    def _config(self) -> dict:
+        return {
+            "capacity": self._capacity,
+            "window_size": self._window_size,
+            "precision": self._precision,
+        }
+
+    def _snapshot_fields(self) -> list:
+        if self._precision is None:
+            return [
+                ("last", "d", 0, "time"),
+                ("times", "d", self._capacity, "time"),
+                ("head", "q", 0, None),
+                ("count", "q", 0, None),
+            ]
+        size = self._precision + 3
+        return [
+            ("last", "d", 0, "time"),
+            ("buckets", "q", size, "bucket"),
+            ("counts", "q", size, None),
+            ("head", "q", 0, None),
+            ("length", "q", 0, None),
+            ("total", "q", 0, None),
+        ]
+
+    def _new_record(self, now: float):
+        if self._precision is None:
+            return _SlidingWindowLogRecord(now, self._capacity)
+        return _BucketedSlidingWindowLogRecord(now, self._precision, self._window_size)
+
+    def _decide(
+        self, record: _SlidingWindowLogRecord, now: float, cost: int = 1
+    ) -> bool:
+        record.last = now
+        if record.expire(now, self._window_size) + cost <= self._capacity:
+            record.append(now, cost)
+            return True
+        return False
+
+    def _record_wait(
+        self, record: _SlidingWindowLogRecord, now: float, cost: int = 1
+    ) -> float:
+        if cost > self._capacity:
+            return math.inf
+        excess = record.expire(now, self._window_size) + cost - self._capacity
+        if excess <= 0:
+            return 0.0
+        return max(record.next_expiry(self._window_size, excess) - now, 0.0)
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, self._window_size
+
+
+class KeyedSlidingWindowCounter(KeyedStore):
+    """Sliding window counter per key.
+
+    Each key holds a fixed ring of bucket counters with a running total, so a
+    decision costs the same regardless of ``bucket_count``. Buckets of all keys
+    are aligned to the creation time of the store.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        bucket_count: int,
+        weighted: bool = False,
+        **kwargs,
+    ):
+        if capacity <= 0 or window_size <= 0 or bucket_count <= 0:
+            raise ValueError(
+                f"Capacity {capacity}, window size {window_size} and bucket count {bucket_count} must be positive integers"
+            )
+        self._capacity = capacity
+        self._window_size = window_size
+        self._bucket_count = bucket_count
+        self._bucket_duration = window_size / bucket_count
+        self._weighted = weighted
+        self._ring_size = bucket_count + 1 if weighted else bucket_count
+        super().__init__(**kwargs)
+        self._start = self._clock()
+
+    def _idle_horizon(self) -> float:
+        return self._window_size + 2 * self._bucket_duration
+
+    def _config(self) -> dict:
+        return {
+            "capacity": self._capacity,
+            "window_size": self._window_size,
+            "bucket_count": self._bucket_count,
+            "weighted": self._weighted,
+        }
+
+    def _snapshot_fields(self) -> list:
+        # Bucket indexes are relative to the start of the store, which is
+        # saved in the header and moved on restore instead
+        return [
+            ("last", "d", 0, "time"),
+            ("counts", "q", self._ring_size, None),
+            ("head", "q", 0, None),
+            ("total", "q", 0, None),
+        ]
+
+    def _snapshot_header(self) -> dict:
+        return {"start": self._start}
+
+    def _restore_header(self, header: dict, offset: float) -> None:
+        self._start = header["start"] + offset
+
+    def _new_record(self, now: float) -> _SlidingWindowCounterRecord:
+        bucket = int((now - self._start) / self._bucket_duration)
+        return _SlidingWindowCounterRecord(now, self._ring_size, bucket)
+
+    def _decide(
+        self, record: _SlidingWindowCounterRecord, now: float, cost: int = 1
+    ) -> bool:
+        record.last = now
+        position = (now - self._start) / self._bucket_duration
+        bucket = int(position)
+        record.advance(bucket, self._bucket_count)
+        requests = record.total
+        if self._weighted:
+            previous = record.counts[(bucket - self._bucket_count) % self._ring_size]
+            requests += previous * (1 - (position - bucket))
+        if requests + cost <= self._capacity:
+            record.add(cost)
+            return True
+        return False
+
+    def _record_wait(
+        self, record: _SlidingWindowCounterRecord, now: float, cost: int = 1
+    ) -> float:
+        if cost > self._capacity:
+            return math.inf
+        return _ring_wait(
+            record,
+            now,
+            self._start,
+            self._bucket_duration,
+            self._bucket_count,
+            self._capacity - cost,
+            self._weighted,
+        )
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the rate limit configuration."""
+        return self._capacity, self._window_size
+
+
+class KeyedLeakyBucket(KeyedStore):
+    """Leaky bucket per key, used as a meter.
+
+    Instead of queueing requests for a consumer thread, each key tracks the
+    level its queue would have: admitted requests add their cost, one unit by
+    default, and the level drains at ``outflow_rate`` units per second.
+    """
+
+    def __init__(self, bucket_size: int, outflow_rate: int, **kwargs):
+        if bucket_size <= 0 or outflow_rate <= 0:
+            raise ValueError("Bucket size and outflow rate should be positive")
+        self._bucket_size = bucket_size
+        self._outflow_rate = outflow_rate
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._bucket_size / self._outflow_rate
+
+    def _config(self) -> dict:
+        return {"bucket_size": self._bucket_size, "outflow_rate": self._outflow_rate}
+
+    def _snapshot_fields(self) -> list:
+        return [("last", "d", 0, "time"), ("level", "d", 0, None)]
+
+    def _new_record(self, now: float) -> _LeakyBucketRecord:
+        return _LeakyBucketRecord(now, 0.0)
+
+    def _decide(self, record: _LeakyBucketRecord, now: float, cost: int = 1) -> bool:
+        level = record.level - (now - record.last) * self._outflow_rate
+        if level < 0:
+            level = 0.0
+        record.last = now
+        if level + cost <= self._bucket_size:
+            record.level = level + cost
+            return True
+        record.level = level
+        return False
+
+    def _record_wait(
+        self, record: _LeakyBucketRecord, now: float, cost: int = 1
+    ) -> float:
+        if cost > self._bucket_size:
+            return math.inf
+        level = record.level - (now - record.last) * self._outflow_rate
+        return max(level + cost - self._bucket_size, 0.0) / self._outflow_rate
+
+    def get_rate_limit(self) -> int:
+        return self._outflow_rate
+
+
+if __name__ == "__main__":
+    limiter = KeyedTokenBucket(3, 1, max_keys=2)
+    for i in range(12):
+        client = f"client-{i % 3}"
+        if limiter.allow_request(client):
+            print(f"Request {i} from {client} forwarded")
+        else:
+            print(f"Request {i} from {client} dropped")
+        time.sleep(0.2)
+    print(limiter.get_state())
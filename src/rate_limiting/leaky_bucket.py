@@ -2,28 +2,114 @@
 
 import queue
 import time
-from threading import Thread
-from src.rate_limiting.rate_limit_abc import RateLimiter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Semaphore, Thread
+from typing import Callable, Optional
+
+from src.rate_limiting.adaptive import AIMDController
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import Decision, RateLimiter
 
 
 class LeakyBucket(RateLimiter):
-    def __init__(self, bucket_size: int, outflow_rate: int, handler):
+    def __init__(
+        self,
+        bucket_size: int,
+        outflow_rate: int,
+        handler=None,
+        paced: bool = False,
+        batch_handler=None,
+        batch_interval: float = 0.01,
+        workers: int = 0,
+        scheduler=None,
+        adaptive: Optional[AIMDController] = None,
+        clock: Optional[Clock] = None,
+        sleep: Optional[Callable[[float], object]] = None,
+    ):
+        """
+        Args:
+            bucket_size: Maximum number of requests waiting in the bucket.
+            outflow_rate: Number of requests handed to the handler per second.
+            handler: Callable invoked with each request.
+            paced: Emit one request every ``1 / outflow_rate`` seconds instead
+                of bursts of ``outflow_rate`` requests once per second. The
+                consumer wakes as soon as a request enters an empty bucket.
+            batch_handler: Callable invoked with a list of requests instead of
+                calling ``handler`` per request. Implies ``paced``; each call
+                gets the requests due within ``batch_interval`` seconds.
+            batch_interval: Seconds of outflow grouped into one batch.
+            workers: Number of threads running the handler. With 0 the
+                consumer thread calls the handler itself, so slow handlers
+                lower the outflow rate.
+            scheduler: A started `LeakyBucketScheduler` driving the outflow
+                instead of a consumer thread owned by this bucket. Implies
+                ``paced``.
+            adaptive: Controller adjusting ``outflow_rate``, starting from
+                the given rate, to the latency and failures of the handler.
+                A batch counts as one outcome.
+            clock: Callable returning the current time in seconds, used by
+                the paced consumer thread; a ``scheduler`` keeps its own
+                time. Defaults to `time.monotonic`.
+            sleep: Callable waiting the given seconds between paced
+                emissions. Defaults to `time.sleep`; pass
+                ``ManualClock.advance`` with a `ManualClock` to pace in
+                simulated time.
+        """
         if bucket_size <= 0 and outflow_rate <= 0:
             raise ValueError("Bucket size and outflow rate should be positive")
+        if handler is None and batch_handler is None:
+            raise ValueError("Either handler or batch_handler is required")
+        super().__init__(clock)
+        self._sleep = time.sleep if sleep is None else sleep
         self.bucket_size = bucket_size
-        self.outflow_rate = outflow_rate
+        self._adaptive = adaptive
+        self.outflow_rate = (
+            outflow_rate if adaptive is None else adaptive.reset(outflow_rate)
+        )
         self.queue = queue.Queue(maxsize=bucket_size)
         self._running = True
         self.handler = handler
-        self.consumer_thread = Thread(target=self.consumer, daemon=True)
-        self.consumer_thread.start()
+        self.batch_handler = batch_handler
+        self._paced = paced or batch_handler is not None or scheduler is not None
+        self._batch_size = (
+            max(1, round(outflow_rate * batch_interval)) if batch_handler else 1
+        )
+        self._executor = ThreadPoolExecutor(workers) if workers > 0 else None
+        self._worker_slots = Semaphore(workers)
+        self._scheduler = scheduler
+        self._scheduled = False
+        self._next_emit = 0.0
+        if scheduler is None:
+            self.consumer_thread = Thread(target=self.consumer, daemon=True)
+            self.consumer_thread.start()
+        else:
+            self.consumer_thread = None
 
     def allow_request(self, request) -> bool:
+        return self._enqueue(request)
+
+    def _enqueue(self, request) -> bool:
         try:
             self.queue.put(request, block=False)
-            return True
         except queue.Full:
             return False
+        if self._scheduler is not None:
+            self._scheduler.notify(self)
+        return True
+
+    def check(self, request) -> Decision:
+        """
+        Queue request like `allow_request`, also telling when to retry.
+
+        Returns:
+            Decision: Whether the request is queued and, if the bucket is full,
+                the seconds until the consumer next takes a request out: one
+                outflow interval when paced, else up to a second.
+        """
+        # Not through allow_request, which metrics count separately
+        if self._enqueue(request):
+            return Decision(True, 0.0)
+        return Decision(False, 1 / self.outflow_rate if self._paced else 1.0)
 
     def get_state(self) -> dict:
         return {
@@ -32,26 +118,108 @@ class LeakyBucket(RateLimiter):
             "queue_length": self.queue.qsize(),
         }
 
+    def _fill_level(self) -> int:
+        """Requests waiting in the queue."""
+        return self.queue.qsize()
+
     def get_rate_limit(self) -> int:
         return self.outflow_rate
 
     def consumer(self):
+        if self._paced:
+            return self._paced_consumer()
         while self._running:
-            for _ in range(self.outflow_rate):
+            for _ in range(max(1, round(self.outflow_rate))):
                 try:
                     item = self.queue.get(block=False)
+                    started = time.perf_counter()
                     self.handler(item)
+                    self._observe(started)
                     self.queue.task_done()
                 except queue.Empty:
                     break
                 except Exception as ex:
+                    self._observe(started, failed=True)
                     print(f"Handler failed processing request {item}: {ex}")
             time.sleep(1)
 
+    def _paced_consumer(self):
+        """Emit requests evenly spaced at ``1 / outflow_rate`` seconds.
+
+        Blocks on the queue while it is empty, so the first request after an
+        idle period is emitted right away. Idle time does not build up credit,
+        which keeps the output smooth instead of bursting after a pause.
+        """
+        next_emit = self._clock()
+        while self._running:
+            try:
+                first = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            interval = 1 / self.outflow_rate
+            now = self._clock()
+            if next_emit < now:
+                next_emit = now
+            else:
+                self._sleep(next_emit - now)
+            batch = self._fill_batch([first])
+            next_emit += len(batch) * interval
+            self._dispatch(batch)
+
+    def _fill_batch(self, batch: list) -> list:
+        """Add queued requests to batch, up to the batch size."""
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self.queue.get(block=False))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, batch: list):
+        if self._executor is None:
+            self._handle(batch)
+            return
+        self._worker_slots.acquire()
+        self._executor.submit(self._handle, batch)
+
+    def _handle(self, batch: list):
+        try:
+            if self.batch_handler is not None:
+                started = time.perf_counter()
+                try:
+                    self.batch_handler(batch)
+                    self._observe(started)
+                except Exception as ex:
+                    self._observe(started, failed=True)
+                    print(f"Batch handler failed processing {batch}: {ex}")
+            else:
+                for item in batch:
+                    started = time.perf_counter()
+                    try:
+                        self.handler(item)
+                        self._observe(started)
+                    except Exception as ex:
+                        self._observe(started, failed=True)
+                        print(f"Handler failed processing request {item}: {ex}")
+            for _ in batch:
+                self.queue.task_done()
+        finally:
+            if self._executor is not None:
+                self._worker_slots.release()
+
+    def _observe(self, started: float, failed: bool = False) -> None:
+        """Adapt the outflow rate to a handler call begun at started."""
+        if self._adaptive is not None:
+            latency = time.perf_counter() - started
+            self.outflow_rate = self._adaptive.record(latency, failed)
+
     def stop(self):
         """Gracefully stop the consumer thread."""
         self._running = False
-        self.consumer_thread.join()
+        if self.consumer_thread is not None:
+            self.consumer_thread.join()
+        if self._executor is not None:
+            self._executor.shutdown()
 
 
 def forward(item):
@@ -69,4 +237,3 @@ if __name__ == "__main__":
 
     time.sleep(3)  # Let the consumer process some requests
     bucket.stop()  # Gracefully stop the consumer
-
@@ -0,0 +1,143 @@
+"""Drives the outflow of many leaky buckets from a single thread or task."""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+
+class LeakyBucketScheduler:
+    """Shared outflow scheduler for `LeakyBucket` instances.
+
+    Buckets created with ``scheduler=`` do not start a consumer thread.
+    Instead, a bucket enters the scheduler's heap, keyed by the time its next
+    request is due, when a request arrives in its empty queue. It stays in the
+    heap while its queue has requests and leaves once the queue drains. Idle
+    buckets are therefore not in the heap, do not wake the scheduler and cost
+    nothing beyond their own queue.
+
+    Run the scheduler either on its own thread with `start` or as an asyncio
+    task with `run`. Handlers are called on the scheduler's thread or loop, so
+    slow handlers should use the bucket's ``workers`` pool.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+        self._running = False
+        self._thread = None
+        self._loop = None
+        self._event = None
+
+    def notify(self, bucket) -> None:
+        """Schedule bucket after a request entered its queue."""
+        with self._lock:
+            if bucket._scheduled:
+                return
+            bucket._scheduled = True
+            due = max(bucket._next_emit, time.monotonic())
+            entry = (due, next(self._sequence), bucket)
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._wake()
+
+    def _wake(self) -> None:
+        """Wake the runner to recompute its deadline, the lock must be held."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._wakeup.notify()
+
+    def _run_due(self) -> None:
+        """Emit requests of all buckets that are due and reschedule them."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+        for emit_at, _, bucket in due:
+            batch = bucket._fill_batch([]) if bucket._running else []
+            if batch:
+                bucket._next_emit = emit_at + len(batch) / bucket.outflow_rate
+                bucket._dispatch(batch)
+            with self._lock:
+                if bucket._running and not bucket.queue.empty():
+                    entry = (bucket._next_emit, next(self._sequence), bucket)
+                    heapq.heappush(self._heap, entry)
+                else:
+                    bucket._scheduled = False
+
+    def _timeout(self) -> Optional[float]:
+        """Seconds until the next bucket is due, the lock must be held."""
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - time.monotonic(), 0.0)
+
+    def __len__(self) -> int:
+        """Number of buckets currently waiting to emit."""
+        return len(self._heap)
+
+    def start(self) -> "LeakyBucketScheduler":
+        """Run the scheduler on a daemon thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run_thread, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_thread(self) -> None:
+        while True:
+            self._run_due()
+            with self._lock:
+                if not self._running:
+                    return
+                timeout = self._timeout()
+                if timeout is None or timeout > 0:
+                    self._wakeup.wait(timeout)
+
+    async def run(self) -> None:
+        """Run the scheduler in the current event loop until `stop` is called."""
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._running = True
+        try:
+            while self._running:
+                self._event.clear()
+                self._run_due()
+                with self._lock:
+                    timeout = self._timeout()
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._event.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._loop = None
+
+    def stop(self) -> None:
+        """Stop the scheduler, buckets keep their queued requests."""
+        with self._lock:
+            self._running = False
+            if self._loop is not None:
+                self._wake()
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    from src.rate_limiting.leaky_bucket import LeakyBucket
+
+    scheduler = LeakyBucketScheduler().start()
+    buckets = [
+        LeakyBucket(5, 2, lambda item: print(f"Forwarded {item}"), scheduler=scheduler)
+        for _ in range(1000)
+    ]
+    for i in range(3):
+        buckets[i * 100].allow_request(f"Request {i}")
+    time.sleep(2)
+    scheduler.stop()
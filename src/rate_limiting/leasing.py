@@ -0,0 +1,281 @@
+"""Token buckets whose nodes lease tokens from a central allocator.
+
+Asking a central store for every decision puts a round trip on the hot path.
+A `LeasedTokenBucket` instead leases a chunk of tokens from a
+`TokenAllocator`, decides requests locally from its lease and renews the
+lease before it runs out, so that a node only waits for the allocator when
+its demand outgrows the lease or the global limit is exhausted.
+
+Over-admission bound: the allocator is itself a token bucket debited when
+tokens are leased, so the cluster never admits more than it was granted, i.e.
+at most ``capacity + rate * t`` over the first t seconds. Over an arbitrary
+interval, tokens leased before the interval started may be spent in it too,
+so the cluster admits at most ``capacity + rate * T + sum(max_lease)`` in any
+interval of T seconds, where the sum runs over the nodes. Keeping
+``max_lease`` small relative to ``capacity`` keeps leasing close to a single
+token bucket.
+"""
+
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import RateLimiter
+
+
+class TokenAllocator:
+    """Central token bucket that hands out tokens in leases.
+
+    An in-process allocator; a remote one needs the same `lease` and
+    `release` methods.
+    """
+
+    def __init__(self, capacity: int, rate: float, clock: Optional[Clock] = None):
+        """
+        Args:
+            capacity: Maximum number of tokens the allocator holds.
+            rate: Rate (token per second) at which tokens are added.
+            clock: Callable returning the current time in seconds.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive")
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = time.monotonic if clock is None else clock
+        self._tokens = float(capacity)
+        self._last = self._clock()
+        self._lock = threading.Lock()
+        self.leases = 0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def lease(self, node_id: str, tokens: int) -> tuple:
+        """
+        Grant up to tokens tokens to a node.
+
+        Returns:
+            tuple: The number of tokens granted and the seconds until at least
+                one token will be available again, 0 if some were granted.
+        """
+        with self._lock:
+            self.leases += 1
+            self._refill()
+            granted = min(tokens, int(self._tokens))
+            self._tokens -= granted
+            if granted:
+                return granted, 0.0
+            return 0, (1 - self._tokens) / self.rate
+
+    def release(self, node_id: str, tokens: int) -> None:
+        """Take back tokens a node leased but did not use."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def get_state(self) -> dict:
+        with self._lock:
+            self._refill()
+            return {"tokens": self._tokens, "leases": self.leases}
+
+
+class LeasedTokenBucket(RateLimiter):
+    """Token bucket node serving decisions from tokens leased from an allocator.
+
+    When the lease falls below ``refill_at`` times the lease size, a renewal
+    is requested in the background, topping the lease up to the lease size.
+    Only if the lease runs out before the renewal arrives does a request wait
+    for the allocator. A request the allocator cannot serve either is denied,
+    and the node does not ask again until the allocator expects tokens.
+
+    The lease size follows the node's demand: it is the number of tokens the
+    node consumed per second, smoothed over renewals, times
+    ``lease_duration``, bounded by ``min_lease`` and ``max_lease`` and growing
+    at most twofold per renewal.
+
+    Call `close` on shutdown to return the unused tokens.
+    """
+
+    def __init__(
+        self,
+        allocator: TokenAllocator,
+        node_id: Optional[str] = None,
+        lease_duration: float = 1.0,
+        min_lease: int = 1,
+        max_lease: int = 1_000,
+        refill_at: float = 0.5,
+        background: bool = True,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            allocator: Central allocator tokens are leased from.
+            node_id: Identifies the node to the allocator, random if None.
+            lease_duration: Seconds a lease should last at the current demand.
+            min_lease: Smallest lease size.
+            max_lease: Largest lease size, bounding the over-admission.
+            refill_at: Fraction of the lease size at which to renew.
+            background: Renew on a background thread; if False renewals run
+                synchronously after the decision that triggers them.
+            clock: Callable returning the current time in seconds.
+        """
+        super().__init__(clock)
+        if not 0 < min_lease <= max_lease:
+            raise ValueError("Lease sizes must satisfy 0 < min_lease <= max_lease")
+        if lease_duration <= 0 or not 0 <= refill_at < 1:
+            raise ValueError("Lease duration must be positive, refill_at in [0, 1)")
+        self._allocator = allocator
+        self.node_id = uuid.uuid4().hex if node_id is None else node_id
+        self._lease_duration = lease_duration
+        self._min_lease = min_lease
+        self._max_lease = max_lease
+        self._refill_at = refill_at
+        self._lease_size = min_lease
+        self._tokens = 0
+        self._demand = None
+        self._consumed = 0
+        self._last_lease = self._clock()
+        self._retry_at = 0.0
+        self._renewing = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._renewed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(1) if background else None
+        self._renewal = None
+
+    def allow_request(self, tokens_needed: int = 1) -> bool:
+        """
+        Admit a request if the lease holds enough tokens.
+
+        Returns:
+            bool: True if request is allowed, False otherwise.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            while self._renewing and self._tokens < tokens_needed:
+                # The lease ran out before the renewal arrived
+                self._renewed.wait()
+            now = self._clock()
+            if self._tokens < tokens_needed and now >= self._retry_at:
+                self._renewing = True
+                self._renew(now, tokens_needed)
+            allowed = self._tokens >= tokens_needed
+            if allowed:
+                self._tokens -= tokens_needed
+                self._consumed += tokens_needed
+            renew = (
+                not self._renewing
+                and self._tokens < self._lease_size * self._refill_at
+                and now >= self._retry_at
+            )
+            if renew:
+                self._renewing = True
+                if self._executor is not None:
+                    # Submitted under the lock, so close cannot shut the
+                    # executor down in between
+                    self._renewal = self._executor.submit(self._renew_early)
+        if renew and self._executor is None:
+            self._renew_early()
+        return allowed
+
+    def _lease_wanted(self, now: float, minimum: int = 0) -> int:
+        """Adapt the lease size to the demand and return the tokens to lease.
+
+        Called with the lock held.
+        """
+        elapsed = now - self._last_lease
+        if elapsed > 0:
+            demand = self._consumed / elapsed
+            if self._demand is None:
+                self._demand = demand
+            else:
+                self._demand = 0.5 * self._demand + 0.5 * demand
+            self._consumed = 0
+            self._last_lease = now
+            # Grow at most twofold per renewal, so that a burst measured over
+            # a short time does not lease the allocator dry
+            size = min(
+                math.ceil(self._demand * self._lease_duration),
+                2 * self._lease_size,
+                self._max_lease,
+            )
+            self._lease_size = max(self._min_lease, size)
+        return max(self._lease_size - self._tokens, minimum)
+
+    def _renew(self, now: float, minimum: int) -> None:
+        """Top up the lease while holding the lock, for a lease that ran out."""
+        try:
+            wanted = self._lease_wanted(now, minimum)
+            granted, retry_after = self._allocator.lease(self.node_id, wanted)
+            self._tokens += granted
+            self._retry_at = now + retry_after
+        finally:
+            self._renewing = False
+            self._renewed.notify_all()
+
+    def _renew_early(self) -> None:
+        """Top up the lease without holding the lock during the round trip."""
+        try:
+            with self._lock:
+                if self._closed:
+                    return
+                now = self._clock()
+                wanted = self._lease_wanted(now)
+            granted, retry_after = self._allocator.lease(self.node_id, wanted)
+            with self._lock:
+                self._tokens += granted
+                self._retry_at = now + retry_after
+        finally:
+            with self._lock:
+                self._renewing = False
+                self._renewed.notify_all()
+
+    def close(self) -> None:
+        """Stop renewing and return the unused tokens to the allocator."""
+        with self._lock:
+            self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        with self._lock:
+            tokens, self._tokens = self._tokens, 0
+        if tokens:
+            self._allocator.release(self.node_id, tokens)
+
+    def __enter__(self) -> "LeasedTokenBucket":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_state(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "tokens": self._tokens,
+            "lease_size": self._lease_size,
+            "demand": self._demand,
+        }
+
+    def _fill_level(self) -> int:
+        """Tokens left in the lease."""
+        return self._tokens
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the global limit shared with the other nodes."""
+        return self._allocator.capacity, 1
+
+
+if __name__ == "__main__":
+    allocator = TokenAllocator(capacity=20, rate=10)
+    nodes = [LeasedTokenBucket(allocator, f"node-{i}") for i in range(3)]
+    admitted = [sum(node.allow_request() for _ in range(10)) for node in nodes]
+    print(f"Admitted per node: {admitted}, allocator calls: {allocator.leases}")
+    for node in nodes:
+        node.close()
+    print(f"Allocator after returns: {allocator.get_state()}")
@@ -0,0 +1,276 @@
+"""Decision metrics of rate limiters in the Prometheus text format.
+
+Instrumenting a limiter stores a counting ``allow_request`` on the instance,
+shadowing the method of its class, and removing the instrumentation deletes
+it again. A limiter that is not instrumented therefore runs exactly the
+original code and pays nothing. Limiters overriding ``check``, such as keyed
+stores, decide there without calling ``allow_request``, so they get a
+counting ``check`` as well. An instrumented decision costs one extra call
+and a few in-place integer increments, and latency is only timed on every
+``sample_every``-th decision.
+
+Counters are aggregated while deciding, per limiter and per key group, so
+`Metrics.render` never visits the keys of a keyed store.
+"""
+
+import bisect
+import time
+from typing import Callable, Hashable, Optional
+
+from src.rate_limiting.rate_limit_abc import RateLimiter
+
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 1e-3, 1e-2)
+OTHER_GROUP = "other"
+
+
+class LimiterMetrics:
+    """Counters of one instrumented limiter.
+
+    ``decisions`` and each entry of ``groups`` hold the number of denied and
+    allowed decisions, indexed by the decision itself.
+    """
+
+    def __init__(self, name: str, limiter: RateLimiter, buckets: tuple):
+        self.name = name
+        self.limiter = limiter
+        self.decisions = [0, 0]
+        self.groups = {}
+        self.buckets = buckets
+        self.latency_counts = [0] * (len(buckets) + 1)
+        self.latency_sum = [0.0]
+
+
+def _timed(original: Callable, metrics: LimiterMetrics, sample_every: int):
+    """Wrap original to time every sample_every-th call into a histogram."""
+    buckets = metrics.buckets
+    counts = metrics.latency_counts
+    total = metrics.latency_sum
+    countdown = [sample_every]
+    clock = time.perf_counter_ns
+
+    def allow_request(*args):
+        countdown[0] -= 1
+        if countdown[0]:
+            return original(*args)
+        countdown[0] = sample_every
+        start = clock()
+        allowed = original(*args)
+        elapsed = (clock() - start) / 1e9
+        counts[bisect.bisect_left(buckets, elapsed)] += 1
+        total[0] += elapsed
+        return allowed
+
+    return allow_request
+
+
+def _counting(original: Callable, metrics: LimiterMetrics, decision: bool):
+    """Wrap original to count its decisions, a bool or a ``Decision``."""
+    decisions = metrics.decisions
+
+    def allow_request(*args):
+        allowed = original(*args)
+        decisions[allowed] += 1
+        return allowed
+
+    def check(*args):
+        outcome = original(*args)
+        decisions[outcome[0]] += 1
+        return outcome
+
+    return check if decision else allow_request
+
+
+def _group_counts(groups: dict, label: str, max_groups: int) -> list:
+    """Counters of a group seen for the first time."""
+    if len(groups) >= max_groups:
+        label = OTHER_GROUP
+    return groups.setdefault(label, [0, 0])
+
+
+def _grouped(
+    original: Callable,
+    metrics: LimiterMetrics,
+    group: Callable[[Hashable], str],
+    max_groups: int,
+    decision: bool,
+):
+    """Wrap original to count its decisions in total and per key group."""
+    decisions = metrics.decisions
+    groups = metrics.groups
+
+    def allow_request(key, *args):
+        allowed = original(key, *args)
+        decisions[allowed] += 1
+        label = group(key)
+        counts = groups.get(label)
+        if counts is None:
+            counts = _group_counts(groups, label, max_groups)
+        counts[allowed] += 1
+        return allowed
+
+    def check(key, *args):
+        outcome = original(key, *args)
+        allowed = outcome[0]
+        decisions[allowed] += 1
+        label = group(key)
+        counts = groups.get(label)
+        if counts is None:
+            counts = _group_counts(groups, label, max_groups)
+        counts[allowed] += 1
+        return outcome
+
+    return check if decision else allow_request
+
+
+def _decision_methods(limiter: RateLimiter) -> tuple:
+    """Names of the methods deciding requests of limiter on their own."""
+    if type(limiter).check is RateLimiter.check:
+        # The default check decides through allow_request
+        return ("allow_request",)
+    return ("allow_request", "check")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Registry of instrumented limiters.
+
+    Counters are updated without locks. Under concurrent threads an
+    increment may occasionally be lost, which skews the counts slightly but
+    never the decisions.
+    """
+
+    def __init__(
+        self, namespace: str = "rate_limiter", buckets: tuple = DEFAULT_BUCKETS
+    ):
+        """
+        Args:
+            namespace: Prefix of the metric names.
+            buckets: Upper bounds in seconds of the latency histogram buckets.
+        """
+        self._namespace = namespace
+        self._buckets = tuple(sorted(buckets))
+        self._limiters = {}
+
+    def instrument(
+        self,
+        limiter: RateLimiter,
+        name: str,
+        group: Optional[Callable[[Hashable], str]] = None,
+        max_groups: int = 100,
+        sample_every: int = 0,
+    ) -> LimiterMetrics:
+        """
+        Count the decisions of limiter.
+
+        Args:
+            limiter: Limiter to instrument.
+            name: Value of the ``limiter`` label.
+            group: For keyed limiters, maps a key to the label of its group,
+                e.g. a plan or tenant, to count decisions per group.
+            max_groups: Groups beyond this many are counted as "other".
+            sample_every: Time every n-th decision, 0 to not time decisions.
+
+        Returns:
+            LimiterMetrics: The limiter's counters.
+        """
+        if name in self._limiters:
+            raise ValueError(f"A limiter named {name} is already instrumented")
+        if "allow_request" in vars(limiter):
+            raise ValueError(f"Limiter {name} is already instrumented")
+        if max_groups <= 0 or sample_every < 0:
+            raise ValueError("max_groups must be positive, sample_every not negative")
+        metrics = LimiterMetrics(name, limiter, self._buckets)
+        for method in _decision_methods(limiter):
+            decide = getattr(limiter, method)
+            if sample_every:
+                decide = _timed(decide, metrics, sample_every)
+            if group is None:
+                decide = _counting(decide, metrics, method == "check")
+            else:
+                decide = _grouped(decide, metrics, group, max_groups, method == "check")
+            setattr(limiter, method, decide)
+        self._limiters[name] = metrics
+        return metrics
+
+    def uninstrument(self, name: str) -> None:
+        """Stop counting the decisions of the limiter and drop its metrics."""
+        metrics = self._limiters.pop(name)
+        for method in _decision_methods(metrics.limiter):
+            delattr(metrics.limiter, method)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        sample = self._sampler(lines)
+        self._header(lines, "decisions_total", "counter", "Rate limiting decisions.")
+        for metrics in self._limiters.values():
+            labels = f'limiter="{_escape(metrics.name)}"'
+            denied, allowed = metrics.decisions
+            sample("decisions_total", f'{labels},decision="allowed"', allowed)
+            sample("decisions_total", f'{labels},decision="denied"', denied)
+        self._header(
+            lines,
+            "group_decisions_total",
+            "counter",
+            "Rate limiting decisions per key group.",
+        )
+        for metrics in self._limiters.values():
+            for group, (denied, allowed) in list(metrics.groups.items()):
+                labels = (
+                    f'limiter="{_escape(metrics.name)}",group="{_escape(str(group))}"'
+                )
+                sample("group_decisions_total", f'{labels},decision="allowed"', allowed)
+                sample("group_decisions_total", f'{labels},decision="denied"', denied)
+        self._header(
+            lines,
+            "fill_level",
+            "gauge",
+            "Tokens, requests or keys held by the limiter.",
+        )
+        for metrics in self._limiters.values():
+            level = metrics.limiter._fill_level()
+            if level is not None:
+                sample("fill_level", f'limiter="{_escape(metrics.name)}"', level)
+        self._header(
+            lines, "decision_seconds", "histogram", "Sampled decision latency."
+        )
+        for metrics in self._limiters.values():
+            if not any(metrics.latency_counts):
+                continue
+            labels = f'limiter="{_escape(metrics.name)}"'
+            cumulative = 0
+            bounds = metrics.buckets + ("+Inf",)
+            for bound, count in zip(bounds, metrics.latency_counts):
+                cumulative += count
+                sample("decision_seconds_bucket", f'{labels},le="{bound}"', cumulative)
+            sample("decision_seconds_sum", labels, metrics.latency_sum[0])
+            sample("decision_seconds_count", labels, cumulative)
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: list, metric: str, kind: str, description: str) -> None:
+        name = f"{self._namespace}_{metric}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def _sampler(self, lines: list) -> Callable:
+        """Return a function appending one sample of a metric to lines."""
+        prefix = self._namespace
+
+        def sample(metric: str, labels: str, value) -> None:
+            lines.append(f"{prefix}_{metric}{{{labels}}} {value}")
+
+        return sample
+
+
+if __name__ == "__main__":
+    from src.rate_limiting.keyed_store import KeyedTokenBucket
+
+    registry = Metrics()
+    limiter = KeyedTokenBucket(3, 1)
+    registry.instrument(limiter, "api", group=lambda key: key.split(":")[0])
+    for i in range(10):
+        limiter.allow_request(f"{'free' if i % 2 else 'paid'}:client-{i % 4}")
+    print(registry.render())
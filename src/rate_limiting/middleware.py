@@ -0,0 +1,271 @@
+"""ASGI and WSGI middleware applying a rate limiter to HTTP requests.
+
+Keys are extracted by rules compiled once when the middleware is created:
+
+- ``"ip"``: the client address.
+- ``"header:<name>"``: the value of a request header, e.g.
+  ``"header:X-API-Key"``.
+- ``"path"``: the request path, or ``"path:<n>"`` for its first n segments,
+  e.g. ``"path:2"`` maps ``/v1/users/42`` to ``/v1/users``.
+
+Given several rules, the first one that finds a value provides the key, so
+``["header:X-API-Key", "ip"]`` limits by API key and falls back to the client
+address. A compiled rule reads the scope or environ directly, e.g. a header
+rule scans the ASGI header list for the encoded name or looks up the WSGI
+variable name, so no header dict or request object is built per request.
+
+Requests are decided with `RateLimiter.check`, and denied requests get a
+``429 Too Many Requests`` response carrying ``Retry-After`` and
+``RateLimit-*`` headers computed from the decision's wait time, when the
+limiter can tell it. Admitted requests go to the application untouched,
+without ``RateLimit-*`` headers: a decision only tells whether and when a
+request fits, not how much of the quota is left. Limiters are called
+synchronously, so an ASGI application should use limiters that decide in
+memory. `LeakyBucket` queues requests for its own handler instead of deciding
+them and is rejected; use `KeyedLeakyBucket` to limit by its outflow rate.
+"""
+
+import math
+from typing import Callable, Optional, Sequence, Union
+
+from src.rate_limiting.leaky_bucket import LeakyBucket
+from src.rate_limiting.rate_limit_abc import Decision, RateLimiter
+
+_BODY = b"Too Many Requests"
+
+
+def _compile_asgi(rule: str) -> Callable:
+    kind, _, argument = rule.partition(":")
+    if kind == "ip":
+
+        def extract(scope):
+            client = scope.get("client")
+            return client[0] if client else None
+
+    elif kind == "header" and argument:
+        name = argument.strip().lower().encode("latin-1")
+
+        def extract(scope):
+            for header, value in scope["headers"]:
+                if header == name:
+                    return value.decode("latin-1")
+            return None
+
+    elif kind == "path":
+        segments = _path_segments(argument)
+
+        def extract(scope):
+            return _path_prefix(scope["path"], segments)
+
+    else:
+        raise ValueError(f"Unknown key rule {rule!r}")
+    return extract
+
+
+def _compile_wsgi(rule: str) -> Callable:
+    kind, _, argument = rule.partition(":")
+    if kind == "ip":
+
+        def extract(environ):
+            return environ.get("REMOTE_ADDR")
+
+    elif kind == "header" and argument:
+        name = argument.strip().upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+
+        def extract(environ):
+            return environ.get(name)
+
+    elif kind == "path":
+        segments = _path_segments(argument)
+
+        def extract(environ):
+            return _path_prefix(environ.get("PATH_INFO", ""), segments)
+
+    else:
+        raise ValueError(f"Unknown key rule {rule!r}")
+    return extract
+
+
+def _path_segments(argument: str) -> Optional[int]:
+    if not argument:
+        return None
+    segments = int(argument)
+    if segments <= 0:
+        raise ValueError("The number of path segments must be positive")
+    return segments
+
+
+def _path_prefix(path: str, segments: Optional[int]) -> str:
+    """The first segments of path, all of it if segments is None."""
+    if segments is None:
+        return path
+    end = 0
+    for _ in range(segments):
+        end = path.find("/", end + 1)
+        if end < 0:
+            return path
+    return path[:end]
+
+
+def _chain(extractors: list) -> Callable:
+    """Return the key of the first extractor finding one, "" if none does."""
+    if len(extractors) == 1:
+        (extract,) = extractors
+
+        def first(request):
+            return extract(request) or ""
+
+        return first
+
+    def first(request):
+        for extract in extractors:
+            key = extract(request)
+            if key:
+                return key
+        return ""
+
+    return first
+
+
+def _quota(limit) -> int:
+    """Requests allowed by a rate limit, the tightest of a composite limit."""
+    if not isinstance(limit, tuple):
+        return limit
+    if isinstance(limit[0], tuple):
+        return min(_quota(part) for part in limit)
+    return limit[0]
+
+
+class _Middleware:
+    """Decision and 429 response shared by the ASGI and WSGI middleware."""
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        key: Optional[Union[str, Sequence[str]]],
+        compile_rule: Callable,
+    ):
+        """
+        Args:
+            app: Application to protect.
+            limiter: Rate limiter deciding the requests. A keyed limiter if
+                key is given, else one limiter shared by all requests.
+            key: Key rule or rules, see the module documentation, or None to
+                limit all requests together.
+            compile_rule: Compiles one rule for the interface.
+        """
+        if isinstance(limiter, LeakyBucket):
+            raise ValueError(
+                "LeakyBucket queues requests for its handler, "
+                "use KeyedLeakyBucket to limit requests"
+            )
+        self.app = app
+        self._limiter = limiter
+        if key is None:
+            self._extract = None
+        else:
+            rules = [key] if isinstance(key, str) else list(key)
+            if not rules:
+                raise ValueError("At least one key rule is required")
+            self._extract = _chain([compile_rule(rule) for rule in rules])
+        limit = _quota(limiter.get_rate_limit())
+        self._headers = [
+            ("Content-Type", "text/plain"),
+            ("Content-Length", str(len(_BODY))),
+            ("RateLimit-Limit", str(limit)),
+            ("RateLimit-Remaining", "0"),
+        ]
+
+    def _check(self, request) -> Decision:
+        if self._extract is None:
+            return self._limiter.check()
+        return self._limiter.check(self._extract(request))
+
+
+def _retry_after(decision: Decision) -> Optional[str]:
+    """Whole seconds to announce in Retry-After, None if unknown or never."""
+    wait = decision.retry_after
+    if wait is None or wait == math.inf:
+        return None
+    return str(max(1, math.ceil(wait)))
+
+
+class ASGIMiddleware(_Middleware):
+    """Rate limit the HTTP requests of an ASGI application.
+
+    Other scope types, e.g. ``lifespan`` and ``websocket``, pass through.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        key: Optional[Union[str, Sequence[str]]] = None,
+    ):
+        super().__init__(app, limiter, key, _compile_asgi)
+        self._headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in self._headers
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        decision = self._check(scope)
+        if decision.allowed:
+            return await self.app(scope, receive, send)
+        headers = self._headers
+        seconds = _retry_after(decision)
+        if seconds is not None:
+            seconds = seconds.encode("latin-1")
+            headers = headers + [
+                (b"ratelimit-reset", seconds),
+                (b"retry-after", seconds),
+            ]
+        await send({"type": "http.response.start", "status": 429, "headers": headers})
+        await send({"type": "http.response.body", "body": _BODY})
+
+
+class WSGIMiddleware(_Middleware):
+    """Rate limit the requests of a WSGI application."""
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        key: Optional[Union[str, Sequence[str]]] = None,
+    ):
+        super().__init__(app, limiter, key, _compile_wsgi)
+
+    def __call__(self, environ, start_response):
+        decision = self._check(environ)
+        if decision.allowed:
+            return self.app(environ, start_response)
+        headers = self._headers
+        seconds = _retry_after(decision)
+        if seconds is not None:
+            headers = headers + [
+                ("RateLimit-Reset", seconds),
+                ("Retry-After", seconds),
+            ]
+        start_response("429 Too Many Requests", headers)
+        return [_BODY]
+
+
+if __name__ == "__main__":
+    from wsgiref.util import setup_testing_defaults
+
+    from src.rate_limiting.keyed_store import KeyedGCRA
+
+    def hello(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"Hello"]
+
+    app = WSGIMiddleware(hello, KeyedGCRA(2, 1), key=["header:X-API-Key", "ip"])
+    for i in range(4):
+        environ = {"HTTP_X_API_KEY": "client-a"}
+        setup_testing_defaults(environ)
+        app(environ, lambda status, headers: print(i, status, headers))
@@ -1,7 +1,29 @@
+import asyncio
+import math
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import NamedTuple, Optional
+
+from src.rate_limiting.clock import Clock
+
+
+class Decision(NamedTuple):
+    """Outcome of `RateLimiter.check`."""
+
+    allowed: bool
+    retry_after: Optional[float]
 
 
 class RateLimiter(ABC):
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Args:
+            clock: Callable returning the current time in seconds, see
+                `src.rate_limiting.clock`. Defaults to `time.monotonic`.
+        """
+        self._clock = time.monotonic if clock is None else clock
+
     @abstractmethod
     def allow_request(self, *args, **kwargs) -> bool:
         """
@@ -32,3 +54,111 @@ class RateLimiter(ABC):
             tuple: tuple that captures the number of requests allowed for time interval/window.
         """
         pass
+
+    def check(self, *args) -> Decision:
+        """
+        Decide a request like `allow_request`, also telling when to retry.
+
+        Args:
+            *args: Passed to `allow_request`, e.g. the key and cost.
+
+        Returns:
+            Decision: Whether the request is allowed and, if it is denied, the
+                seconds until a request like it can be admitted: infinite if
+                it never can, None if the limiter cannot tell.
+        """
+        if self.allow_request(*args):
+            return Decision(True, 0.0)
+        try:
+            return Decision(False, self._wait_time(*args))
+        except NotImplementedError:
+            return Decision(False, None)
+        except ValueError:
+            return Decision(False, math.inf)
+
+    def _fill_level(self) -> Optional[float]:
+        """
+        Fill level as of the last decision for metrics, e.g. tokens left or
+        requests counted in the window, without allocating. None if the
+        algorithm does not report one.
+        """
+        return None
+
+    def _wait_time(self, cost: int = 1) -> float:
+        """
+        Seconds until a request of the given cost can be admitted, 0 if it can
+        be admitted now. Algorithms using `AcquireMixin` override this.
+
+        Raises:
+            ValueError: If the cost can never be admitted.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support acquire")
+
+    def _refund(self, cost: int = 1) -> None:
+        """
+        Undo the admission of a request of the given cost, right after it was
+        admitted. Algorithms usable in a `CompositeLimiter` override this.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support refunds")
+
+
+class AcquireMixin:
+    """Async `acquire` for single-stream limiters implementing `_wait_time`.
+
+    Listed before `RateLimiter` in the bases of a limiter whose
+    ``allow_request`` takes the cost as its only argument. Keyed, stored and
+    queueing limiters decide differently and do not offer `acquire`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = deque()
+
+    async def acquire(self, cost: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a request can be admitted, then admit it.
+
+        Waiters are served in FIFO order. Only the waiter at the head of the
+        queue computes how long until its request fits and sleeps exactly that
+        long; the others wait for their turn without waking up, so a long queue
+        does not cause a thundering herd. Cancelling a waiter removes it from
+        the queue without consuming capacity.
+
+        Args:
+            cost: Cost of the request, e.g. tokens needed.
+            timeout: Maximum number of seconds to wait, or None to wait
+                indefinitely.
+
+        Returns:
+            bool: True once the request is admitted, False if it cannot be
+                admitted within timeout.
+        """
+        waiters = self._waiters
+        if not waiters and self.allow_request(cost):
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        turn = loop.create_future()
+        waiters.append(turn)
+        if len(waiters) == 1:
+            turn.set_result(None)
+        try:
+            if not turn.done():
+                if deadline is None:
+                    await turn
+                else:
+                    done, _ = await asyncio.wait([turn], timeout=timeout)
+                    if not done:
+                        return False
+            while not self.allow_request(cost):
+                delay = self._wait_time(cost)
+                if deadline is not None and loop.time() + delay > deadline:
+                    return False
+                await asyncio.sleep(delay)
+            return True
+        finally:
+            was_head = waiters[0] is turn
+            waiters.remove(turn)
+            # A cancelled next waiter passes the turn on when its task resumes
+            if was_head and waiters and not waiters[0].done():
+                waiters[0].set_result(None)
@@ -0,0 +1,198 @@
+"""In-process stand-in for a Redis server, for tests and benchmarks.
+
+The stand-in speaks the Redis protocol on a local port and implements the few
+commands `RedisStorage` sends. It cannot interpret Lua: a script is accepted
+only if it is one of the limiters' `Script` objects, which it runs through
+their Python version, holding a lock so that scripts run one at a time as on
+a real server.
+"""
+
+import socketserver
+import threading
+from typing import Optional
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.redis_storage import RedisError
+from src.rate_limiting.storage import SCRIPTS, MemoryStorage
+
+
+def _encode_reply(reply) -> bytes:
+    if isinstance(reply, RedisError):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode_reply(r) for r in reply)
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+def _parse_command(buffer: bytes, position: int):
+    """Parse a RESP array of bulk strings starting at position.
+
+    Returns:
+        tuple: The arguments and the position after them, or None if the
+            buffer does not hold the whole command yet.
+    """
+    end = buffer.find(b"\r\n", position)
+    if end < 0:
+        return None
+    args = []
+    for _ in range(int(buffer[position + 1 : end])):
+        header = end + 2
+        end = buffer.find(b"\r\n", header)
+        if end < 0:
+            return None
+        start = end + 2
+        end = start + int(buffer[header + 1 : end])
+        if len(buffer) < end + 2:
+            return None
+        args.append(buffer[start:end])
+    return args, end + 2
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        server = self.server.stand_in
+        buffer = b""
+        while True:
+            data = self.request.recv(1 << 16)
+            if not data:
+                return
+            buffer += data
+            # Answer every complete command received, pipelined ones together
+            replies = []
+            position = 0
+            while True:
+                parsed = _parse_command(buffer, position)
+                if parsed is None:
+                    break
+                args, position = parsed
+                replies.append(_encode_reply(server.execute(*args)))
+            buffer = buffer[position:]
+            if replies:
+                self.request.sendall(b"".join(replies))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInRedisServer:
+    """Redis stand-in listening on a local port.
+
+    Use it as a context manager, or call `start` and `stop`::
+
+        with StandInRedisServer() as server:
+            storage = RedisStorage(*server.address)
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Args:
+            clock: Clock the server reads the time from, in seconds since the
+                epoch as returned by ``TIME``. Defaults to `time.monotonic`,
+                which suffices as long as all clients use the same server.
+        """
+        self.storage = MemoryStorage(clock)
+        self._clock = self.storage._clock
+        self._loaded = set()
+        self._server = None
+        self._thread = None
+        self.commands = 0
+
+    @property
+    def address(self) -> tuple:
+        """Host and port the server listens on."""
+        return self._server.server_address[:2]
+
+    def start(self) -> "StandInRedisServer":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "StandInRedisServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def execute(self, name: bytes, *args: bytes):
+        """Execute one command and return its reply."""
+        self.commands += 1
+        name = name.upper()
+        if name == b"PING":
+            return "PONG"
+        if name == b"TIME":
+            now = self._clock()
+            return [b"%d" % int(now), b"%d" % int(now % 1 * 1_000_000)]
+        if name == b"FLUSHALL":
+            self.storage._records.clear()
+            return "OK"
+        if name == b"SCRIPT":
+            return self._script(args[0].upper(), *args[1:])
+        if name == b"EVALSHA":
+            return self._evaluate(args[0].decode(), *args[1:])
+        if name == b"EVAL":
+            script = self._known(args[0])
+            if isinstance(script, RedisError):
+                return script
+            self._loaded.add(script.sha)
+            return self._evaluate(script.sha, *args[1:])
+        return RedisError(f"ERR unknown command '{name.decode()}'")
+
+    def _known(self, lua: bytes):
+        for script in SCRIPTS.values():
+            if script.lua.encode() == lua:
+                return script
+        return RedisError("ERR the stand-in server only runs the limiters' scripts")
+
+    def _script(self, subcommand: bytes, *args: bytes):
+        if subcommand == b"LOAD":
+            script = self._known(args[0])
+            if isinstance(script, RedisError):
+                return script
+            self._loaded.add(script.sha)
+            return script.sha.encode()
+        if subcommand == b"EXISTS":
+            return [sha.decode() in self._loaded for sha in args]
+        if subcommand == b"FLUSH":
+            self._loaded.clear()
+            return "OK"
+        return RedisError(f"ERR unknown subcommand '{subcommand.decode()}'")
+
+    def _evaluate(self, sha: str, numkeys: bytes, key: bytes, *args: bytes):
+        if sha not in self._loaded:
+            return RedisError("NOSCRIPT No matching script. Please use EVAL.")
+        if int(numkeys) != 1:
+            return RedisError("ERR the limiters' scripts take exactly one key")
+        script = SCRIPTS[sha]
+        values = tuple(float(arg) for arg in args)
+        return int(self.storage.evaluate(script, key.decode(), values))
+
+
+if __name__ == "__main__":
+    from src.rate_limiting.redis_storage import RedisStorage
+    from src.rate_limiting.storage import StoredTokenBucket
+
+    with StandInRedisServer() as server:
+        storage = RedisStorage(*server.address)
+        gateways = [StoredTokenBucket(3, 1, storage=storage) for _ in range(2)]
+        for i in range(6):
+            allowed = gateways[i % 2].allow_request("client")
+            outcome = "forwarded" if allowed else "dropped"
+            print(f"Request {i} via gateway {i % 2}: {outcome}")
+        storage.close()
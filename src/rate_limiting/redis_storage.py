@@ -0,0 +1,190 @@
+"""Storage backend running the limiters' scripts on a Redis server.
+
+The client speaks the Redis protocol (RESP) directly over pooled sockets, so
+it needs no third-party package. Every decision is one ``EVALSHA`` of the
+algorithm's Lua script, which Redis runs atomically; batches of decisions are
+pipelined, i.e. written in one go before reading the replies, so a batch
+costs a single round trip.
+"""
+
+import socket
+import threading
+from typing import Optional, Sequence
+
+from src.rate_limiting.storage import Script, Storage
+
+
+class RedisError(Exception):
+    """Error reply of the Redis server."""
+
+
+def encode_command(*args) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """Read one RESP reply from a buffered binary stream.
+
+    Error replies are returned as `RedisError` instances rather than raised,
+    so that one failed command does not hide the replies of a pipeline.
+    """
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, value = line[:1], line[1:-2]
+    if kind == b"+":
+        return value
+    if kind == b"-":
+        return RedisError(value.decode())
+    if kind == b":":
+        return int(value)
+    if kind == b"$":
+        length = int(value)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(value)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RedisError(f"Unexpected reply {line!r}")
+
+
+class _Connection:
+    def __init__(self, host: str, port: int, timeout: Optional[float]):
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+
+    def execute(self, commands: Sequence[tuple]) -> list:
+        """Send all commands at once, then read their replies in order."""
+        self._socket.sendall(b"".join(encode_command(*c) for c in commands))
+        return [read_reply(self._reader) for _ in commands]
+
+    def close(self) -> None:
+        self._reader.close()
+        self._socket.close()
+
+
+class ConnectionPool:
+    """Pool of at most ``size`` connections, opened on demand and reused.
+
+    A thread borrows a connection for one round trip, so connections are not
+    tied to threads and ``size`` bounds the concurrent round trips.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        size: int = 8,
+        timeout: Optional[float] = None,
+    ):
+        if size <= 0:
+            raise ValueError("Pool size must be positive")
+        self.host = host
+        self.port = port
+        self._timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(size)
+
+    def execute(self, commands: Sequence[tuple]) -> list:
+        """Run commands as one pipeline on a pooled connection."""
+        self._available.acquire()
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = _Connection(self.host, self.port, self._timeout)
+            try:
+                replies = connection.execute(commands)
+            except (OSError, ConnectionError):
+                # The stream may be mid-reply, so the connection cannot be reused
+                connection.close()
+                raise
+            with self._lock:
+                self._idle.append(connection)
+            return replies
+        finally:
+            self._available.release()
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class RedisStorage(Storage):
+    """Storage on a Redis server, shared by every client connected to it.
+
+    Scripts are called by their SHA1 and loaded into the server's script
+    cache the first time it reports them missing, e.g. after a restart.
+    Time is read from the server, so clients need not have synchronized
+    clocks. Requires Redis 5 or later.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        pool_size: int = 8,
+        timeout: Optional[float] = None,
+        pipeline_size: int = 1_000,
+    ):
+        """
+        Args:
+            host: Address of the Redis server.
+            port: Port of the Redis server.
+            pool_size: Maximum number of connections.
+            timeout: Socket timeout in seconds, None to block.
+            pipeline_size: Maximum number of commands sent in one pipeline by
+                `evaluate_many`, bounding the memory of a round trip.
+        """
+        if pipeline_size <= 0:
+            raise ValueError("Pipeline size must be positive")
+        self.pool = ConnectionPool(host, port, pool_size, timeout)
+        self._pipeline_size = pipeline_size
+
+    def evaluate(self, script: Script, key: str, args: tuple) -> bool:
+        return self.evaluate_many(script, [(key, args)])[0]
+
+    def evaluate_many(self, script: Script, calls: Sequence[tuple]) -> list:
+        results = []
+        size = self._pipeline_size
+        for start in range(0, len(calls), size):
+            results.extend(self._pipeline(script, calls[start : start + size]))
+        return results
+
+    def _pipeline(self, script: Script, calls: Sequence[tuple]) -> list:
+        commands = [
+            ("EVALSHA", script.sha, 1, key) + tuple(args) for key, args in calls
+        ]
+        replies = self.pool.execute(commands)
+        missing = [
+            i
+            for i, reply in enumerate(replies)
+            if isinstance(reply, RedisError) and str(reply).startswith("NOSCRIPT")
+        ]
+        if missing:
+            # Commands that failed with NOSCRIPT did not run, so rerun them
+            retry = [("SCRIPT", "LOAD", script.lua)] + [commands[i] for i in missing]
+            for i, reply in zip(missing, self.pool.execute(retry)[1:]):
+                replies[i] = reply
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return [reply == 1 for reply in replies]
+
+    def close(self) -> None:
+        self.pool.close()
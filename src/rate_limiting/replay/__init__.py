@@ -0,0 +1,8 @@
+"""Replay timestamped access logs against candidate rate limits.
+
+Run ``python -m src.rate_limiting.replay --help`` from the repository root.
+Each configuration decides the logged requests with a keyed limiter driven by
+a `ManualClock` set to the logged times, so a day of traffic replays in
+minutes without sleeping. The log is streamed and every per-key structure is
+bounded, so memory does not grow with the size of the log.
+"""
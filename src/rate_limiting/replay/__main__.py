@@ -0,0 +1,109 @@
+"""Command line entry point of the replay tool."""
+
+import argparse
+import json
+import os
+import sys
+
+from src.rate_limiting.replay.runner import ALGORITHMS, parse_config, replay_parallel
+
+EXAMPLE = """\
+example:
+  python -m src.rate_limiting.replay access.log.gz --key-field 2 \\
+      --config "token_bucket:capacity=20|50,rate=1|2" \\
+      --config "sliding_window_counter:capacity=60,window_size=60,bucket_count=6"
+
+algorithms and their parameters:
+""" + "\n".join(
+    f"  {name}: {', '.join(parameters)}" for name, (_, parameters) in ALGORITHMS.items()
+)
+
+
+def summary(report: dict) -> list:
+    """One line per configuration for the terminal."""
+    lines = [
+        f"{'admitted':>9} {'denied':>8} {'keys':>8} {'limited':>8}"
+        f" {'burst p99':>9} {'admitted p99':>12}  configuration"
+    ]
+    for result in report["results"]:
+        config = dict(result["config"])
+        name = config.pop("algorithm")
+        parameters = ",".join(f"{k}={v}" for k, v in config.items())
+        lines.append(
+            f"{result['admit_rate']:9.2%} {result['deny_rate']:8.2%}"
+            f" {result['keys']:8,} {result['denied_keys']:8,}"
+            f" {result['burst_size']['p99']:9,} "
+            f"{result['admitted_per_burst']['p99']:12,}  {name}:{parameters}"
+        )
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.rate_limiting.replay",
+        description="Replay a timestamped access log against rate limits.",
+        epilog=EXAMPLE,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("trace", help="Access log, gzip-compressed if .gz.")
+    parser.add_argument(
+        "--config",
+        action="append",
+        required=True,
+        help="ALGORITHM:name=value,... where value may be v1|v2|...",
+    )
+    parser.add_argument("--time-field", type=int, default=0)
+    parser.add_argument("--key-field", type=int, default=1)
+    parser.add_argument("--delimiter", help="Field separator, default whitespace.")
+    parser.add_argument(
+        "--iso-time", action="store_true", help="Timestamps are ISO 8601."
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-keys", type=int, default=100_000)
+    parser.add_argument(
+        "--burst-gap",
+        type=float,
+        default=1.0,
+        help="Seconds of silence ending a burst of a key.",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Most denied keys.")
+    parser.add_argument(
+        "--deny-cache",
+        action="store_true",
+        help="Deny limited keys from a cache, faster on attack traffic.",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args(argv)
+
+    try:
+        configs = [c for text in args.config for c in parse_config(text)]
+    except ValueError as e:
+        parser.error(str(e))
+    report = replay_parallel(
+        args.trace,
+        configs,
+        workers=args.workers,
+        max_keys=args.max_keys,
+        burst_gap=args.burst_gap,
+        top=args.top,
+        deny_cache=args.deny_cache,
+        time_field=args.time_field,
+        key_field=args.key_field,
+        delimiter=args.delimiter,
+        iso_time=args.iso_time,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+    print("\n".join(summary(report)))
+    if report["skipped_lines"] or report["out_of_order"]:
+        print(
+            f"{report['skipped_lines']:,} lines skipped,"
+            f" {report['out_of_order']:,} requests out of order",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Trace reading, configurations and statistics of the replay tool.
+
+A trace is a text file, optionally gzip-compressed, with one request per
+line: a timestamp in seconds since the epoch (or ISO 8601 with
+``iso_time``) and a key such as a client IP, in configurable fields. Lines
+that do not parse are skipped and counted.
+
+Configurations name an algorithm and its parameters, e.g.
+``"sliding_window_counter:capacity=100,window_size=60,bucket_count=6"``. A
+parameter may list alternatives separated by ``|``, and the configuration
+then expands to every combination, so ``"token_bucket:capacity=10|100,
+rate=1|5"`` is four configurations.
+"""
+
+import bisect
+import gzip
+import heapq
+import itertools
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import (
+    KeyedFixedWindow,
+    KeyedGCRA,
+    KeyedLeakyBucket,
+    KeyedSlidingWindowCounter,
+    KeyedSlidingWindowLog,
+    KeyedTokenBucket,
+)
+
+# name -> (keyed limiter, accepted parameters)
+ALGORITHMS = {
+    "token_bucket": (KeyedTokenBucket, ("capacity", "rate")),
+    "leaky_bucket": (KeyedLeakyBucket, ("bucket_size", "outflow_rate")),
+    "fixed_window": (KeyedFixedWindow, ("capacity", "window_size")),
+    "sliding_window_log": (
+        KeyedSlidingWindowLog,
+        ("capacity", "window_size", "precision"),
+    ),
+    "sliding_window_counter": (
+        KeyedSlidingWindowCounter,
+        ("capacity", "window_size", "bucket_count", "weighted"),
+    ),
+    "gcra": (KeyedGCRA, ("capacity", "rate")),
+}
+
+PERCENTILES = (50, 90, 99)
+
+
+def _value(text: str):
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_config(text: str) -> list:
+    """Expand a configuration string into one dict per combination.
+
+    Returns:
+        list: Dicts with the ``algorithm`` and its parameters.
+    """
+    algorithm, _, parameters = text.partition(":")
+    algorithm = algorithm.strip()
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}")
+    accepted = ALGORITHMS[algorithm][1]
+    names = []
+    alternatives = []
+    for parameter in filter(None, (p.strip() for p in parameters.split(","))):
+        name, _, values = parameter.partition("=")
+        name = name.strip()
+        if name not in accepted:
+            raise ValueError(f"{algorithm} takes {', '.join(accepted)}, not {name!r}")
+        names.append(name)
+        alternatives.append([_value(value.strip()) for value in values.split("|")])
+    return [
+        {"algorithm": algorithm, **dict(zip(names, combination))}
+        for combination in itertools.product(*alternatives)
+    ]
+
+
+def read_trace(
+    path: str,
+    time_field: int = 0,
+    key_field: int = 1,
+    delimiter: Optional[str] = None,
+    iso_time: bool = False,
+    skipped: Optional[list] = None,
+) -> Iterator[tuple]:
+    """Stream the (timestamp, key) pairs of a trace file.
+
+    Args:
+        path: Trace file, gzip-compressed if it ends in ``.gz``.
+        time_field: Index of the timestamp among the fields of a line.
+        key_field: Index of the key among the fields of a line.
+        delimiter: Field separator, None for runs of whitespace.
+        iso_time: Timestamps are ISO 8601 instead of seconds since the epoch.
+        skipped: One-element list counting the lines that do not parse.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    last_field = max(time_field, key_field)
+    with opener(path, "rt", encoding="utf-8", errors="replace") as lines:
+        for line in lines:
+            fields = line.rstrip("\r\n").split(delimiter)
+            if len(fields) <= last_field:
+                if skipped is not None and line.strip():
+                    skipped[0] += 1
+                continue
+            text = fields[time_field]
+            try:
+                timestamp = (
+                    datetime.fromisoformat(text).timestamp()
+                    if iso_time
+                    else float(text)
+                )
+            except ValueError:
+                if skipped is not None:
+                    skipped[0] += 1
+                continue
+            yield timestamp, fields[key_field]
+
+
+def _percentiles(histogram: Counter) -> dict:
+    """Percentiles and maximum of the values counted by histogram."""
+    values = sorted(histogram)
+    cumulative = list(itertools.accumulate(histogram[value] for value in values))
+    total = cumulative[-1] if values else 0
+    summary = {"count": total}
+    for percentile in PERCENTILES:
+        index = bisect.bisect_left(cumulative, percentile / 100 * total)
+        summary[f"p{percentile}"] = values[index] if values else 0
+    summary["max"] = values[-1] if values else 0
+    return summary
+
+
+class ReplayStats:
+    """Admission statistics of one configuration.
+
+    Requests of a key less than ``burst_gap`` seconds apart form a burst. The
+    statistics of the ``max_keys`` most recently seen keys are kept per key;
+    when a key is dropped to make room, its statistics are folded into the
+    totals, so keys active again later are counted twice. Only the ``top``
+    keys with the most denials are reported individually.
+    """
+
+    def __init__(self, burst_gap: float, max_keys: int, top: int):
+        self.requests = 0
+        self.admitted = 0
+        self.bursts = Counter()
+        self.admitted_per_burst = Counter()
+        self.keys = 0
+        self.denied_keys = 0
+        self._burst_gap = burst_gap
+        self._max_keys = max_keys
+        self._top = top
+        self._most_denied = []
+        # key -> [requests, denied, last seen, burst size, burst admitted]
+        self._active = OrderedDict()
+
+    def add(self, key: str, now: float, allowed: bool) -> None:
+        self.requests += 1
+        self.admitted += allowed
+        active = self._active
+        record = active.get(key)
+        if record is None:
+            if len(active) >= self._max_keys:
+                self._retire(*active.popitem(last=False))
+            active[key] = [1, int(not allowed), now, 1, int(allowed)]
+            return
+        active.move_to_end(key)
+        if now - record[2] > self._burst_gap:
+            self.bursts[record[3]] += 1
+            self.admitted_per_burst[record[4]] += 1
+            record[3] = record[4] = 0
+        record[0] += 1
+        record[1] += not allowed
+        record[2] = now
+        record[3] += 1
+        record[4] += allowed
+
+    def _retire(self, key: str, record: list) -> None:
+        requests, denied, _, burst, burst_admitted = record
+        self.bursts[burst] += 1
+        self.admitted_per_burst[burst_admitted] += 1
+        self.keys += 1
+        if denied:
+            self.denied_keys += 1
+            entry = (denied, requests, key)
+            if len(self._most_denied) < self._top:
+                heapq.heappush(self._most_denied, entry)
+            elif self._top:
+                heapq.heappushpop(self._most_denied, entry)
+
+    def report(self) -> dict:
+        """Fold the remaining keys in and return the statistics."""
+        while self._active:
+            self._retire(*self._active.popitem(last=False))
+        denied = self.requests - self.admitted
+        return {
+            "requests": self.requests,
+            "admitted": self.admitted,
+            "denied": denied,
+            "admit_rate": self.admitted / self.requests if self.requests else 0.0,
+            "deny_rate": denied / self.requests if self.requests else 0.0,
+            "keys": self.keys,
+            "denied_keys": self.denied_keys,
+            "burst_size": _percentiles(self.bursts),
+            "admitted_per_burst": _percentiles(self.admitted_per_burst),
+            "most_denied_keys": [
+                {"key": key, "requests": requests, "denied": denied}
+                for denied, requests, key in sorted(self._most_denied, reverse=True)
+            ],
+        }
+
+
+def build_limiter(
+    config: dict, clock: ManualClock, max_keys: int, deny_cache: bool = False
+):
+    """Create the keyed limiter of a configuration."""
+    limiter_type, _ = ALGORITHMS[config["algorithm"]]
+    parameters = {k: v for k, v in config.items() if k != "algorithm"}
+    return limiter_type(
+        **parameters, clock=clock, max_keys=max_keys, deny_cache=deny_cache
+    )
+
+
+def replay(
+    path: str,
+    configs: list,
+    max_keys: int = 100_000,
+    burst_gap: float = 1.0,
+    top: int = 10,
+    deny_cache: bool = False,
+    **trace_options,
+) -> dict:
+    """Replay a trace against configurations in one pass.
+
+    Args:
+        path: Trace file, see `read_trace`.
+        configs: Configuration dicts, see `parse_config`.
+        max_keys: Keys held by each limiter and its statistics.
+        burst_gap: Seconds between two requests of a key that end a burst.
+        top: Number of most denied keys to report per configuration.
+        deny_cache: Create the limiters with their deny cache, faster on
+            traces dominated by denied keys.
+        **trace_options: Passed to `read_trace`.
+
+    Returns:
+        dict: ``results`` per configuration, in order, and trace statistics.
+    """
+    clock = ManualClock()
+    stats = [ReplayStats(burst_gap, max_keys, top) for _ in configs]
+    deciders = [
+        (build_limiter(config, clock, max_keys, deny_cache).allow_request, tally.add)
+        for config, tally in zip(configs, stats)
+    ]
+    skipped = [0]
+    out_of_order = 0
+    now = None
+    for timestamp, key in read_trace(path, skipped=skipped, **trace_options):
+        if now is None or timestamp >= now:
+            now = timestamp
+        else:
+            # Logs interleave slightly out of order, keep the clock monotonic
+            out_of_order += 1
+        clock.set(now)
+        for allow, add in deciders:
+            add(key, now, allow(key))
+    return {
+        "results": [
+            {"config": config, **tally.report()}
+            for config, tally in zip(configs, stats)
+        ],
+        "skipped_lines": skipped[0],
+        "out_of_order": out_of_order,
+    }
+
+
+def replay_parallel(path: str, configs: list, workers: int = 1, **options) -> dict:
+    """Replay a trace against configurations split over worker processes.
+
+    Each worker streams the trace itself and decides its share of the
+    configurations in one pass, so the trace is parsed once per worker and
+    never held in memory.
+
+    Args:
+        path: Trace file, see `read_trace`.
+        configs: Configuration dicts, see `parse_config`.
+        workers: Number of processes, 1 to replay in this process.
+        **options: Passed to `replay`.
+
+    Returns:
+        dict: Like `replay`, results in the order of configs.
+    """
+    if workers <= 0:
+        raise ValueError("workers must be a positive integer")
+    workers = min(workers, len(configs)) or 1
+    if workers == 1:
+        return replay(path, configs, **options)
+    shares = [configs[worker::workers] for worker in range(workers)]
+    with ProcessPoolExecutor(workers) as pool:
+        parts = list(pool.map(_replay_share, [(path, s, options) for s in shares]))
+    results = [None] * len(configs)
+    for worker, part in enumerate(parts):
+        results[worker::workers] = part["results"]
+    return {
+        "results": results,
+        "skipped_lines": parts[0]["skipped_lines"],
+        "out_of_order": parts[0]["out_of_order"],
+    }
+
+
+def _replay_share(arguments: tuple) -> dict:
+    path, configs, options = arguments
+    return replay(path, configs, **options)
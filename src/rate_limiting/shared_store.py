@@ -0,0 +1,293 @@
+"""Keyed limiters whose state lives in shared memory, for pre-fork servers.
+
+Worker processes of a pre-fork server each hold private limiters, so the
+effective limit is the configured one times the number of workers. The stores
+in this module keep their records in a `multiprocessing.shared_memory` block
+instead: create the store in the parent before forking, or pass it to
+`multiprocessing.Process` when spawning, and all workers share one limit
+without an external service.
+
+The block is a fixed-size hash table of 32-byte records, split into
+``stripes`` regions that are each guarded by their own process-shared lock.
+A key hashes to a region and a start slot in it and is found by linear
+probing within the region.
+"""
+
+import hashlib
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, Union
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.gcra import _SLACK as _GCRA_SLACK
+from src.rate_limiting.rate_limit_abc import RateLimiter
+
+# Key hash (0 marks an empty slot), time of the last request and two
+# algorithm-specific values.
+_RECORD = struct.Struct("<Qddd")
+_HASH = struct.Struct("<Q")
+_LAST = struct.Struct("<d")
+
+
+class SharedKeyedStore(RateLimiter):
+    """Base class for keyed limiters sharing their records between processes.
+
+    Records of keys idle for longer than the algorithm's idle horizon are
+    reused for new keys. If a region has neither an empty nor an idle slot
+    left, its least recently used record is replaced, which gives that key a
+    fresh limit; size ``slots`` for the number of keys active at once.
+
+    The default clock, `time.monotonic`, is system-wide, so processes on the
+    same host agree on it. Subclasses implement ``_idle_horizon``,
+    ``_new_record`` and ``_decide``, and name the record's values in
+    ``_fields``.
+    """
+
+    _fields = ()
+
+    def __init__(
+        self,
+        slots: int = 4_096,
+        stripes: int = 16,
+        clock: Optional[Clock] = None,
+        name: Optional[str] = None,
+        context=None,
+    ):
+        """
+        Args:
+            slots: Number of records, a multiple of stripes.
+            stripes: Number of independently locked regions.
+            clock: Callable returning the current time in seconds. It must
+                agree between processes.
+            name: Name of the shared memory block, chosen by the system if
+                None.
+            context: `multiprocessing` context the worker processes are
+                started with, the default context if None.
+        """
+        super().__init__(clock)
+        if slots <= 0 or stripes <= 0 or slots % stripes:
+            raise ValueError("Slots must be a positive multiple of stripes")
+        self._slots = slots
+        self._stripes = stripes
+        self._region = slots // stripes
+        self._memory = shared_memory.SharedMemory(
+            name, create=True, size=slots * _RECORD.size
+        )
+        self._buffer = self._memory.buf
+        context = multiprocessing if context is None else context
+        self._locks = [context.Lock() for _ in range(stripes)]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_buffer"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._buffer = self._memory.buf
+
+    @staticmethod
+    def _key_hash(key: Union[str, bytes]) -> int:
+        """Hash key the same way in every process, never returning 0."""
+        if isinstance(key, str):
+            key = key.encode()
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return _HASH.unpack(digest)[0] or 1
+
+    def _find(self, key_hash: int, now: float) -> int:
+        """Return the offset of the key's record or of the slot to reuse."""
+        stripe = key_hash % self._stripes
+        region = self._region
+        first = stripe * region
+        start = key_hash // self._stripes % region
+        buffer = self._buffer
+        horizon = self._idle_horizon()
+        idle = None
+        oldest = None
+        oldest_last = None
+        for probe in range(region):
+            offset = (first + (start + probe) % region) * _RECORD.size
+            slot_hash = _HASH.unpack_from(buffer, offset)[0]
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0:
+                # Keys are never removed, so the key is not further along
+                return offset if idle is None else idle
+            if idle is None:
+                last = _LAST.unpack_from(buffer, offset + 8)[0]
+                if now - last > horizon:
+                    idle = offset
+                elif oldest_last is None or last < oldest_last:
+                    oldest, oldest_last = offset, last
+        return oldest if idle is None else idle
+
+    def allow_request(self, key: Union[str, bytes], *args) -> bool:
+        """
+        Decide a request for key, see the subclass for further arguments.
+
+        Returns:
+            bool: True if request is allowed, False otherwise.
+        """
+        key_hash = self._key_hash(key)
+        buffer = self._buffer
+        with self._locks[key_hash % self._stripes]:
+            now = self._clock()
+            offset = self._find(key_hash, now)
+            slot_hash, last, first, second = _RECORD.unpack_from(buffer, offset)
+            if slot_hash != key_hash:
+                last = now
+                first, second = self._new_record(now)
+            allowed, first, second = self._decide(now, last, first, second, *args)
+            _RECORD.pack_into(buffer, offset, key_hash, now, first, second)
+        return allowed
+
+    def _idle_horizon(self) -> float:
+        """Seconds after which an untouched record equals a new one."""
+        raise NotImplementedError
+
+    def _new_record(self, now: float) -> tuple:
+        raise NotImplementedError
+
+    def _decide(
+        self, now: float, last: float, first: float, second: float, *args
+    ) -> tuple:
+        """Return (allowed, first, second) with the record's updated values."""
+        raise NotImplementedError
+
+    def get_state(self) -> dict:
+        return {
+            "name": self._memory.name,
+            "slots": self._slots,
+            "stripes": self._stripes,
+        }
+
+    def get_key_state(self, key: Union[str, bytes]) -> Optional[dict]:
+        """Return the raw record of key, or None if it has none."""
+        key_hash = self._key_hash(key)
+        with self._locks[key_hash % self._stripes]:
+            offset = self._find(key_hash, self._clock())
+            slot_hash, last, first, second = _RECORD.unpack_from(self._buffer, offset)
+        if slot_hash != key_hash:
+            return None
+        return {"last": last, **dict(zip(self._fields, (first, second)))}
+
+    def close(self) -> None:
+        """Detach this process from the shared memory block."""
+        self._buffer.release()
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory block once every process has closed it."""
+        self._memory.unlink()
+
+
+class SharedTokenBucket(SharedKeyedStore):
+    """Token bucket per key shared between processes, see `KeyedTokenBucket`."""
+
+    _fields = ("tokens",)
+
+    def __init__(self, capacity: int, rate: int, **kwargs):
+        """
+        Args:
+            capacity: Maximum number of tokens each key's bucket can hold.
+            rate: Rate (token per second) at which tokens are added.
+            **kwargs: Passed to `SharedKeyedStore`.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive integers")
+        self._capacity = capacity
+        self._rate = rate
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._capacity / self._rate
+
+    def _new_record(self, now: float) -> tuple:
+        return float(self._capacity), 0.0
+
+    def _decide(self, now, last, tokens, unused, tokens_needed=1) -> tuple:
+        """Refill the bucket and take ``tokens_needed`` tokens if available."""
+        tokens = min(self._capacity, tokens + (now - last) * self._rate)
+        if tokens >= tokens_needed:
+            return True, tokens - tokens_needed, unused
+        return False, tokens, unused
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, 1
+
+
+class SharedGCRA(SharedKeyedStore):
+    """GCRA per key shared between processes, see `KeyedGCRA`."""
+
+    _fields = ("tat",)
+
+    def __init__(self, capacity: int, rate: float, **kwargs):
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive")
+        self._capacity = capacity
+        self._rate = rate
+        self._interval = 1 / rate
+        self._tolerance = capacity / rate + _GCRA_SLACK
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._capacity / self._rate
+
+    def _new_record(self, now: float) -> tuple:
+        return now, 0.0
+
+    def _decide(self, now, last, tat, unused, cost=1) -> tuple:
+        pushed = max(tat, now) + cost * self._interval
+        if pushed - now > self._tolerance:
+            return False, tat, unused
+        return True, pushed, unused
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, 1
+
+
+class SharedFixedWindow(SharedKeyedStore):
+    """Fixed window counter per key shared between processes."""
+
+    _fields = ("window_start", "counter")
+
+    def __init__(self, capacity: int, window_size: int, **kwargs):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window_size must be positive integers")
+        self._capacity = capacity
+        self._window_size = window_size
+        super().__init__(**kwargs)
+
+    def _idle_horizon(self) -> float:
+        return self._window_size
+
+    def _new_record(self, now: float) -> tuple:
+        return now, 0.0
+
+    def _decide(self, now, last, window_start, counter, cost=1) -> tuple:
+        if now - window_start > self._window_size:
+            window_start, counter = now, 0.0
+        if counter + cost > self._capacity:
+            return False, window_start, counter
+        return True, window_start, counter + cost
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, self._window_size
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("fork")
+    limiter = SharedFixedWindow(10, 60, context=context)
+
+    def worker(number):
+        admitted = sum(limiter.allow_request("client") for _ in range(10))
+        print(f"Worker {number} admitted {admitted} of 10 requests")
+
+    workers = [context.Process(target=worker, args=(i,)) for i in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    limiter.close()
+    limiter.unlink()
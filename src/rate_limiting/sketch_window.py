@@ -0,0 +1,251 @@
+"""Approximate per-key sliding window counter in fixed memory.
+
+`KeyedSlidingWindowCounter` holds one record per key, which does not scale to
+tens of millions of keys. `SketchSlidingWindow` instead counts the requests of
+all keys in one Count-Min Sketch per bucket of the window: ``depth`` rows of
+``width`` counters, a key being counted in one counter per row chosen by a
+row-specific hash. A running sum of the buckets in the window is kept next to
+them, so a decision reads ``depth`` counters and the expired bucket is
+subtracted once per bucket duration, like `_CounterRing` does for one key.
+
+A key's estimate is the smallest of its counters, which over-counts the key by
+the requests of colliding keys but never under-counts it. With
+``width = ceil(e / epsilon)`` and ``depth = ceil(ln(1 / delta))``, the estimate
+exceeds the true count by at most ``epsilon`` times the requests admitted in
+the window, with probability at least ``1 - delta``. Errors therefore only
+deny keys close to the limit early and never admit a key over it.
+
+The ``heavy_hitters`` keys denied most recently are also counted exactly, in
+a small table evicted in least-recently-used order. Once their requests from
+before they were first denied have left the window, their requests are
+decided without collision error, and the table lists the worst offenders.
+"""
+
+import math
+import operator
+from array import array
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import RateLimiter
+from src.rate_limiting.sliding_window_counter import _CounterRing
+
+_MASK = (1 << 64) - 1
+
+
+class _HeavyHitter(_CounterRing):
+    __slots__ = ("denied",)
+
+    def __init__(self, size: int, head: int):
+        super().__init__(size)
+        self.head = head
+        self.denied = 0
+
+
+class SketchSlidingWindow(RateLimiter):
+    """Sliding window counter per key, approximated by Count-Min Sketches.
+
+    Memory is fixed by ``epsilon``, ``delta`` and ``bucket_count``: about
+    ``4 * (bucket_count + 1) * width * depth`` bytes, whatever the number of
+    keys. Buckets are aligned to the creation time of the limiter. Not
+    thread-safe, see `SynchronizedLimiter`.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        bucket_count: int,
+        epsilon: float = 0.001,
+        delta: float = 0.01,
+        heavy_hitters: int = 0,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            capacity: Maximum number of requests per key in the window.
+            window_size: Size of the window in seconds.
+            bucket_count: Number of buckets the window is divided into.
+            epsilon: Over-count bound, as a fraction of the requests admitted
+                in the window over all keys.
+            delta: Probability that a key's over-count exceeds the bound.
+            heavy_hitters: Number of denied keys to count exactly, 0 for none.
+            clock: Callable returning the current time in seconds.
+        """
+        if capacity <= 0 or window_size <= 0 or bucket_count <= 0:
+            raise ValueError(
+                "Capacity, window size and bucket count must be positive integers"
+            )
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be between 0 and 1")
+        if heavy_hitters < 0:
+            raise ValueError("heavy_hitters must not be negative")
+        super().__init__(clock)
+        self._capacity = capacity
+        self._window_size = window_size
+        self._bucket_count = bucket_count
+        self._bucket_duration = window_size / bucket_count
+        self._epsilon = epsilon
+        self._delta = delta
+        self._width = math.ceil(math.e / epsilon)
+        self._depth = math.ceil(math.log(1 / delta))
+        cells = self._width * self._depth
+        self._zeros = array("I", bytes(4 * cells))
+        self._sketches = [array("I", self._zeros) for _ in range(bucket_count)]
+        self._total = array("I", self._zeros)
+        self._requests = [0] * bucket_count
+        self._window_requests = 0
+        self._max_heavy_hitters = heavy_hitters
+        self._heavy_hitters = OrderedDict()
+        self._start = self._clock()
+        self._head = 0
+
+    def _cells(self, key: Hashable) -> list:
+        """Index of the key's counter in each row, by double hashing."""
+        h = hash(key) & _MASK
+        h = ((h ^ (h >> 33)) * 0xFF51AFD7ED558CCD) & _MASK
+        h ^= h >> 33
+        first = h & 0xFFFFFFFF
+        step = (h >> 32) | 1
+        width = self._width
+        return [
+            row * width + (first + row * step) % width for row in range(self._depth)
+        ]
+
+    def _advance(self, bucket: int) -> None:
+        """Expire the buckets that left the window, see `_CounterRing.advance`."""
+        elapsed = bucket - self._head
+        if elapsed <= 0:
+            return
+        count = self._bucket_count
+        if elapsed >= count:
+            for sketch in self._sketches:
+                sketch[:] = self._zeros
+            self._total[:] = self._zeros
+            self._requests = [0] * count
+            self._window_requests = 0
+        else:
+            total = self._total
+            for b in range(self._head + 1, bucket + 1):
+                slot = b % count
+                expired = self._sketches[slot]
+                if self._requests[slot]:
+                    total = array("I", map(operator.sub, total, expired))
+                    expired[:] = self._zeros
+                    self._window_requests -= self._requests[slot]
+                    self._requests[slot] = 0
+            self._total = total
+        self._head = bucket
+
+    def _count(self, cells: list, bucket: int) -> None:
+        sketch = self._sketches[bucket % self._bucket_count]
+        total = self._total
+        for cell in cells:
+            sketch[cell] += 1
+            total[cell] += 1
+        self._requests[bucket % self._bucket_count] += 1
+        self._window_requests += 1
+
+    def allow_request(self, key: Hashable) -> bool:
+        """
+        Check if request for key can be allowed.
+
+        Args:
+            key: Key identifying the stream, e.g. a client IP.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        bucket = int((self._clock() - self._start) / self._bucket_duration)
+        self._advance(bucket)
+        cells = self._cells(key)
+        hitter = self._heavy_hitters.get(key)
+        if hitter is not None:
+            self._heavy_hitters.move_to_end(key)
+            hitter.advance(bucket, self._bucket_count)
+            if hitter.total < self._capacity:
+                hitter.add(1)
+                self._count(cells, bucket)
+                return True
+            hitter.denied += 1
+            return False
+        total = self._total
+        if min([total[cell] for cell in cells]) < self._capacity:
+            self._count(cells, bucket)
+            return True
+        if self._max_heavy_hitters:
+            self._track(key, cells, bucket)
+        return False
+
+    def _track(self, key: Hashable, cells: list, bucket: int) -> None:
+        """Count a denied key exactly from now on.
+
+        Its earlier requests are only known from the sketches, so each bucket
+        of the window starts at the key's estimate in that bucket, and the
+        count is exact once those buckets expired.
+        """
+        if len(self._heavy_hitters) >= self._max_heavy_hitters:
+            self._heavy_hitters.popitem(last=False)
+        hitter = _HeavyHitter(self._bucket_count, bucket)
+        for slot, sketch in enumerate(self._sketches):
+            hitter.counts[slot] = min(sketch[cell] for cell in cells)
+        hitter.total = sum(hitter.counts)
+        hitter.denied = 1
+        self._heavy_hitters[key] = hitter
+
+    def estimate(self, key: Hashable) -> int:
+        """Requests of key in the window, exact for tracked heavy hitters."""
+        bucket = int((self._clock() - self._start) / self._bucket_duration)
+        self._advance(bucket)
+        hitter = self._heavy_hitters.get(key)
+        if hitter is not None:
+            hitter.advance(bucket, self._bucket_count)
+            return hitter.total
+        total = self._total
+        return min([total[cell] for cell in self._cells(key)])
+
+    def offenders(self, n: int = 10) -> list:
+        """
+        Return the tracked heavy hitters with the most denied requests.
+
+        Returns:
+            list: Up to n tuples of key and number of denied requests.
+        """
+        ranked = sorted(
+            self._heavy_hitters.items(), key=lambda item: item[1].denied, reverse=True
+        )
+        return [(key, hitter.denied) for key, hitter in ranked[:n]]
+
+    def _fill_level(self) -> int:
+        """Requests of all keys admitted in the window."""
+        return self._window_requests
+
+    def get_state(self) -> dict:
+        """Returns state of the rate limiter."""
+        return {
+            "capacity": self._capacity,
+            "window_size": self._window_size,
+            "bucket_count": self._bucket_count,
+            "width": self._width,
+            "depth": self._depth,
+            "epsilon": self._epsilon,
+            "delta": self._delta,
+            "window_requests": self._window_requests,
+            "heavy_hitters": len(self._heavy_hitters),
+            "sketch_bytes": 4 * self._width * self._depth * (self._bucket_count + 1),
+        }
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the rate limit configuration."""
+        return self._capacity, self._window_size
+
+
+if __name__ == "__main__":
+    limiter = SketchSlidingWindow(5, 60, 6, epsilon=0.01, heavy_hitters=10)
+    for i in range(1_000):
+        limiter.allow_request(f"10.0.{i // 256}.{i % 256}")
+    denied = sum(not limiter.allow_request("10.9.9.9") for _ in range(20))
+    print(f"Denied {denied} of 20 requests from one client")
+    print(f"Worst offenders: {limiter.offenders(3)}")
+    print(limiter.get_state())
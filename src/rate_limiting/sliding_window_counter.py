@@ -2,77 +2,199 @@
 
 import random
 import time
-from collections import defaultdict
+from typing import Optional
 
-from src.rate_limiting.rate_limit_abc import RateLimiter
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
 
 
-class SlidingWindowCounter(RateLimiter):
+class _CounterRing:
+    """Fixed-size ring of per-bucket counters with a running window total.
 
-    def __init__(self, capacity: int, window_size: int, bucket_count):
+    ``head`` is the absolute index of the current bucket and bucket ``b`` lives
+    in slot ``b % len(counts)``. ``total`` covers the last ``window_buckets``
+    buckets; a ring with one extra slot also keeps the bucket that just slid
+    out of the window, for weighted interpolation.
+    """
+
+    __slots__ = ("counts", "head", "total")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.head = 0
+        self.total = 0
+
+    def advance(self, bucket: int, window_buckets: int) -> None:
+        """Move the head to bucket, expiring the buckets that left the window.
+
+        Costs one step per elapsed bucket, capped at the ring size, so the work
+        is constant per bucket duration rather than per decision.
+        """
+        elapsed = bucket - self.head
+        if elapsed <= 0:
+            return
+        counts = self.counts
+        size = len(counts)
+        if elapsed >= size:
+            counts[:] = [0] * size
+            self.total = 0
+        else:
+            total = self.total
+            for b in range(self.head + 1, bucket + 1):
+                total -= counts[(b - window_buckets) % size]
+                counts[b % size] = 0
+            self.total = total
+        self.head = bucket
+
+    def add(self, count: int) -> None:
+        """Count requests in the current bucket, negative counts remove them."""
+        self.counts[self.head % len(self.counts)] += count
+        self.total += count
+
+
+def _ring_wait(
+    ring: _CounterRing,
+    now: float,
+    start: float,
+    bucket_duration: float,
+    bucket_count: int,
+    room: float,
+    weighted: bool,
+) -> float:
+    """
+    Seconds until at most room requests are counted in the window of ring.
+
+    Walks forward one bucket at a time from the current one; once
+    ``bucket_count`` buckets have passed every recorded request has expired.
+    """
+    counts = ring.counts
+    size = len(counts)
+    head = int((now - start) / bucket_duration)
+    ring.advance(head, bucket_count)
+    in_window = ring.total
+    for bucket in range(head, head + bucket_count + 1):
+        if bucket > head:
+            in_window -= counts[(bucket - bucket_count) % size]
+        bucket_start = start + bucket * bucket_duration
+        spare = room - in_window
+        if spare < 0:
+            continue
+        previous = 0
+        if weighted and bucket - bucket_count <= head:
+            previous = counts[(bucket - bucket_count) % size]
+        if previous <= spare:
+            return max(bucket_start - now, 0.0)
+        # The previous bucket's weight falls linearly over this bucket.
+        overlap_end = bucket_start + (1 - spare / previous) * bucket_duration
+        return max(overlap_end - now, 0.0)
+    return bucket_count * bucket_duration
+
+
+class SlidingWindowCounter(AcquireMixin, RateLimiter):
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        bucket_count,
+        weighted: bool = False,
+        clock: Optional[Clock] = None,
+    ):
         """
         Initialize the Sliding window counter rate limiter.
         Args:
-            capacity:
-            window_size:
-            bucket_count:
+            capacity: Maximum number of requests allowed in the window.
+            window_size: Size of the window in seconds.
+            bucket_count: Number of buckets the window is divided into.
+            weighted: If True, also count the bucket that just slid out of the
+                window, weighted by how much of it still overlaps the window.
+                With a bucket_count of 1 this is the classic two counter
+                approximation: previous window x overlap + current window.
+            clock: Callable returning the current time in seconds.
         """
         if capacity <= 0 or window_size <= 0 or bucket_count <= 0:
             raise ValueError(
                 f"Capacity {capacity}, window size {window_size} and bucket count {bucket_count} must be positive integers"
             )
+        super().__init__(clock)
         self._capacity = capacity
         self._window_size = window_size
         self._bucket_count = bucket_count
         self._bucket_duration = window_size / bucket_count
-        self._buckets = defaultdict(int)
-        self._last_checked = time.monotonic()
-
-    def _current_bucket(self) -> int:
-        """Determine the current bucket based on the current time."""
-        t = time.monotonic()
-        return t // self._bucket_duration
-
-    def _clean_old_buckets(self):
-        """Remove capacity of buckets that are outside the sliding window."""
-        current_time = time.monotonic()
-        current_bucket_key = self._current_bucket()
-        elapsed_buckets = (current_time - self._last_checked) // self._bucket_duration
-        if elapsed_buckets > self._bucket_count:
-            self._buckets.clear()
-        else:
-            for bucket in list(self._buckets.keys()):
-                if bucket < current_bucket_key - self._bucket_count:
-                    del self._buckets[bucket]
-            self._last_checked = current_time
+        self._weighted = weighted
+        self._ring = _CounterRing(bucket_count + 1 if weighted else bucket_count)
+        self._start = self._clock()
+        self._last_checked = self._start
 
-    def allow_request(self) -> bool:
+    def allow_request(self, cost: int = 1) -> bool:
         """
         Check if request can be allowed.
 
+        Args:
+            cost: Number of requests this request counts as.
+
         Returns:
             bool: True if request should be allowed else False.
 
         """
-        self._clean_old_buckets()
-        total_requests = sum(self._buckets.values())
-        if total_requests < self._capacity:
-            current_bucket = self._current_bucket()
-            self._buckets[current_bucket] += 1
+        now = self._clock()
+        self._last_checked = now
+        position = (now - self._start) / self._bucket_duration
+        bucket = int(position)
+        ring = self._ring
+        ring.advance(bucket, self._bucket_count)
+        requests = ring.total
+        if self._weighted:
+            previous = ring.counts[(bucket - self._bucket_count) % len(ring.counts)]
+            requests += previous * (1 - (position - bucket))
+        if requests + cost <= self._capacity:
+            ring.add(cost)
             return True
         return False
 
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until enough buckets expire for the request to fit."""
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        return _ring_wait(
+            self._ring,
+            self._clock(),
+            self._start,
+            self._bucket_duration,
+            self._bucket_count,
+            self._capacity - cost,
+            self._weighted,
+        )
+
+    def _refund(self, cost: int = 1) -> None:
+        self._ring.add(-cost)
+
+    def _buckets(self) -> dict:
+        """Map of absolute bucket index to count for the buckets in the window."""
+        ring = self._ring
+        size = len(ring.counts)
+        first = max(ring.head - self._bucket_count + 1, 0)
+        return {
+            b: ring.counts[b % size]
+            for b in range(first, ring.head + 1)
+            if ring.counts[b % size]
+        }
+
     def get_state(self) -> dict:
         """ "Return the current state of the rate limiter."""
         return {
             "capacity": self._capacity,
             "window_size": self._window_size,
             "bucket_count": self._bucket_count,
-            "buckets": dict(self._buckets),
-            "total_requests_in_buckets": sum(self._buckets.values()),
+            "buckets": self._buckets(),
+            "total_requests_in_buckets": self._ring.total,
             "last_checked": self._last_checked,
         }
 
+    def _fill_level(self) -> int:
+        """Requests counted in the window."""
+        return self._ring.total
+
     def get_rate_limit(self) -> tuple:
         """Returns the rate limit configuration."""
         return self._capacity, self._window_size
@@ -2,36 +2,172 @@
 
 import random
 import time
+from array import array
 from collections import deque
-from src.rate_limiting.rate_limit_abc import RateLimiter
+from typing import Optional
 
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
 
-class SlidingWindowLog(RateLimiter):
-    def __init__(self, capacity: int, window_size: int):
+
+class _TimestampRing:
+    """Fixed ring of request timestamps, oldest at ``head``."""
+
+    __slots__ = ("times", "head", "count")
+
+    def __init__(self, capacity: int):
+        self.times = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def expire(self, now: float, window_size: float) -> int:
+        """Drop timestamps older than the window and return how many remain."""
+        times = self.times
+        head = self.head
+        count = self.count
+        while count and now - times[head] > window_size:
+            head += 1
+            if head == len(times):
+                head = 0
+            count -= 1
+        self.head = head
+        self.count = count
+        return count
+
+    def append(self, now: float, cost: int = 1) -> None:
+        """Record a request, the caller ensures the ring has room for cost."""
+        times = self.times
+        for _ in range(cost):
+            times[(self.head + self.count) % len(times)] = now
+            self.count += 1
+
+    def oldest(self) -> Optional[float]:
+        return self.times[self.head] if self.count else None
+
+    def next_expiry(self, window_size: float, n: int = 1) -> float:
+        """Time at which the n oldest timestamps have left the window."""
+        times = self.times
+        return times[(self.head + n - 1) % len(times)] + window_size
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class _BucketedTimestampRing:
+    """Ring of (sub-bucket, count) pairs approximating a timestamp log.
+
+    Requests in the same sub-bucket of ``width`` seconds share one entry, and
+    an entry is dropped only once its whole sub-bucket has left the window.
+    At most ``window_size / width + 2`` entries are alive at any time.
+    """
+
+    __slots__ = ("buckets", "counts", "head", "length", "total", "width")
+
+    def __init__(self, precision: int, window_size: float):
+        size = precision + 3
+        self.buckets = array("q", bytes(8 * size))
+        self.counts = array("q", bytes(8 * size))
+        self.head = 0
+        self.length = 0
+        self.total = 0
+        self.width = window_size / precision
+
+    def expire(self, now: float, window_size: float) -> int:
+        """Drop sub-buckets entirely outside the window, return requests left."""
+        buckets = self.buckets
+        counts = self.counts
+        width = self.width
+        head = self.head
+        length = self.length
+        total = self.total
+        while length and now - (buckets[head] + 1) * width > window_size:
+            total -= counts[head]
+            head += 1
+            if head == len(buckets):
+                head = 0
+            length -= 1
+        self.head = head
+        self.length = length
+        self.total = total
+        return total
+
+    def append(self, now: float, cost: int = 1) -> None:
+        bucket = int(now // self.width)
+        buckets = self.buckets
+        tail = (self.head + self.length - 1) % len(buckets)
+        if self.length and buckets[tail] == bucket:
+            self.counts[tail] += cost
+        else:
+            tail = (tail + 1) % len(buckets)
+            buckets[tail] = bucket
+            self.counts[tail] = cost
+            self.length += 1
+        self.total += cost
+
+    def oldest(self) -> Optional[float]:
+        return self.buckets[self.head] * self.width if self.length else None
+
+    def next_expiry(self, window_size: float, n: int = 1) -> float:
+        """Time at which the sub-buckets of the n oldest requests have left."""
+        buckets = self.buckets
+        counts = self.counts
+        index = self.head
+        n -= counts[index]
+        while n > 0:
+            index = (index + 1) % len(buckets)
+            n -= counts[index]
+        return (buckets[index] + 1) * self.width + window_size
+
+    def __len__(self) -> int:
+        return self.total
+
+
+class SlidingWindowLog(AcquireMixin, RateLimiter):
+    def __init__(self, capacity: int, window_size: int, clock: Optional[Clock] = None):
         if capacity <= 0 or window_size <= 0:
             raise ValueError("Capacity and window size must be positive integers")
+        super().__init__(clock)
         self._capacity = capacity
         self._window_size = window_size
         self._log = deque()
 
-    def allow_request(self) -> bool:
+    def allow_request(self, cost: int = 1) -> bool:
         """
         Check if request can be allowed.
 
+        Args:
+            cost: Number of requests this request counts as.
+
         Returns:
             bool: True if request should be allowed else False.
 
         """
-        t = time.monotonic()
+        t = self._clock()
         # Remove/clean expired requests from log.
         while self._log and t - self._log[0] > self._window_size:
             self._log.popleft()
         # Check if capacity allows for this request
-        if len(self._log) < self._capacity:
-            self._log.append(t)
+        if len(self._log) + cost <= self._capacity:
+            self._log.extend([t] * cost)
             return True
         return False
 
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until enough logged requests expire for the request to fit."""
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        t = self._clock()
+        while self._log and t - self._log[0] > self._window_size:
+            self._log.popleft()
+        excess = len(self._log) + cost - self._capacity
+        if excess <= 0:
+            return 0.0
+        return max(self._log[excess - 1] + self._window_size - t, 0.0)
+
+    def _refund(self, cost: int = 1) -> None:
+        for _ in range(cost):
+            self._log.pop()
+
     def get_state(self) -> dict:
         """Returns state of the rate limiter."""
         return {
@@ -43,6 +179,103 @@ class SlidingWindowLog(RateLimiter):
             },
         }
 
+    def _fill_level(self) -> int:
+        """Requests in the log."""
+        return len(self._log)
+
+    def get_rate_limit(self) -> tuple[int, int]:
+        return self._capacity, self._window_size
+
+
+class CompactSlidingWindowLog(AcquireMixin, RateLimiter):
+    """Sliding window log with a fixed memory footprint.
+
+    Timestamps are kept in a preallocated ``array('d')`` ring of ``capacity``
+    slots, so admitting a request allocates nothing and the log takes exactly
+    ``8 * capacity`` bytes regardless of traffic.
+
+    With ``precision`` set, the log instead merges timestamps into
+    ``precision`` sub-buckets per window and takes ``16 * (precision + 3)``
+    bytes regardless of capacity. A request is then forgotten up to
+    ``window_size / precision`` seconds later than in the exact log, so the
+    approximate log may delay admissions by at most that much but never admits
+    more than ``capacity`` requests in any window.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_size: int,
+        precision: Optional[int] = None,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            capacity: Maximum number of requests allowed in the window.
+            window_size: Size of the window in seconds.
+            precision: Number of sub-buckets per window for the approximate
+                log, or None for an exact log.
+            clock: Callable returning the current time in seconds.
+        """
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window size must be positive integers")
+        if precision is not None and precision <= 0:
+            raise ValueError("Precision must be a positive integer")
+        super().__init__(clock)
+        self._capacity = capacity
+        self._window_size = window_size
+        self._precision = precision
+        if precision is None:
+            self._log = _TimestampRing(capacity)
+        else:
+            self._log = _BucketedTimestampRing(precision, window_size)
+
+    def allow_request(self, cost: int = 1) -> bool:
+        """
+        Check if request can be allowed.
+
+        Args:
+            cost: Number of requests this request counts as.
+
+        Returns:
+            bool: True if request should be allowed else False.
+
+        """
+        t = self._clock()
+        log = self._log
+        if log.expire(t, self._window_size) + cost <= self._capacity:
+            log.append(t, cost)
+            return True
+        return False
+
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until enough logged requests expire to make room for cost."""
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        t = self._clock()
+        log = self._log
+        excess = log.expire(t, self._window_size) + cost - self._capacity
+        if excess <= 0:
+            return 0.0
+        return max(log.next_expiry(self._window_size, excess) - t, 0.0)
+
+    def get_state(self) -> dict:
+        """Returns state of the rate limiter."""
+        log = self._log
+        return {
+            "capacity": self._capacity,
+            "window_size": self._window_size,
+            "precision": self._precision,
+            "log_summary": {
+                "requests_count": len(log),
+                "oldest_request_timestamp": log.oldest(),
+            },
+        }
+
+    def _fill_level(self) -> int:
+        """Requests in the log."""
+        return len(self._log)
+
     def get_rate_limit(self) -> tuple[int, int]:
         return self._capacity, self._window_size
 
@@ -0,0 +1,183 @@
+"""Compact binary snapshots of keyed limiter state.
+
+A snapshot stores one column per record field, each a flat array of
+fixed-width values, plus the keys and a hash table from key to row. A file
+starts with ``MAGIC``, the length of a JSON header and the header, which
+describes the store and the byte range of every column; columns are 8-byte
+aligned so that they can be used in place from a memory map.
+
+Reading a snapshot therefore only maps the file and parses the header. Looking
+up a key hashes it, probes the table and reads its row straight from the
+mapping, so a store restored from millions of keys is usable immediately and
+pays for each key on its first request.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from array import array
+from typing import Hashable, Optional
+
+MAGIC = b"RLSNAP01"
+
+_STR, _BYTES, _INT = 0, 1, 2
+
+
+def _encode_key(key: Hashable) -> tuple:
+    """Return the type tag and bytes of key."""
+    if isinstance(key, str):
+        return _STR, key.encode()
+    if isinstance(key, bytes):
+        return _BYTES, key
+    if isinstance(key, int) and not isinstance(key, bool):
+        return _INT, str(key).encode()
+    raise TypeError(f"Cannot snapshot key of type {type(key).__name__}")
+
+
+def _decode_key(tag: int, data: bytes) -> Hashable:
+    if tag == _STR:
+        return data.decode()
+    if tag == _BYTES:
+        return data
+    return int(data)
+
+
+def _key_hash(tag: int, data: bytes) -> int:
+    digest = hashlib.blake2b(bytes((tag,)) + data, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def write_snapshot(path: str, header: dict, keys: list, columns: dict) -> None:
+    """Write keys and their record columns to path.
+
+    The snapshot is written to a temporary file in the same directory and
+    moved over path once complete, so readers and a crash mid-write never
+    see a partial snapshot and an existing file mapped by `Snapshot` is
+    left intact.
+
+    Args:
+        path: File to write.
+        header: JSON-serializable description of the store.
+        keys: Keys in row order.
+        columns: Maps a column name to an `array` holding the column's values
+            for all rows, in row order.
+    """
+    tags = array("B")
+    offsets = array("q", [0])
+    blob = bytearray()
+    table = array("q", bytes(8 * _table_size(len(keys))))
+    mask = len(table) - 1
+    for row, key in enumerate(keys):
+        tag, data = _encode_key(key)
+        tags.append(tag)
+        blob += data
+        offsets.append(len(blob))
+        slot = _key_hash(tag, data) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = row + 1
+    columns = dict(
+        columns,
+        _tags=tags,
+        _offsets=offsets,
+        _keys=array("B", bytes(blob)),
+        _table=table,
+    )
+    layout = {}
+    position = 0
+    for name, values in columns.items():
+        size = len(values) * values.itemsize
+        layout[name] = [values.typecode, position, size]
+        position += -(-size // 8) * 8
+    header = dict(header, count=len(keys), columns=layout)
+    encoded = json.dumps(header).encode()
+    encoded += b" " * (-(len(MAGIC) + 8 + len(encoded)) % 8)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with open(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for name, values in columns.items():
+                data = values.tobytes()
+                f.write(data)
+                f.write(bytes(-len(data) % 8))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _table_size(count: int) -> int:
+    """Power of two of at least twice count, keeping probe sequences short."""
+    size = 8
+    while size < 2 * count:
+        size *= 2
+    return size
+
+
+class Snapshot:
+    """Memory-mapped snapshot, read lazily.
+
+    ``header`` holds the header written with the snapshot and ``columns``
+    maps each column name to a memoryview of its values in the mapping.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            view.release()
+            self._map.close()
+            raise ValueError(f"{path} is not a rate limiter snapshot")
+        start = len(MAGIC) + 8
+        length = int.from_bytes(view[len(MAGIC) : start], "little")
+        self.header = json.loads(bytes(view[start : start + length]))
+        base = start + length
+        self.columns = {
+            name: view[base + offset : base + offset + size].cast(typecode)
+            for name, (typecode, offset, size) in self.header["columns"].items()
+        }
+        self._view = view
+        self._tags = self.columns["_tags"]
+        self._offsets = self.columns["_offsets"]
+        self._keys = self.columns["_keys"]
+        self._table = self.columns["_table"]
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def key(self, row: int) -> Hashable:
+        data = bytes(self._keys[self._offsets[row] : self._offsets[row + 1]])
+        return _decode_key(self._tags[row], data)
+
+    def find(self, key: Hashable) -> Optional[int]:
+        """Return the row of key, or None if the snapshot does not hold it."""
+        try:
+            tag, data = _encode_key(key)
+        except TypeError:
+            return None
+        table = self._table
+        mask = len(table) - 1
+        slot = _key_hash(tag, data) & mask
+        while table[slot]:
+            row = table[slot] - 1
+            if (
+                self._tags[row] == tag
+                and self._keys[self._offsets[row] : self._offsets[row + 1]] == data
+            ):
+                return row
+            slot = (slot + 1) & mask
+        return None
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.release()
+        self._view.release()
+        self._map.close()
@@ -0,0 +1,535 @@
+"""Rate limiters whose per-key state lives in a pluggable storage backend.
+
+Each algorithm is a `Script`: an atomic check-and-update of one key, written
+once in Lua for Redis and once in Python for the in-memory backend, with the
+same semantics. A `Storage` runs scripts; `MemoryStorage` keeps state in this
+process, while `src.rate_limiting.redis_storage.RedisStorage` runs the Lua
+version on a Redis server so that limits are shared by every process talking
+to it.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Callable, Optional, Sequence
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.gcra import _SLACK as _GCRA_SLACK
+from src.rate_limiting.rate_limit_abc import Decision, RateLimiter
+
+# Shared prologue of the Lua scripts, reading the time from the server so that
+# all clients agree on it. Redis 5 or later replicates the effects of scripts,
+# which allows writing after reading the time.
+_LUA_NOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+"""
+
+
+class Script:
+    """Atomic check-and-update of the state of one key.
+
+    ``function(state, now, *args)`` is the Python version. It receives the
+    key's state, or None for a new or expired key, and returns a tuple
+    ``(allowed, new_state, ttl)``; the key expires ttl seconds later unless it
+    is written again. ``lua`` is the Redis version, called with the key as
+    ``KEYS[1]`` and args as ``ARGV``.
+    """
+
+    def __init__(self, name: str, lua: str, function: Callable):
+        self.name = name
+        self.lua = _LUA_NOW + lua
+        self.function = function
+        self.sha = hashlib.sha1(self.lua.encode()).hexdigest()
+
+
+def _token_bucket(state, now, capacity, rate, cost):
+    tokens, last = (capacity, now) if state is None else state
+    tokens = min(capacity, tokens + (now - last) * rate)
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+    return allowed, (tokens, now), capacity / rate
+
+
+def _gcra(state, now, capacity, rate, cost):
+    tat = now if state is None else max(state, now)
+    pushed = tat + cost / rate
+    if pushed - now > capacity / rate + _GCRA_SLACK:
+        return False, tat, tat - now
+    return True, pushed, pushed - now
+
+
+def _fixed_window(state, now, capacity, window_size, cost):
+    start, count = (now, 0) if state is None else state
+    if now - start > window_size:
+        start, count = now, 0
+    allowed = count + cost <= capacity
+    if allowed:
+        count += cost
+    return allowed, (start, count), start + window_size - now
+
+
+def _sliding_window_log(state, now, capacity, window_size, cost):
+    times = deque() if state is None else state
+    while times and now - times[0] > window_size:
+        times.popleft()
+    allowed = len(times) + cost <= capacity
+    if allowed:
+        times.extend([now] * int(cost))
+    return allowed, times, window_size
+
+
+def _sliding_window_counter(state, now, capacity, window_size, bucket_count, cost):
+    counts = {} if state is None else state
+    bucket = math.floor(now * bucket_count / window_size)
+    for stale in [b for b in counts if b <= bucket - bucket_count]:
+        del counts[stale]
+    allowed = sum(counts.values()) + cost <= capacity
+    if allowed:
+        counts[bucket] = counts.get(bucket, 0) + cost
+    return allowed, counts, window_size
+
+
+def _leaky_bucket(state, now, bucket_size, outflow_rate, cost):
+    level, last = (0.0, now) if state is None else state
+    level = max(0.0, level - (now - last) * outflow_rate)
+    allowed = level + cost <= bucket_size
+    if allowed:
+        level += cost
+    return allowed, (level, now), level / outflow_rate
+
+
+TOKEN_BUCKET = Script(
+    "token_bucket",
+    """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - last) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', string.format('%.17g', tokens),
+    'last', string.format('%.17g', now))
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil(capacity / rate * 1000)))
+return allowed
+""",
+    _token_bucket,
+)
+
+GCRA = Script(
+    "gcra",
+    """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local pushed = tat + cost / rate
+if pushed - now > capacity / rate + %g then
+    return 0
+end
+redis.call('SET', KEYS[1], string.format('%%.17g', pushed),
+    'PX', math.max(1, math.ceil((pushed - now) * 1000)))
+return 1
+""" % _GCRA_SLACK,
+    _gcra,
+)
+
+FIXED_WINDOW = Script(
+    "fixed_window",
+    """
+local capacity = tonumber(ARGV[1])
+local window_size = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'start', 'count')
+local start = tonumber(state[1]) or now
+local count = tonumber(state[2]) or 0
+if now - start > window_size then
+    start = now
+    count = 0
+end
+local allowed = 0
+if count + cost <= capacity then
+    count = count + cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'start', string.format('%.17g', start), 'count', count)
+redis.call('PEXPIRE', KEYS[1],
+    math.max(1, math.ceil((start + window_size - now) * 1000)))
+return allowed
+""",
+    _fixed_window,
+)
+
+SLIDING_WINDOW_LOG = Script(
+    "sliding_window_log",
+    """
+local capacity = tonumber(ARGV[1])
+local window_size = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf',
+    '(' .. string.format('%.17g', now - window_size))
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > capacity then
+    return 0
+end
+local score = string.format('%.17g', now)
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], score, t[1] .. '.' .. t[2] .. ':' .. (count + i))
+end
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil(window_size * 1000)))
+return 1
+""",
+    _sliding_window_log,
+)
+
+SLIDING_WINDOW_COUNTER = Script(
+    "sliding_window_counter",
+    """
+local capacity = tonumber(ARGV[1])
+local window_size = tonumber(ARGV[2])
+local bucket_count = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = math.floor(now * bucket_count / window_size)
+local fields = redis.call('HGETALL', KEYS[1])
+local total = 0
+for i = 1, #fields, 2 do
+    if tonumber(fields[i]) <= bucket - bucket_count then
+        redis.call('HDEL', KEYS[1], fields[i])
+    else
+        total = total + tonumber(fields[i + 1])
+    end
+end
+if total + cost > capacity then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], string.format('%d', bucket), cost)
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil(window_size * 1000)))
+return 1
+""",
+    _sliding_window_counter,
+)
+
+LEAKY_BUCKET = Script(
+    "leaky_bucket",
+    """
+local bucket_size = tonumber(ARGV[1])
+local outflow_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'level', 'last')
+local level = tonumber(state[1]) or 0
+local last = tonumber(state[2]) or now
+level = math.max(0, level - (now - last) * outflow_rate)
+local allowed = 0
+if level + cost <= bucket_size then
+    level = level + cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'level', string.format('%.17g', level),
+    'last', string.format('%.17g', now))
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil(level / outflow_rate * 1000)))
+return allowed
+""",
+    _leaky_bucket,
+)
+
+SCRIPTS = {
+    script.sha: script
+    for script in (
+        TOKEN_BUCKET,
+        GCRA,
+        FIXED_WINDOW,
+        SLIDING_WINDOW_LOG,
+        SLIDING_WINDOW_COUNTER,
+        LEAKY_BUCKET,
+    )
+}
+
+
+class Storage(ABC):
+    """Backend that runs scripts atomically against per-key state."""
+
+    @abstractmethod
+    def evaluate(self, script: Script, key: str, args: tuple) -> bool:
+        """
+        Run script against the state of key.
+
+        Returns:
+            bool: Whether the script admitted the request.
+        """
+        pass
+
+    def evaluate_many(self, script: Script, calls: Sequence[tuple]) -> list:
+        """
+        Run script once per ``(key, args)`` call, in order.
+
+        Backends override this to save round trips; each call is still atomic
+        on its own, but calls of a batch may interleave with other clients.
+
+        Returns:
+            list: Whether each call admitted its request.
+        """
+        return [self.evaluate(script, key, args) for key, args in calls]
+
+
+class MemoryStorage(Storage):
+    """Storage keeping state in a dict of this process.
+
+    State records are kept in write order, so that expired keys are swept
+    from the front like in `KeyedStore`.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Args:
+            clock: Callable returning the current time in seconds. Defaults to
+                `time.monotonic`.
+        """
+        self._clock = time.monotonic if clock is None else clock
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def evaluate(self, script: Script, key: str, args: tuple) -> bool:
+        with self._lock:
+            return self._evaluate(script, key, args, self._clock())
+
+    def evaluate_many(self, script: Script, calls: Sequence[tuple]) -> list:
+        with self._lock:
+            now = self._clock()
+            return [self._evaluate(script, key, args, now) for key, args in calls]
+
+    def _evaluate(self, script: Script, key: str, args: tuple, now: float) -> bool:
+        records = self._records
+        while records:
+            oldest = next(iter(records))
+            if records[oldest][0] > now:
+                break
+            del records[oldest]
+        record = records.pop(key, None)
+        state = None if record is None or record[0] <= now else record[1]
+        allowed, state, ttl = script.function(state, now, *args)
+        records[key] = (now + ttl, state)
+        return allowed
+
+    def __len__(self) -> int:
+        """Number of keys with state, including expired ones not yet swept."""
+        return len(self._records)
+
+
+class StoredLimiter(RateLimiter):
+    """Base class for limiters keeping their per-key state in a `Storage`.
+
+    Limiters of the same algorithm and configuration sharing a storage and a
+    prefix share their limits.
+    """
+
+    _script: Script
+
+    def __init__(self, storage: Optional[Storage] = None, prefix: Optional[str] = None):
+        """
+        Args:
+            storage: Backend holding the state, a new `MemoryStorage` if None.
+            prefix: Prepended to every key, defaults to the algorithm's name.
+        """
+        super().__init__()
+        self._storage = MemoryStorage() if storage is None else storage
+        self._prefix = f"{self._script.name}:" if prefix is None else prefix
+
+    def _params(self) -> tuple:
+        """Configuration passed to the script before the cost."""
+        raise NotImplementedError
+
+    def allow_request(self, key: str, cost: int = 1) -> bool:
+        """
+        Decide a request for key.
+
+        Args:
+            key: Identifies the client, e.g. an API key or IP address.
+            cost: Cost of the request.
+
+        Returns:
+            bool: True if request is allowed, False otherwise.
+        """
+        args = self._params() + (cost,)
+        return self._storage.evaluate(self._script, self._prefix + key, args)
+
+    def check(self, key: str, cost: int = 1) -> Decision:
+        """
+        Decide a request for key like `allow_request`.
+
+        The scripts only return whether they admitted the request, and asking
+        the storage for the wait afterwards would cost a second round trip
+        whose answer other clients may already have changed. A denied
+        request's ``retry_after`` is therefore always None.
+
+        Returns:
+            Decision: Whether the request is allowed, with a ``retry_after`` of
+                0 if it is and None if it is denied.
+        """
+        # Not through allow_request, which metrics count separately
+        args = self._params() + (cost,)
+        if self._storage.evaluate(self._script, self._prefix + key, args):
+            return Decision(True, 0.0)
+        return Decision(False, None)
+
+    def allow_batch(
+        self, keys: Sequence[str], costs: Optional[Sequence[int]] = None
+    ) -> list:
+        """
+        Decide requests for many keys with as few round trips as the storage
+        allows.
+
+        Returns:
+            list: Decision of each request, in order.
+        """
+        params = self._params()
+        prefix = self._prefix
+        if costs is None:
+            args = params + (1,)
+            calls = [(prefix + key, args) for key in keys]
+        else:
+            calls = [(prefix + key, params + (cost,)) for key, cost in zip(keys, costs)]
+        return self._storage.evaluate_many(self._script, calls)
+
+    def get_state(self) -> dict:
+        return {"storage": type(self._storage).__name__, "prefix": self._prefix}
+
+
+class StoredTokenBucket(StoredLimiter):
+    """Token bucket per key, see `KeyedTokenBucket`."""
+
+    _script = TOKEN_BUCKET
+
+    def __init__(self, capacity: int, rate: int, **kwargs):
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive integers")
+        self._capacity = capacity
+        self._rate = rate
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._capacity, self._rate
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, 1
+
+
+class StoredGCRA(StoredLimiter):
+    """GCRA per key, see `KeyedGCRA`. Each key is a single Redis string."""
+
+    _script = GCRA
+
+    def __init__(self, capacity: int, rate: float, **kwargs):
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive")
+        self._capacity = capacity
+        self._rate = rate
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._capacity, self._rate
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, 1
+
+
+class StoredFixedWindow(StoredLimiter):
+    """Fixed window counter per key, see `KeyedFixedWindow`."""
+
+    _script = FIXED_WINDOW
+
+    def __init__(self, capacity: int, window_size: int, **kwargs):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window_size must be positive integers")
+        self._capacity = capacity
+        self._window_size = window_size
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._capacity, self._window_size
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, self._window_size
+
+
+class StoredSlidingWindowLog(StoredLimiter):
+    """Sliding window log per key, kept in a sorted set on Redis."""
+
+    _script = SLIDING_WINDOW_LOG
+
+    def __init__(self, capacity: int, window_size: int, **kwargs):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window size must be positive integers")
+        self._capacity = capacity
+        self._window_size = window_size
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._capacity, self._window_size
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, self._window_size
+
+
+class StoredSlidingWindowCounter(StoredLimiter):
+    """Sliding window counter per key.
+
+    Buckets are aligned to multiples of ``window_size / bucket_count`` since
+    the epoch of the storage's clock, so that all clients agree on them.
+    """
+
+    _script = SLIDING_WINDOW_COUNTER
+
+    def __init__(self, capacity: int, window_size: int, bucket_count: int, **kwargs):
+        if capacity <= 0 or window_size <= 0 or bucket_count <= 0:
+            raise ValueError(
+                f"Capacity {capacity}, window size {window_size} and bucket count {bucket_count} must be positive integers"
+            )
+        self._capacity = capacity
+        self._window_size = window_size
+        self._bucket_count = bucket_count
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._capacity, self._window_size, self._bucket_count
+
+    def get_rate_limit(self) -> tuple:
+        return self._capacity, self._window_size
+
+
+class StoredLeakyBucket(StoredLimiter):
+    """Leaky bucket per key used as a meter, see `KeyedLeakyBucket`."""
+
+    _script = LEAKY_BUCKET
+
+    def __init__(self, bucket_size: int, outflow_rate: int, **kwargs):
+        if bucket_size <= 0 or outflow_rate <= 0:
+            raise ValueError("Bucket size and outflow rate should be positive")
+        self._bucket_size = bucket_size
+        self._outflow_rate = outflow_rate
+        super().__init__(**kwargs)
+
+    def _params(self) -> tuple:
+        return self._bucket_size, self._outflow_rate
+
+    def get_rate_limit(self) -> int:
+        return self._outflow_rate
+
+
+if __name__ == "__main__":
+    limiter = StoredTokenBucket(3, 1)
+    for i in range(6):
+        client = f"client-{i % 2}"
+        if limiter.allow_request(client):
+            print(f"Request {i} from {client} forwarded")
+        else:
+            print(f"Request {i} from {client} dropped")
@@ -0,0 +1,57 @@
+"""Thread-safe wrapper for single-stream rate limiters."""
+
+import threading
+
+from src.rate_limiting.rate_limit_abc import AcquireMixin, Decision, RateLimiter
+
+
+class SynchronizedLimiter(AcquireMixin, RateLimiter):
+    """Serialize access to a rate limiter shared between threads.
+
+    The limiters in this package update their state in several steps, e.g.
+    `TokenBucket` refills and then debits, so concurrent callers can both see
+    the same tokens and over-admit. This wrapper runs every call on the wrapped
+    limiter under one lock. Keyed stores should instead be created with
+    ``thread_safe=True``, which stripes locks over keys.
+    """
+
+    def __init__(self, limiter: RateLimiter):
+        """
+        Args:
+            limiter: Rate limiter to guard.
+        """
+        super().__init__()
+        self._limiter = limiter
+        self._lock = threading.Lock()
+
+    def allow_request(self, *args, **kwargs) -> bool:
+        """
+        Check if request can be allowed, see the wrapped limiter.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        with self._lock:
+            return self._limiter.allow_request(*args, **kwargs)
+
+    def check(self, *args) -> Decision:
+        """Decide a request and when to retry, see the wrapped limiter."""
+        with self._lock:
+            return self._limiter.check(*args)
+
+    def _wait_time(self, cost: int = 1) -> float:
+        with self._lock:
+            return self._limiter._wait_time(cost)
+
+    def _refund(self, cost: int = 1) -> None:
+        with self._lock:
+            self._limiter._refund(cost)
+
+    def get_state(self) -> dict:
+        """Returns the state of the wrapped rate limiter."""
+        with self._lock:
+            return self._limiter.get_state()
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the rate limit of the wrapped rate limiter."""
+        return self._limiter.get_rate_limit()
@@ -1,29 +1,52 @@
 """Implementation of Token Bucket rate limiting algorithm."""
 
 import time
-from src.rate_limiting.rate_limit_abc import RateLimiter
+from typing import Optional
 
+from src.rate_limiting.adaptive import AIMDController
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import AcquireMixin, RateLimiter
 
-class TokenBucket(RateLimiter):
-    def __init__(self, capacity: int, rate: int):
+
+class TokenBucket(AcquireMixin, RateLimiter):
+    def __init__(
+        self,
+        capacity: int,
+        rate: int,
+        clock: Optional[Clock] = None,
+        adaptive: Optional[AIMDController] = None,
+    ):
         """
 
         Args:
             capacity: Maximum number of tokens the bucket can hold at a time.
             rate: Rate (token per second) at which tokens are added.
+            clock: Callable returning the current time in seconds.
+            adaptive: Controller adjusting the rate, starting from rate, to
+                the outcomes passed to `record_outcome`.
         """
         if capacity <= 0 or rate <= 0:
             raise ValueError("Capacity and rate must be positive integers")
+        super().__init__(clock)
         self._capacity = capacity
-        self._rate = rate
+        self._adaptive = adaptive
+        self._rate = rate if adaptive is None else adaptive.reset(rate)
         self._tokens = capacity
-        self._last_checked = time.time()
+        self._last_checked = self._clock()
+
+    def _add_tokens(self, now: float) -> None:
+        """Adds token to bucket based on how much time elapsed after last check.
 
-    def _add_tokens(self) -> None:
-        """Adds token to bucket based on how much time elapsed after last check."""
-        elapsed = time.time() - self._last_checked
-        self._tokens = min(int(elapsed * self._rate) + self._tokens, self._capacity)
-        self._last_checked = time.time()
+        Only whole tokens are added; the time towards the next token carries
+        over, so frequent checks still refill at the full rate.
+        """
+        added = int((now - self._last_checked) * self._rate)
+        if self._tokens + added >= self._capacity:
+            self._tokens = self._capacity
+            self._last_checked = now
+        elif added:
+            self._tokens += added
+            self._last_checked += added / self._rate
 
     def allow_request(self, tokens_needed: int = 1) -> bool:
         """Check if request can be allowed.
@@ -34,12 +57,42 @@ class TokenBucket(RateLimiter):
         Returns:
             bool: True if request should be allowed else False.
         """
-        self._add_tokens()
+        self._add_tokens(self._clock())
         if self._tokens >= tokens_needed:
             self._tokens -= tokens_needed
             return True
         return False
 
+    def _wait_time(self, cost: int = 1) -> float:
+        """Seconds until ``cost`` tokens are available."""
+        if cost > self._capacity:
+            raise ValueError(f"Cost {cost} exceeds capacity {self._capacity}")
+        now = self._clock()
+        self._add_tokens(now)
+        if self._tokens >= cost:
+            return 0.0
+        progress = now - self._last_checked
+        return max((cost - self._tokens) / self._rate - progress, 0.0)
+
+    def _refund(self, cost: int = 1) -> None:
+        self._tokens += cost
+
+    def record_outcome(self, latency: float, failed: bool = False) -> None:
+        """
+        Report how an admitted request went, adapting the rate.
+
+        Args:
+            latency: Seconds the request took downstream.
+            failed: Whether the request failed downstream.
+        """
+        if self._adaptive is None:
+            raise ValueError("The bucket was created without an adaptive controller")
+        self._rate = self._adaptive.record(latency, failed)
+
+    def _fill_level(self) -> float:
+        """Tokens left."""
+        return self._tokens
+
     def get_state(self) -> dict:
         """Returns state of the rate limiter."""
         return {
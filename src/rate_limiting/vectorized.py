@@ -0,0 +1,219 @@
+"""Vectorized batch decisions over array-backed limiter state.
+
+The limiters in this module keep one column entry per key index and decide a
+whole batch of requests with NumPy. Requests in a batch are decided as if they
+arrived one after another in batch order, matching `KeyedTokenBucket` and
+`KeyedFixedWindow`, which remain the reference semantics.
+
+NumPy is an optional dependency, install it with ``pip install .[numpy]``.
+"""
+
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from src.rate_limiting.clock import Clock
+from src.rate_limiting.rate_limit_abc import RateLimiter
+
+
+class _ArrayLimiter(RateLimiter):
+    """Base class for array-backed limiters deciding batches of requests."""
+
+    def __init__(self, size: int, clock: Optional[Clock] = None):
+        if np is None:
+            raise ImportError(
+                f"{type(self).__name__} requires numpy, install it with `pip install .[numpy]`"
+            )
+        if size <= 0:
+            raise ValueError("Size must be a positive integer")
+        super().__init__(clock)
+        self._size = size
+
+    def _budgets(self, keys, now: float):
+        """Bring the state of keys up to now and return their spare budget."""
+        raise NotImplementedError
+
+    def _debit(self, keys, amounts) -> None:
+        raise NotImplementedError
+
+    def allow_batch(self, keys, costs=None, now: Optional[float] = None):
+        """
+        Decide a batch of requests.
+
+        Requests for the same key are decided in batch order: a request is
+        admitted if the budget left after the admitted requests before it
+        covers its cost.
+
+        Args:
+            keys: Array of key indices in ``[0, size)``.
+            costs: Array of request costs, one per key. Defaults to 1 each.
+            now: Timestamp for the whole batch. Defaults to the clock.
+
+        Returns:
+            numpy.ndarray: Boolean mask, True where the request is admitted.
+        """
+        keys = np.asarray(keys, dtype=np.intp)
+        n = keys.size
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        if costs is None:
+            costs = np.ones(n)
+        else:
+            costs = np.asarray(costs, dtype=np.float64)
+        if now is None:
+            now = self._clock()
+
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        if sorted_keys[0] < 0 or sorted_keys[-1] >= self._size:
+            raise ValueError(f"Key indices must be in [0, {self._size})")
+        sorted_costs = costs[order]
+        starts = np.empty(n, dtype=bool)
+        starts[0] = True
+        np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=starts[1:])
+        segment_starts = np.flatnonzero(starts)
+        segment_ids = np.cumsum(starts) - 1
+        unique_keys = sorted_keys[segment_starts]
+
+        budgets = self._budgets(unique_keys, now)
+        admitted = _admit_in_order(
+            sorted_costs, budgets[segment_ids], segment_ids, segment_starts
+        )
+        spent = np.add.reduceat(np.where(admitted, sorted_costs, 0.0), segment_starts)
+        self._debit(unique_keys, spent)
+
+        mask = np.empty(n, dtype=bool)
+        mask[order] = admitted
+        return mask
+
+    def allow_request(self, key: int, cost: int = 1) -> bool:
+        """
+        Check if a single request for key can be allowed.
+
+        Returns:
+            bool: True if request should be allowed else False.
+        """
+        return bool(self.allow_batch([key], [cost])[0])
+
+
+def _admit_in_order(costs, budgets, segment_ids, segment_starts):
+    """Sequentially admit requests within each segment of equal keys.
+
+    A segmented cumulative sum admits the longest prefix of every segment that
+    fits its budget, and the first request past that prefix is denied. Later
+    requests costing more than the budget left at that point can never fit
+    either and are denied in the same pass, so uniform costs need a single
+    pass. Otherwise the cumulative sum is recomputed without the denied
+    requests until every request is decided.
+    """
+    n = costs.size
+    positions = np.arange(n)
+    candidate = np.ones(n, dtype=bool)
+    while True:
+        charged = np.where(candidate, costs, 0.0)
+        cumulative = np.cumsum(charged)
+        offsets = (cumulative - charged)[segment_starts]
+        cumulative -= offsets[segment_ids]
+        failed = candidate & (cumulative > budgets)
+        if not failed.any():
+            return candidate
+        failed_positions = np.flatnonzero(failed)
+        failed_segments, first = np.unique(
+            segment_ids[failed_positions], return_index=True
+        )
+        first_failed = failed_positions[first]
+        remaining = np.full(segment_starts.size, np.inf)
+        remaining[failed_segments] = (
+            budgets[first_failed] - cumulative[first_failed] + costs[first_failed]
+        )
+        first_positions = np.full(segment_starts.size, n)
+        first_positions[failed_segments] = first_failed
+        hopeless = (positions > first_positions[segment_ids]) & (
+            costs > remaining[segment_ids]
+        )
+        candidate[first_failed] = False
+        candidate &= ~hopeless
+
+
+class TokenBucketArray(_ArrayLimiter):
+    """Token buckets for ``size`` keys stored as NumPy columns."""
+
+    def __init__(self, size: int, capacity: int, rate: int, **kwargs):
+        """
+        Args:
+            size: Number of keys, requests use key indices in ``[0, size)``.
+            capacity: Maximum number of tokens each bucket can hold.
+            rate: Rate (token per second) at which tokens are added.
+            **kwargs: Passed to the base class, e.g. ``clock``.
+        """
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Capacity and rate must be positive integers")
+        super().__init__(size, **kwargs)
+        self._capacity = capacity
+        self._rate = rate
+        self._tokens = np.full(size, float(capacity))
+        self._last_checked = np.full(size, self._clock())
+
+    def _budgets(self, keys, now: float):
+        tokens = self._tokens[keys] + (now - self._last_checked[keys]) * self._rate
+        np.minimum(tokens, self._capacity, out=tokens)
+        self._tokens[keys] = tokens
+        self._last_checked[keys] = now
+        return tokens
+
+    def _debit(self, keys, amounts) -> None:
+        self._tokens[keys] -= amounts
+
+    def get_state(self) -> dict:
+        """Returns state of the rate limiter."""
+        return {
+            "size": self._size,
+            "capacity": self._capacity,
+            "rate": self._rate,
+        }
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum tokens that can be consumed."""
+        return self._capacity, 1
+
+
+class FixedWindowArray(_ArrayLimiter):
+    """Fixed window counters for ``size`` keys stored as NumPy columns."""
+
+    def __init__(self, size: int, capacity: int, window_size: int, **kwargs):
+        if capacity <= 0 or window_size <= 0:
+            raise ValueError("Capacity and window_size must be positive integers")
+        super().__init__(size, **kwargs)
+        self._capacity = capacity
+        self._window_size = window_size
+        self._window_start = np.full(size, self._clock())
+        self._counter = np.zeros(size)
+
+    def _budgets(self, keys, now: float):
+        expired = keys[now - self._window_start[keys] > self._window_size]
+        self._window_start[expired] = now
+        self._counter[expired] = 0
+        return self._capacity - self._counter[keys]
+
+    def _debit(self, keys, amounts) -> None:
+        self._counter[keys] += amounts
+
+    def get_state(self) -> dict:
+        """Returns the state of the rate limiter."""
+        return {
+            "size": self._size,
+            "capacity": self._capacity,
+            "window size": self._window_size,
+        }
+
+    def get_rate_limit(self) -> tuple:
+        """Returns the maximum number of requests"""
+        return self._capacity, self._window_size
+
+
+if __name__ == "__main__":
+    limiter = TokenBucketArray(4, capacity=2, rate=1)
+    print(limiter.allow_batch([0, 0, 0, 1, 2, 1, 1]))
@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+import pytest
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.keyed_store import KeyedAlignedFixedWindow, KeyedTokenBucket
+from src.rate_limiting.sketch_window import SketchSlidingWindow
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import (
+    CompactSlidingWindowLog,
+    SlidingWindowLog,
+)
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+class CountingTokenBucket(TokenBucket):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.wait_time_calls = 0
+
+    def _wait_time(self, cost: int = 1) -> float:
+        self.wait_time_calls += 1
+        return super()._wait_time(cost)
+
+
+async def timed_acquire(limiter, *args, **kwargs):
+    start = time.monotonic()
+    admitted = await limiter.acquire(*args, **kwargs)
+    return admitted, time.monotonic() - start
+
+
+class TestAcquire:
+    def test_immediate_admission(self):
+        bucket = TokenBucket(2, 1)
+        admitted, elapsed = asyncio.run(timed_acquire(bucket))
+        assert admitted
+        assert elapsed < 0.01
+
+    @pytest.mark.parametrize(
+        "factory",
+        [
+            lambda: TokenBucket(1, 10),
+            lambda: FixedWindow(1, 0.1),
+            lambda: SlidingWindowLog(1, 0.1),
+            lambda: SlidingWindowCounter(1, 0.2, 2),
+            lambda: SlidingWindowCounter(2, 0.2, 1, weighted=True),
+        ],
+    )
+    def test_waits_for_computed_delay(self, factory):
+        limiter = factory()
+
+        async def scenario():
+            while limiter.allow_request():
+                pass
+            delay = limiter._wait_time()
+            admitted, elapsed = await timed_acquire(limiter)
+            return admitted, elapsed, delay
+
+        admitted, elapsed, delay = asyncio.run(scenario())
+        assert admitted
+        assert 0 < delay <= 0.3
+        assert delay * 0.9 <= elapsed < delay + 0.05
+
+    def test_waiters_are_served_in_order_with_one_wait_each(self):
+        bucket = CountingTokenBucket(1, 50)
+        bucket.allow_request()
+        order = []
+
+        async def waiter(i):
+            await bucket.acquire()
+            order.append(i)
+
+        async def scenario():
+            await asyncio.gather(*(waiter(i) for i in range(5)))
+
+        asyncio.run(scenario())
+        assert order == [0, 1, 2, 3, 4]
+        assert bucket.wait_time_calls <= 6, "Only the head waiter should compute delays"
+
+    def test_cancelled_waiter_does_not_consume(self):
+        bucket = TokenBucket(1, 20)
+        bucket.allow_request()
+
+        async def scenario():
+            first = asyncio.ensure_future(bucket.acquire())
+            second = asyncio.ensure_future(timed_acquire(bucket))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            admitted, elapsed = await second
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return admitted, elapsed
+
+        admitted, elapsed = asyncio.run(scenario())
+        assert admitted
+        assert elapsed < 0.1, "Second waiter should take over the first's turn"
+        assert not bucket._waiters
+
+    def test_turn_passes_over_a_cancelled_waiter(self):
+        clock = ManualClock(1000.0)
+        bucket = TokenBucket(1, 100, clock=clock)
+        bucket.allow_request()
+
+        async def scenario():
+            head = asyncio.ensure_future(bucket.acquire())
+            queued = asyncio.ensure_future(bucket.acquire())
+            await asyncio.sleep(0)
+            clock.advance(1)
+            time.sleep(0.02)
+            # Wake the head, then cancel the next waiter before its task runs
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            queued.cancel()
+            return await asyncio.gather(head, queued, return_exceptions=True)
+
+        head, queued = asyncio.run(scenario())
+        assert head is True, "The head waiter was admitted"
+        assert isinstance(queued, asyncio.CancelledError)
+        assert not bucket._waiters
+
+    def test_compact_log(self):
+        clock = ManualClock(1000.0)
+        log = CompactSlidingWindowLog(3, 1, precision=2, clock=clock)
+        assert asyncio.run(log.acquire(2))
+        assert log._wait_time(2) == pytest.approx(1.5), "Sub-bucket ends at 1000.5"
+        assert not asyncio.run(log.acquire(2, timeout=0.01))
+        assert asyncio.run(log.acquire())
+        exact = CompactSlidingWindowLog(3, 1, clock=clock)
+        for _ in range(3):
+            clock.advance(0.25)
+            exact.allow_request()
+        assert exact._wait_time(2) == pytest.approx(0.75), "Second oldest at 1000.5"
+
+    def test_timeout_fails_fast(self):
+        bucket = TokenBucket(1, 1)
+        bucket.allow_request()
+        admitted, elapsed = asyncio.run(timed_acquire(bucket, timeout=0.05))
+        assert not admitted
+        assert elapsed < 0.05, "Should not sleep when the delay exceeds the timeout"
+
+    def test_timeout_while_queued(self):
+        bucket = TokenBucket(1, 5)
+        bucket.allow_request()
+
+        async def scenario():
+            head = asyncio.ensure_future(bucket.acquire())
+            await asyncio.sleep(0)
+            queued = await bucket.acquire(timeout=0.05)
+            return queued, await head
+
+        assert asyncio.run(scenario()) == (False, True)
+        assert not bucket._waiters
+
+    @pytest.mark.parametrize(
+        "limiter",
+        [
+            KeyedTokenBucket(2, 1),
+            KeyedAlignedFixedWindow(1, 60),
+            SketchSlidingWindow(1, 60, 6),
+        ],
+    )
+    def test_keyed_limiters_do_not_acquire(self, limiter):
+        assert not hasattr(limiter, "acquire"), "A cost is not a key"
+
+    def test_cost_above_capacity(self):
+        with pytest.raises(ValueError):
+            asyncio.run(SlidingWindowLog(2, 1).acquire(3))
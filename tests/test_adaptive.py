@@ -0,0 +1,149 @@
+import time
+
+import pytest
+from src.rate_limiting.adaptive import AIMDController
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.leaky_bucket import LeakyBucket
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+class SyntheticBackend:
+    """Service handling ``capacity(t)`` requests per second.
+
+    Latency grows with utilization over each tick, and requests beyond the
+    capacity of a tick fail, like an overloaded server shedding load.
+    """
+
+    def __init__(self, capacity, tick: float, base_latency: float = 0.01):
+        self._capacity = capacity
+        self._tick = tick
+        self._base_latency = base_latency
+
+    def serve(self, now: float, requests: int) -> list:
+        """Return the (latency, failed) outcome of each request of a tick."""
+        room = self._capacity(now) * self._tick
+        utilization = min(requests / room, 0.95)
+        latency = self._base_latency / (1 - utilization)
+        return [(latency, i >= room) for i in range(requests)]
+
+
+def capacity(now: float) -> float:
+    """50 requests per second, dropping to 20 after a minute, then 80."""
+    return 50 if now < 1060 else 20 if now < 1120 else 80
+
+
+def simulate(bucket, clock, backend, seconds: float, tick: float, demand: int):
+    """Offer demand requests per tick, return admitted and failed per tick."""
+    history = []
+    for _ in range(int(seconds / tick)):
+        clock.advance(tick)
+        admitted = 0
+        while admitted < demand and bucket.allow_request():
+            admitted += 1
+        outcomes = backend.serve(clock(), admitted)
+        for latency, failed in outcomes:
+            bucket.record_outcome(latency, failed)
+        history.append((clock(), admitted, sum(f for _, f in outcomes)))
+    return history
+
+
+class TestAIMDController:
+    def test_increases_per_interval(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(1, 100, increase=2, interval=1, clock=clock)
+        controller.reset(10)
+        for _ in range(10):
+            controller.record(0.01)
+        assert controller.rate == 10, "No increase within the first interval"
+        clock.advance(1)
+        controller.record(0.01)
+        controller.record(0.01)
+        assert controller.rate == 12, "One increase per interval"
+
+    def test_decreases_once_per_interval(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(1, 100, decrease=0.5, interval=1, clock=clock)
+        controller.reset(40)
+        for _ in range(5):
+            controller.record(0.01, failed=True)
+        assert controller.rate == 20, "Failures of one overload count once"
+        clock.advance(1)
+        controller.record(0.01, failed=True)
+        assert controller.rate == 10
+
+    def test_latency_target(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(
+            1, 100, latency_target=0.1, smoothing=0.5, clock=clock
+        )
+        controller.reset(40)
+        controller.record(0.12)
+        assert controller.rate == 20, "Latency above target is congestion"
+        clock.advance(1)
+        controller.record(0.05)
+        state = controller.get_state()
+        assert state == pytest.approx({"rate": 21, "latency": 0.085})
+
+    def test_bounds(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(5, 12, increase=10, clock=clock)
+        assert controller.reset(100) == 12
+        controller.record(0.01, failed=True)
+        clock.advance(1)
+        controller.record(0.01, failed=True)
+        assert controller.rate == 5
+
+    @pytest.mark.xfail(raises=ValueError)
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"min_rate": 0}, {"max_rate": 0.5}, {"decrease": 1}, {"increase": 0}],
+    )
+    def test_valid_params(self, kwargs):
+        AIMDController(**{"min_rate": 1, "max_rate": 10, **kwargs})
+
+
+class TestAdaptiveTokenBucket:
+    def test_follows_changing_capacity(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(
+            1, 200, increase=2, decrease=0.7, interval=1, clock=clock
+        )
+        bucket = TokenBucket(200, 10, clock=clock, adaptive=controller)
+        # Ticks shorter than a token at the lowest rates
+        backend = SyntheticBackend(capacity, tick=0.1)
+        history = simulate(bucket, clock, backend, 180, 0.1, demand=30)
+        for start, end in [(1030, 1060), (1090, 1120), (1150, 1180)]:
+            ticks = [h for h in history if start <= h[0] < end]
+            admitted = sum(h[1] for h in ticks) / (end - start)
+            failed = sum(h[2] for h in ticks) / (end - start)
+            expected = capacity(start)
+            assert (
+                0.8 * expected <= admitted <= 1.1 * expected
+            ), f"Admitted {admitted:.1f}/s against a capacity of {expected}/s"
+            assert failed <= 0.05 * expected, f"{failed:.1f} failures/s"
+
+    def test_state_shows_current_rate(self):
+        clock = ManualClock(1000.0)
+        controller = AIMDController(1, 100, clock=clock)
+        bucket = TokenBucket(5, 10, clock=clock, adaptive=controller)
+        bucket.allow_request()
+        bucket.record_outcome(0.5, failed=True)
+        assert bucket.get_state()["rate"] == 5
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_outcome_needs_controller(self):
+        TokenBucket(5, 10).record_outcome(0.01)
+
+
+class TestAdaptiveLeakyBucket:
+    def test_failures_lower_the_outflow_rate(self):
+        def failing(request):
+            raise RuntimeError("Service unavailable")
+
+        controller = AIMDController(1, 100, interval=0.05)
+        bucket = LeakyBucket(50, 40, failing, paced=True, adaptive=controller)
+        for i in range(20):
+            bucket.allow_request(i)
+        time.sleep(0.3)
+        bucket.stop()
+        assert bucket.get_state()["outflow_rate"] < 40, "Failures slow outflow"
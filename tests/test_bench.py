@@ -0,0 +1,67 @@
+import json
+
+from src.rate_limiting.bench.__main__ import main
+from src.rate_limiting.bench.suite import ALGORITHMS, WORKLOADS, compare, run_suite
+
+
+class TestBenchSuite:
+    def test_report_covers_every_algorithm_and_workload(self):
+        report = run_suite(decisions=400)
+        pairs = {(r["algorithm"], r["workload"]) for r in report["results"]}
+        assert pairs == {
+            (a, w) for a in ALGORITHMS for w in WORKLOADS
+        }, "Every algorithm should run under every workload"
+        for result in report["results"]:
+            for metric in (
+                "ns_per_decision",
+                "admit_ratio",
+                "peak_bytes_per_decision",
+                "retained_bytes_per_decision",
+                "resident_bytes",
+            ):
+                assert result[metric] >= 0, f"{metric} missing for {result}"
+        json.dumps(report)
+
+    def test_workloads_stress_admission_differently(self):
+        report = run_suite(decisions=2_000, algorithms=["token_bucket"])
+        ratios = {r["workload"]: r["admit_ratio"] for r in report["results"]}
+        assert ratios["admit_heavy"] > 0.9, "Admit-heavy load should mostly pass"
+        assert ratios["deny_heavy"] < 0.2, "Deny-heavy load should mostly fail"
+        assert 0.3 < ratios["bursty"] < 0.7, "Bursts of twice the capacity"
+
+    def test_compare_flags_regressions(self):
+        baseline = {
+            "results": [
+                {"algorithm": "a", "workload": "w", "ns_per_decision": 100.0},
+                {"algorithm": "b", "workload": "w", "ns_per_decision": 100.0},
+            ]
+        }
+        report = {
+            "results": [
+                {"algorithm": "a", "workload": "w", "ns_per_decision": 150.0},
+                {"algorithm": "b", "workload": "w", "ns_per_decision": 101.0},
+            ]
+        }
+        lines = compare(baseline, report)
+        assert len(lines) == 2
+        assert "REGRESSION" in lines[0], "A 50% slowdown should be flagged"
+        assert "REGRESSION" not in lines[1], "Noise should not be flagged"
+
+    def test_main_writes_json(self, tmp_path):
+        output = tmp_path / "report.json"
+        main(
+            [
+                "--decisions",
+                "200",
+                "--algorithm",
+                "fixed_window",
+                "--workload",
+                "bursty",
+                "--output",
+                str(output),
+            ]
+        )
+        report = json.loads(output.read_text())
+        assert [(r["algorithm"], r["workload"]) for r in report["results"]] == [
+            ("fixed_window", "bursty")
+        ]
@@ -0,0 +1,42 @@
+import time
+
+from src.rate_limiting.clock import CoarseClock, ManualClock
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+class TestClock:
+    def test_manual_clock(self):
+        clock = ManualClock(5.0)
+        assert clock() == 5.0
+        assert clock.advance(1.5) == 6.5
+        clock.set(10.0)
+        assert clock() == 10.0
+
+    def test_coarse_clock_only_moves_on_tick(self):
+        source = ManualClock(1.0)
+        clock = CoarseClock(source)
+        source.advance(1)
+        assert clock() == 1.0, "Clock should return the cached time"
+        assert clock.tick() == 2.0
+        assert clock() == 2.0
+
+    def test_coarse_clock_thread(self):
+        clock = CoarseClock().start(interval=0.005)
+        first = clock()
+        time.sleep(0.05)
+        assert clock() > first, "Background thread should refresh the time"
+        clock.stop()
+
+    def test_limiters_read_injected_clock(self):
+        clock = ManualClock()
+        bucket = TokenBucket(2, 1, clock=clock)
+        window = FixedWindow(1, 2, clock=clock)
+        assert bucket.allow_request(2)
+        assert window.allow_request()
+        assert not bucket.allow_request()
+        assert not window.allow_request()
+        clock.advance(2.5)
+        assert bucket.allow_request(2), "Two tokens should have been refilled"
+        assert window.allow_request(), "Window should have been reset"
+        assert bucket.get_state()["last checked"] == 2.5
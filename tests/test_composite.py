@@ -0,0 +1,100 @@
+import asyncio
+import math
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.composite import CompositeLimiter
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import (
+    CompactSlidingWindowLog,
+    SlidingWindowLog,
+)
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+class TestCompositeLimiter:
+    def test_admits_only_if_every_limit_admits(self):
+        clock = ManualClock(1000.0)
+        user = TokenBucket(2, 1, clock=clock)
+        tenant = FixedWindow(3, 10, clock=clock)
+        limiter = CompositeLimiter({"user": user, "tenant": tenant})
+        assert [limiter.allow_request() for _ in range(3)] == [True, True, False]
+        assert tenant.get_state()["counter"] == 2, "Denied request is not counted"
+        clock.advance(1)
+        assert limiter.allow_request(), "The user bucket refilled one token"
+        assert not limiter.allow_request(), "The tenant window is full"
+        assert user.get_state()["tokens"] == 0, "Tenant denial refunded the user"
+
+    @pytest.mark.parametrize(
+        "make",
+        [
+            lambda clock: TokenBucket(5, 1, clock=clock),
+            lambda clock: FixedWindow(5, 1, clock=clock),
+            lambda clock: SlidingWindowLog(5, 1, clock=clock),
+            lambda clock: SlidingWindowCounter(5, 1, 10, clock=clock),
+        ],
+    )
+    def test_refund_restores_state(self, make):
+        clock = ManualClock(1000.0)
+        limiter = make(clock)
+        assert limiter.allow_request(2)
+        state = limiter.get_state()
+        assert limiter.allow_request(3)
+        limiter._refund(3)
+        assert limiter.get_state() == state, "Refund should undo the admission"
+
+    def test_check_reports_denying_limit_and_longest_wait(self):
+        clock = ManualClock(1000.0)
+        limiter = CompositeLimiter(
+            {
+                "user": TokenBucket(1, 1, clock=clock),
+                "global": SlidingWindowLog(1, 10, clock=clock),
+            },
+            reorder=False,
+        )
+        assert limiter.check().allowed
+        clock.advance(0.5)
+        decision = limiter.check()
+        assert not decision.allowed
+        assert decision.denied_by == "user", "The first denying limit is reported"
+        assert decision.retry_after == pytest.approx(9.5), "The log waits longest"
+        assert limiter.check(cost=2).retry_after == math.inf
+
+    def test_reorder_moves_denying_limit_forward(self):
+        clock = ManualClock(1000.0)
+        limiter = CompositeLimiter(
+            {
+                "loose": TokenBucket(100, 1, clock=clock),
+                "medium": TokenBucket(50, 1, clock=clock),
+                "strict": FixedWindow(1, 10, clock=clock),
+            }
+        )
+        for _ in range(5):
+            limiter.allow_request()
+        assert list(limiter.get_state()) == ["strict", "loose", "medium"]
+        assert limiter.get_state()["loose"]["tokens"] == 99, "Denials are refunded"
+
+    def test_acquire_waits_for_every_limit(self):
+        clock = ManualClock(1000.0)
+        limiter = CompositeLimiter(
+            {
+                "user": TokenBucket(1, 1, clock=clock),
+                "tenant": TokenBucket(1, 1, clock=clock),
+            }
+        )
+        assert limiter.allow_request()
+
+        async def main():
+            return await limiter.acquire(timeout=0.5)
+
+        assert not asyncio.run(main()), "Both buckets need a second to refill"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_limiter_without_refunds(self):
+        CompositeLimiter({"log": CompactSlidingWindowLog(1, 1)})
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_no_limiters(self):
+        CompositeLimiter({})
@@ -0,0 +1,176 @@
+import math
+import random
+
+import pytest
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.gcra import GCRA
+from src.rate_limiting.keyed_store import (
+    KeyedAlignedFixedWindow,
+    KeyedFixedWindow,
+    KeyedGCRA,
+    KeyedLeakyBucket,
+    KeyedSlidingWindowCounter,
+    KeyedSlidingWindowLog,
+    KeyedTokenBucket,
+)
+from src.rate_limiting.sketch_window import SketchSlidingWindow
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import (
+    CompactSlidingWindowLog,
+    SlidingWindowLog,
+)
+from src.rate_limiting.synchronized import SynchronizedLimiter
+from src.rate_limiting.token_bucket import TokenBucket
+
+SINGLE = {
+    "token_bucket": lambda clock: TokenBucket(3, 1, clock=clock),
+    "gcra": lambda clock: GCRA(3, 2, clock=clock),
+    "fixed_window": lambda clock: FixedWindow(3, 10, clock=clock),
+    "sliding_window_log": lambda clock: SlidingWindowLog(3, 10, clock=clock),
+    "compact_log": lambda clock: CompactSlidingWindowLog(3, 10, clock=clock),
+    "sliding_window_counter": lambda clock: SlidingWindowCounter(3, 10, 5, clock=clock),
+}
+
+KEYED = {
+    "token_bucket": lambda **kw: KeyedTokenBucket(3, 1, **kw),
+    "gcra": lambda **kw: KeyedGCRA(3, 2, **kw),
+    "fixed_window": lambda **kw: KeyedFixedWindow(3, 10, **kw),
+    "sliding_window_log": lambda **kw: KeyedSlidingWindowLog(3, 10, **kw),
+    "bucketed_log": lambda **kw: KeyedSlidingWindowLog(3, 10, precision=5, **kw),
+    "sliding_window_counter": lambda **kw: KeyedSlidingWindowCounter(3, 10, 5, **kw),
+    "weighted_counter": lambda **kw: KeyedSlidingWindowCounter(
+        3, 10, 5, weighted=True, **kw
+    ),
+    "leaky_bucket": lambda **kw: KeyedLeakyBucket(3, 1, **kw),
+}
+
+
+def admitted_after(decision, check, clock) -> bool:
+    """Whether a request is admitted once the announced wait has passed."""
+    # Windows end strictly after their last timestamp, step just past it
+    clock.advance(decision.retry_after + 1e-6)
+    return check().allowed
+
+
+class TestDecision:
+    @pytest.mark.parametrize("name", SINGLE)
+    def test_single_retry_after_admits(self, name):
+        clock = ManualClock(1000.0)
+        limiter = SINGLE[name](clock)
+        clock.advance(0.3)
+        decisions = [limiter.check() for _ in range(4)]
+        assert [d.allowed for d in decisions] == [True] * 3 + [False]
+        assert decisions[0].retry_after == 0.0
+        denied = decisions[-1]
+        assert denied.retry_after > 0, "A full limiter asks to wait"
+        assert admitted_after(denied, limiter.check, clock)
+
+    @pytest.mark.parametrize("name", KEYED)
+    @pytest.mark.parametrize("deny_cache", [False, True])
+    def test_keyed_retry_after_is_exact(self, name, deny_cache):
+        clock = ManualClock(1000.0)
+        store = KEYED[name](clock=clock, deny_cache=deny_cache)
+        clock.advance(0.3)
+        decisions = [store.check("a") for _ in range(4)]
+        assert [d.allowed for d in decisions] == [True] * 3 + [False]
+        denied = decisions[-1]
+        assert denied.retry_after > 0
+        assert store.retry_after("a") == pytest.approx(denied.retry_after)
+        clock.advance(denied.retry_after * 0.9)
+        assert not store.check("a").allowed, "Denied before the announced time"
+        assert store.check("b").allowed, "Other keys are not affected"
+        assert admitted_after(store.check("a"), lambda: store.check("a"), clock)
+
+    @pytest.mark.parametrize("name", KEYED)
+    @pytest.mark.parametrize("deny_cache", [False, True])
+    def test_keyed_cost(self, name, deny_cache):
+        clock = ManualClock(1000.0)
+        store = KEYED[name](clock=clock, deny_cache=deny_cache)
+        clock.advance(0.3)
+        assert store.allow_request("a", 2)
+        denied = store.check("a", 2)
+        assert not denied.allowed, "Only one of three requests is left"
+        assert store.retry_after("a", 2) == pytest.approx(denied.retry_after)
+        assert store.check("a", 4) == (False, math.inf)
+        assert admitted_after(denied, lambda: store.check("a", 2), clock)
+
+    @pytest.mark.parametrize("name", KEYED)
+    @pytest.mark.parametrize("thread_safe", [False, True])
+    def test_deny_cache_keeps_decisions(self, name, thread_safe):
+        rng = random.Random(7)
+        clocks = [ManualClock(1000.0), ManualClock(1000.0)]
+        plain = KEYED[name](clock=clocks[0], max_keys=8)
+        cached = KEYED[name](
+            clock=clocks[1], max_keys=8, thread_safe=thread_safe, deny_cache=True
+        )
+        for _ in range(5_000):
+            step = rng.expovariate(5.0)
+            key = rng.randrange(6)
+            for clock in clocks:
+                clock.advance(step)
+            assert cached.allow_request(key) == plain.allow_request(key)
+
+    @pytest.mark.parametrize("name", KEYED)
+    @pytest.mark.parametrize("thread_safe", [False, True])
+    def test_deny_cache_keeps_decisions_when_evicting(self, name, thread_safe):
+        rng = random.Random(11)
+        clocks = [ManualClock(1000.0), ManualClock(1000.0)]
+        stores = [
+            KEYED[name](clock=clock, max_keys=3, thread_safe=thread_safe, **kw)
+            for clock, kw in zip(clocks, [{}, {"deny_cache": True}])
+        ]
+        for _ in range(5_000):
+            step = rng.expovariate(10.0)
+            # A hammering key among more keys than max_keys
+            key = "hot" if rng.random() < 0.5 else rng.randrange(10)
+            for clock in clocks:
+                clock.advance(step)
+            plain, cached = (store.allow_request(key) for store in stores)
+            assert cached == plain
+
+    def test_deny_cache_skips_the_record(self):
+        clock = ManualClock(1000.0)
+        store = KeyedSlidingWindowLog(1, 10, clock=clock, deny_cache=True)
+        assert store.allow_request("a")
+        assert not store.allow_request("a")
+        last = store.get_key_state("a")["last"]
+        clock.advance(5)
+        assert not store.allow_request("a")
+        assert store.get_key_state("a")["last"] == last, "Denied by the cache"
+
+    def test_deny_cache_is_bounded(self):
+        clock = ManualClock(1000.0)
+        store = KeyedFixedWindow(1, 10, clock=clock, max_keys=4, deny_cache=True)
+        for key in range(10):
+            store.allow_request(key)
+            store.allow_request(key)
+        assert len(store._denials[0]) == 4
+
+    def test_cost_never_fits(self):
+        clock = ManualClock(1000.0)
+        bucket = KeyedTokenBucket(3, 1, clock=clock)
+        assert bucket.check("a", 4).retry_after == math.inf
+        assert TokenBucket(3, 1, clock=clock).check(4).retry_after == math.inf
+        store = KeyedGCRA(3, 1, clock=clock, deny_cache=True)
+        assert store.check("a", 4).retry_after == math.inf
+        assert store.check("a").allowed, "Only the cost 1 wait is cached"
+
+    def test_aligned_fixed_window(self):
+        clock = ManualClock(1000.0)
+        store = KeyedAlignedFixedWindow(1, 60, clock=clock)
+        assert store.check("a").allowed
+        decision = store.check("a")
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(20.0), "Next window at 1020"
+
+    def test_unknown_wait(self):
+        limiter = SketchSlidingWindow(1, 60, 6)
+        limiter.check("a")
+        assert limiter.check("a") == (False, None)
+
+    def test_synchronized(self):
+        clock = ManualClock(1000.0)
+        limiter = SynchronizedLimiter(GCRA(1, 1, clock=clock))
+        assert limiter.check().allowed
+        assert limiter.check().retry_after == pytest.approx(1.0)
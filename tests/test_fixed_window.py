@@ -1,6 +1,7 @@
 import pytest
 import time
 from unittest.mock import ANY
+from src.rate_limiting.clock import ManualClock
 from src.rate_limiting.fixed_window import FixedWindow
 
 
@@ -36,3 +37,25 @@ class TestFixedWindow:
     def test_fixed_window_rate_limit(self, capacity, window_size):
         fixed_window = FixedWindow(capacity, window_size)
         assert fixed_window.get_rate_limit() == (capacity, window_size)
+
+    def test_window_resets_repeatedly(self):
+        window = FixedWindow(1, 0.1)
+        for _ in range(3):
+            assert window.allow_request(), "Should allow request in a new window"
+            assert not window.allow_request()
+            time.sleep(0.11)
+
+    def test_request_cost(self):
+        window = FixedWindow(5, 2)
+        assert window.allow_request(3)
+        assert not window.allow_request(3), "Should not exceed capacity"
+        assert window.allow_request(2)
+
+    def test_aligned_windows(self):
+        clock = ManualClock(1000.5)
+        window = FixedWindow(2, 2, clock=clock, aligned=True)
+        assert window.allow_request(2)
+        assert not window.allow_request()
+        assert window._wait_time() == pytest.approx(1.5), "Window ends at 1002"
+        clock.advance(1.5)
+        assert window.allow_request(2), "Should allow requests in the next window"
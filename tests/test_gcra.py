@@ -0,0 +1,88 @@
+import math
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.gcra import GCRA
+from src.rate_limiting.keyed_store import KeyedGCRA
+from src.rate_limiting.shared_store import SharedGCRA
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+class TestGCRA:
+    def test_burst_up_to_capacity(self):
+        clock = ManualClock(1000.0)
+        limiter = GCRA(3, 1, clock=clock)
+        assert [limiter.allow_request() for _ in range(4)] == [True] * 3 + [False]
+        clock.advance(1)
+        assert limiter.allow_request(), "One request should fit after 1s"
+        assert not limiter.allow_request()
+
+    def test_retry_after_is_exact(self):
+        clock = ManualClock(1000.0)
+        limiter = GCRA(2, 4, clock=clock)
+        assert limiter.allow_request(2)
+        assert limiter.retry_after() == pytest.approx(0.25)
+        assert limiter.retry_after(2) == pytest.approx(0.5)
+        clock.advance(0.25)
+        assert limiter.retry_after() == pytest.approx(0.0)
+        assert limiter.allow_request()
+
+    def test_retry_after_cost_above_capacity(self):
+        limiter = GCRA(2, 1, clock=ManualClock(1000.0))
+        assert limiter.retry_after(5) == math.inf, "Cost 5 never fits in 2"
+        assert limiter.retry_after(2) == 0.0
+        assert limiter.check(5) == (False, math.inf)
+
+    def test_fractional_refills_are_kept(self):
+        clock = ManualClock(1000.0)
+        gcra = GCRA(2, 3, clock=clock)
+        bucket = TokenBucket(2, 3, clock=clock)
+        admitted = {"gcra": 0, "token_bucket": 0}
+        for _ in range(90):
+            clock.advance(0.1)
+            admitted["gcra"] += gcra.allow_request()
+            admitted["token_bucket"] += bucket.allow_request()
+        assert 2 + 26 <= admitted["gcra"] <= 2 + 27, "A burst, then 3 per second"
+        assert 2 + 26 <= admitted["token_bucket"] <= 2 + 27, "Refills add up"
+
+    def test_matches_token_bucket_decisions(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedGCRA(5, 2, clock=clock)
+        gaps = [0.0, 0.1, 0.0, 0.7, 0.2, 0.0, 1.5, 0.05, 0.0, 0.3] * 10
+        decisions = []
+        tokens, last = 5.0, clock()
+        for gap in gaps:
+            clock.advance(gap)
+            tokens = min(5.0, tokens + (clock() - last) * 2)
+            last = clock()
+            expected = tokens >= 1
+            tokens -= expected
+            decisions.append((limiter.allow_request("a"), expected))
+        assert all(actual == expected for actual, expected in decisions)
+
+    def test_keyed_record_holds_one_float(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedGCRA(2, 1, clock=clock)
+        assert limiter.allow_request("a")
+        assert limiter.get_key_state("a") == {"tat": 1001.0}
+        assert limiter.retry_after("a", 2) == pytest.approx(1.0)
+        clock.advance(1)
+        assert limiter.evict_idle() == 1, "Evicted once its TAT has passed"
+
+    def test_shared_store(self):
+        limiter = SharedGCRA(2, 1, clock=ManualClock(1000.0), slots=16, stripes=1)
+        try:
+            assert [limiter.allow_request("a") for _ in range(3)] == [
+                True,
+                True,
+                False,
+            ]
+            assert limiter.get_key_state("a")["tat"] == 1002.0
+        finally:
+            limiter.close()
+            limiter.unlink()
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_invalid_rate(self):
+        GCRA(1, 0)
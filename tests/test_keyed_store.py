@@ -0,0 +1,193 @@
+import random
+
+import pytest
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import (
+    KeyedAlignedFixedWindow,
+    KeyedFixedWindow,
+    KeyedLeakyBucket,
+    KeyedSlidingWindowCounter,
+    KeyedSlidingWindowLog,
+    KeyedTokenBucket,
+)
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+
+
+class TestKeyedStore:
+    def test_keys_are_independent(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedTokenBucket(2, 1, clock=clock)
+        assert limiter.allow_request("a")
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a"), "Key a should be out of tokens"
+        assert limiter.allow_request("b"), "Key b should have its own bucket"
+
+    def test_token_bucket_keeps_fractional_refill(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedTokenBucket(1, 2, clock=clock)
+        assert limiter.allow_request("a")
+        clock.advance(0.25)
+        assert not limiter.allow_request("a")
+        clock.advance(0.25)
+        assert limiter.allow_request("a"), "Two half-token refills make a token"
+
+    def test_max_keys_evicts_least_recently_used(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedFixedWindow(1, 10, max_keys=2, clock=clock)
+        limiter.allow_request("a")
+        limiter.allow_request("b")
+        limiter.allow_request("a")
+        limiter.allow_request("c")
+        assert len(limiter) == 2
+        assert "a" in limiter and "c" in limiter
+        assert "b" not in limiter, "Least recently used key should be evicted"
+
+    def test_idle_keys_are_evicted_first(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedTokenBucket(2, 1, max_keys=3, clock=clock)
+        limiter.allow_request("a")
+        clock.advance(1)
+        limiter.allow_request("b")
+        clock.advance(1.5)
+        limiter.allow_request("c")
+        assert "a" not in limiter, "Key a refilled fully and should be evicted"
+        assert "b" in limiter
+
+    def test_evict_idle(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedSlidingWindowLog(2, 5, ttl=1, clock=clock)
+        for key in range(10):
+            limiter.allow_request(key)
+        clock.advance(1)
+        assert limiter.evict_idle() == 10
+        assert len(limiter) == 0
+
+    def test_fixed_window(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedFixedWindow(2, 2, clock=clock)
+        assert limiter.allow_request("a")
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+        clock.advance(2.1)
+        assert limiter.allow_request("a")
+
+    def test_sliding_window_log(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedSlidingWindowLog(2, 2, clock=clock)
+        assert limiter.allow_request("a")
+        clock.advance(1)
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+        clock.advance(1.1)
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+
+    def test_sliding_window_counter(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedSlidingWindowCounter(2, 2, 2, clock=clock)
+        assert limiter.allow_request("a")
+        clock.advance(1.3)
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+        clock.advance(1.3)
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+
+    def test_leaky_bucket(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedLeakyBucket(3, 1, clock=clock)
+        for i in range(3):
+            assert limiter.allow_request("a"), f"Request {i + 1} should be allowed"
+        assert not limiter.allow_request("a"), "Bucket should be full"
+        clock.advance(1)
+        assert limiter.allow_request("a"), "One request should have leaked out"
+
+    def test_key_state(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedFixedWindow(4, 2, clock=clock)
+        limiter.allow_request("a")
+        assert limiter.get_key_state("a") == {
+            "last": 1000.0,
+            "window_start": 1000.0,
+            "counter": 1,
+        }
+        assert limiter.get_key_state("b") is None
+        assert limiter.get_state() == {"keys": 1, "max_keys": 100_000, "ttl": 2}
+
+    @pytest.mark.xfail(raises=ValueError)
+    @pytest.mark.parametrize("params", [(-2, 4), (5, -2)])
+    def test_valid_params(self, params):
+        KeyedTokenBucket(*params)
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_valid_max_keys(self):
+        KeyedTokenBucket(5, 2, max_keys=0)
+
+    def test_weighted_sliding_window_counter(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedSlidingWindowCounter(2, 2, 1, weighted=True, clock=clock)
+        assert limiter.allow_request("a")
+        assert limiter.allow_request("a")
+        clock.advance(3)
+        # Previous window counts 2 * 0.5 = 1 request, leaving room for one.
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+
+    def test_weighted_counter_matches_single_stream(self):
+        clock = ManualClock(1000.0)
+        single = SlidingWindowCounter(4, 2, 1, weighted=True, clock=clock)
+        keyed = KeyedSlidingWindowCounter(4, 2, 1, weighted=True, clock=clock)
+        for _ in range(4):
+            assert keyed.allow_request("a") and single.allow_request()
+        clock.advance(2.4)
+        # Previous window counts 4 * 0.8 = 3.2 requests, no room for one more
+        assert not keyed.allow_request("a") and not single.allow_request()
+        rng = random.Random(3)
+        for _ in range(2_000):
+            clock.advance(rng.expovariate(3.0))
+            assert keyed.allow_request("a") == single.allow_request()
+
+    def test_approximate_sliding_window_log(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedSlidingWindowLog(2, 2, precision=2, clock=clock)
+        assert limiter.allow_request("a")
+        assert limiter.allow_request("a")
+        assert not limiter.allow_request("a")
+        clock.advance(3.1)
+        assert limiter.allow_request("a")
+
+
+class TestKeyedAlignedFixedWindow:
+    def test_windows_are_aligned_for_all_keys(self):
+        clock = ManualClock(1000.5)
+        limiter = KeyedAlignedFixedWindow(2, 10, clock=clock)
+        assert limiter.allow_request("a", 2)
+        assert not limiter.allow_request("a")
+        assert limiter.allow_request("b"), "Keys should be counted independently"
+        assert limiter.get_state()["window_start"] == 1000
+        clock.advance(9.5)
+        assert limiter.allow_request("a"), "A window starts at 1010 for every key"
+        assert limiter.get_key_state("b") is None, "All keys expired at once"
+        assert len(limiter) == 1
+
+    def test_max_keys_drops_first_counted(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedAlignedFixedWindow(1, 10, max_keys=2, clock=clock)
+        for key in ["a", "b", "c"]:
+            assert limiter.allow_request(key)
+        assert "a" not in limiter and "c" in limiter
+        assert limiter.allow_request("a"), "A dropped key starts over"
+
+    def test_thread_safe_shards_switch_generation(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedAlignedFixedWindow(1, 1, clock=clock, thread_safe=True)
+        keys = [f"client-{i}" for i in range(100)]
+        assert all(limiter.allow_request(key) for key in keys)
+        assert not any(limiter.allow_request(key) for key in keys)
+        clock.advance(1)
+        assert len(limiter) == 0
+        assert all(limiter.allow_request(key) for key in keys)
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_valid_params(self):
+        KeyedAlignedFixedWindow(1, 0)
@@ -1,8 +1,11 @@
 import pytest
+import threading
 import time
 from unittest.mock import ANY
+from src.rate_limiting.clock import ManualClock
 from src.rate_limiting.leaky_bucket import LeakyBucket
 
+
 # @pytest.fixture
 def forward(item):
     print(f"Forwarded item {item}")
@@ -16,11 +19,15 @@ class TestLeakyBucket:
         assert leaky_bucket.allow_request("Request 2"), "Should allow second request"
         assert leaky_bucket.allow_request("Request 3"), "Should allow third request"
 
-        assert not leaky_bucket.allow_request("Request 4"), "Should not allow fourth request, bucket is full"
+        assert not leaky_bucket.allow_request(
+            "Request 4"
+        ), "Should not allow fourth request, bucket is full"
 
         time.sleep(1.1)
         # After some time, the bucket should allow one more request
-        assert leaky_bucket.allow_request("Request 5"), "Should allow a request after time has passed"
+        assert leaky_bucket.allow_request(
+            "Request 5"
+        ), "Should allow a request after time has passed"
 
     @pytest.mark.xfail(raises=ValueError)
     @pytest.mark.parametrize("bucket_size, outflow_rate", [(-2, 4), (5, -2)])
@@ -28,7 +35,6 @@ class TestLeakyBucket:
         bucket = LeakyBucket(bucket_size, outflow_rate, forward)
         bucket.stop()
 
-
     def test_leaky_bucket_state(self):
         bucket = LeakyBucket(4, 1, forward)
         for i in range(4):
@@ -36,14 +42,129 @@ class TestLeakyBucket:
         assert bucket.get_state() == {
             "bucket_size": 4,
             "outflow_rate": 1,
-            "queue_length": ANY
+            "queue_length": ANY,
         }, "Leaky bucket accepts all requests"
         bucket.stop()
 
-    @pytest.mark.parametrize(
-        "bucket_size, outflow_rate", [(2, 3), (15, 2)]
-    )
+    @pytest.mark.parametrize("bucket_size, outflow_rate", [(2, 3), (15, 2)])
     def test_leaky_bucket_rate_limit(self, bucket_size, outflow_rate):
         bucket = LeakyBucket(bucket_size, outflow_rate, forward)
         assert bucket.get_rate_limit() == outflow_rate
-        bucket.stop()
\ No newline at end of file
+        bucket.stop()
+
+
+class Recorder:
+    """Records the clock time of every request the bucket emits."""
+
+    def __init__(self, clock, gate=None):
+        self.clock = clock
+        self.gate = gate
+        self.times = []
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def handle(self, item):
+        with self.lock:
+            self.times.append(self.clock())
+        if self.gate is not None:
+            self.gate.wait()
+
+    def handle_batch(self, batch):
+        with self.lock:
+            self.batches.append(batch)
+            self.times.extend([self.clock()] * len(batch))
+        if self.gate is not None:
+            self.gate.wait()
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.times) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return len(self.times) >= count
+
+
+class TestPacedLeakyBucket:
+    """Paced buckets sleep on a `ManualClock`, so emit times are exact."""
+
+    def test_achieved_rate(self):
+        clock = ManualClock(1000.0)
+        recorder = Recorder(clock)
+        bucket = LeakyBucket(
+            100, 100, recorder.handle, paced=True, clock=clock, sleep=clock.advance
+        )
+        for i in range(51):
+            assert bucket.allow_request(i)
+        assert recorder.wait_for(51)
+        bucket.stop()
+        assert recorder.times == pytest.approx(
+            [1000.0 + i / 100 for i in range(51)]
+        ), "Output should be evenly spaced at 100 req/s"
+
+    def test_latency_after_idle(self):
+        clock = ManualClock(1000.0)
+        recorder = Recorder(clock)
+        bucket = LeakyBucket(
+            10, 1, recorder.handle, paced=True, clock=clock, sleep=clock.advance
+        )
+        assert bucket.allow_request("First")
+        assert recorder.wait_for(1)
+        clock.advance(5)
+        assert bucket.allow_request("Second")
+        assert recorder.wait_for(2)
+        bucket.stop()
+        assert recorder.times == [1000.0, 1005.0], "Idle bucket should emit at once"
+
+    def test_batch_handler(self):
+        clock = ManualClock(1000.0)
+        gate = threading.Event()
+        recorder = Recorder(clock, gate)
+        bucket = LeakyBucket(
+            500,
+            1000,
+            batch_handler=recorder.handle_batch,
+            batch_interval=0.02,
+            clock=clock,
+            sleep=clock.advance,
+        )
+        for i in range(300):
+            bucket.allow_request(i)
+        gate.set()
+        assert recorder.wait_for(300)
+        bucket.stop()
+        emitted = [item for batch in recorder.batches for item in batch]
+        assert emitted == list(range(300))
+        assert max(len(batch) for batch in recorder.batches) == 20
+        assert all(len(batch) == 20 for batch in recorder.batches[1:-1])
+        expected, first = [], 0
+        for batch in recorder.batches:
+            expected.extend([1000.0 + first / 1000] * len(batch))
+            first += len(batch)
+        assert recorder.times == pytest.approx(
+            expected
+        ), "Each batch is emitted once the requests before it drained at 1000/s"
+
+    def test_workers_keep_rate_with_slow_handler(self):
+        clock = ManualClock(1000.0)
+        gate = threading.Event()
+        recorder = Recorder(clock, gate)
+        bucket = LeakyBucket(
+            50,
+            50,
+            recorder.handle,
+            paced=True,
+            workers=4,
+            clock=clock,
+            sleep=clock.advance,
+        )
+        for i in range(25):
+            bucket.allow_request(i)
+        assert recorder.wait_for(4), "Blocked handlers should not stall the outflow"
+        assert len(recorder.times) == 4, "All workers are busy"
+        gate.set()
+        assert recorder.wait_for(25)
+        bucket.stop()
+        assert clock() == pytest.approx(1000.48), "Outflow kept at 50 req/s"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_handler_required(self):
+        LeakyBucket(5, 2)
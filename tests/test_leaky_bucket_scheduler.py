@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+from src.rate_limiting.leaky_bucket import LeakyBucket
+from src.rate_limiting.leaky_bucket_scheduler import LeakyBucketScheduler
+
+
+class Recorder:
+    def __init__(self):
+        self.items = []
+        self.lock = threading.Lock()
+
+    def handle(self, item):
+        with self.lock:
+            self.items.append((item, time.monotonic()))
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.items) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return len(self.items) >= count
+
+
+class TestLeakyBucketScheduler:
+    def test_many_buckets_share_one_thread(self):
+        threads = threading.active_count()
+        scheduler = LeakyBucketScheduler().start()
+        recorder = Recorder()
+        buckets = [
+            LeakyBucket(5, 20, recorder.handle, scheduler=scheduler)
+            for _ in range(10_000)
+        ]
+        assert threading.active_count() == threads + 1
+        for i in range(0, 10_000, 100):
+            for j in range(3):
+                assert buckets[i].allow_request((i, j))
+        assert recorder.wait_for(300)
+        scheduler.stop()
+        by_bucket = {}
+        for (i, j), t in recorder.items:
+            by_bucket.setdefault(i, []).append((j, t))
+        assert len(by_bucket) == 100
+        for emitted in by_bucket.values():
+            assert [j for j, _ in emitted] == [0, 1, 2], "Requests keep their order"
+            assert emitted[2][1] - emitted[0][1] >= 0.09, "Outflow paced at 20/s"
+
+    def test_idle_buckets_cost_nothing(self):
+        scheduler = LeakyBucketScheduler().start()
+        recorder = Recorder()
+        buckets = [
+            LeakyBucket(5, 1000, recorder.handle, scheduler=scheduler)
+            for _ in range(10_000)
+        ]
+        buckets[0].allow_request("Request")
+        assert recorder.wait_for(1)
+        time.sleep(0.05)
+        assert len(scheduler) == 0, "Drained buckets should leave the heap"
+        start = time.process_time()
+        time.sleep(0.3)
+        assert time.process_time() - start < 0.05, "Idle scheduler should sleep"
+        scheduler.stop()
+
+    def test_stopped_bucket_is_unregistered(self):
+        scheduler = LeakyBucketScheduler().start()
+        recorder = Recorder()
+        bucket = LeakyBucket(5, 10, recorder.handle, scheduler=scheduler)
+        for i in range(5):
+            bucket.allow_request(i)
+        bucket.stop()
+        time.sleep(0.2)
+        scheduler.stop()
+        assert len(recorder.items) <= 1
+        assert len(scheduler) == 0
+
+    def test_asyncio_runner(self):
+        recorder = Recorder()
+
+        async def scenario():
+            scheduler = LeakyBucketScheduler()
+            task = asyncio.ensure_future(scheduler.run())
+            bucket = LeakyBucket(10, 50, recorder.handle, scheduler=scheduler)
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            for i in range(5):
+                bucket.allow_request(i)
+            while len(recorder.items) < 5:
+                await asyncio.sleep(0.005)
+            scheduler.stop()
+            await task
+            return start
+
+        start = asyncio.run(scenario())
+        assert [item for item, _ in recorder.items] == [0, 1, 2, 3, 4]
+        assert recorder.items[0][1] - start < 0.02, "Idle task should wake at once"
+        assert recorder.items[4][1] - recorder.items[0][1] >= 0.075
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.leasing import LeasedTokenBucket, TokenAllocator
+
+
+def simulate(clock, nodes, demands, seconds, step=0.01):
+    """Send each node its demand in requests per second, return admissions.
+
+    Returns:
+        list: Time and number of requests admitted by all nodes per step.
+    """
+    admissions = []
+    owed = [0.0] * len(nodes)
+    for _ in range(round(seconds / step)):
+        clock.advance(step)
+        admitted = 0
+        for i, (node, demand) in enumerate(zip(nodes, demands)):
+            owed[i] += demand * step
+            while owed[i] >= 1:
+                owed[i] -= 1
+                admitted += node.allow_request()
+        admissions.append((clock(), admitted))
+    return admissions
+
+
+class TestLeasedTokenBucket:
+    def test_decides_locally_between_leases(self):
+        clock = ManualClock(1000.0)
+        allocator = TokenAllocator(1_000, 200, clock=clock)
+        node = LeasedTokenBucket(allocator, background=False, clock=clock)
+        admissions = simulate(clock, [node], [100], seconds=10)
+        assert sum(a for _, a in admissions) == 1_000, "Demand is within the limit"
+        assert allocator.leases < 50, f"{allocator.leases} round trips for 1000"
+
+    def test_lease_size_follows_demand(self):
+        clock = ManualClock(1000.0)
+        allocator = TokenAllocator(10_000, 1_000, clock=clock)
+        busy = LeasedTokenBucket(allocator, background=False, clock=clock)
+        quiet = LeasedTokenBucket(allocator, background=False, clock=clock)
+        simulate(clock, [busy, quiet], [200, 5], seconds=5)
+        busy_lease = busy.get_state()["lease_size"]
+        quiet_lease = quiet.get_state()["lease_size"]
+        assert 100 <= busy_lease <= 400, f"Lease of {busy_lease} for 200 requests/s"
+        assert quiet_lease < 20, f"Lease of {quiet_lease} for 5 requests/s"
+
+    def test_over_admission_is_bounded(self):
+        clock = ManualClock(1000.0)
+        capacity, rate, max_lease = 100, 100, 20
+        allocator = TokenAllocator(capacity, rate, clock=clock)
+        nodes = [
+            LeasedTokenBucket(
+                allocator, max_lease=max_lease, background=False, clock=clock
+            )
+            for _ in range(4)
+        ]
+        start = clock()
+        admissions = simulate(clock, nodes, [200, 150, 100, 50], seconds=5)
+        total = 0
+        for now, admitted in admissions:
+            total += admitted
+            assert (
+                total <= capacity + rate * (now - start) + 1e-6
+            ), "Nodes should never admit more than the allocator granted"
+        bound = capacity + len(nodes) * max_lease
+        for first in range(len(admissions)):
+            admitted = 0
+            for last in range(first, len(admissions)):
+                admitted += admissions[last][1]
+                interval = admissions[last][0] - admissions[first][0]
+                assert admitted <= bound + rate * (
+                    interval + 0.01
+                ), f"{admitted} admitted within {interval:.2f}s"
+
+    def test_exhausted_allocator_is_not_polled(self):
+        clock = ManualClock(1000.0)
+        allocator = TokenAllocator(5, 1, clock=clock)
+        node = LeasedTokenBucket(allocator, background=False, clock=clock)
+        assert sum(node.allow_request() for _ in range(10)) == 5
+        leases = allocator.leases
+        assert not any(node.allow_request() for _ in range(10))
+        assert allocator.leases == leases, "Denials should wait for the retry time"
+        clock.advance(1)
+        assert node.allow_request(), "A token should be available after 1s"
+
+    def test_close_returns_unused_tokens(self):
+        clock = ManualClock(1000.0)
+        allocator = TokenAllocator(100, 1, clock=clock)
+        node = LeasedTokenBucket(allocator, min_lease=40, background=False, clock=clock)
+        assert node.allow_request()
+        assert allocator.get_state()["tokens"] == 60
+        node.close()
+        assert allocator.get_state()["tokens"] == 99, "39 unused tokens returned"
+        assert not node.allow_request(), "A closed node admits nothing"
+
+    def test_background_renewal_tops_up_lease(self):
+        allocator = TokenAllocator(1_000, 1)
+        with LeasedTokenBucket(allocator, min_lease=10) as node:
+            while node._renewal is None:
+                assert node.allow_request()
+            node._renewal.result(timeout=5)
+            assert node.get_state()["tokens"] >= 10, "Lease should be topped up"
+
+    def test_close_during_a_decision(self):
+        clock = ManualClock(1000.0)
+        allocator = TokenAllocator(1_000, 1, clock=clock)
+        armed = []
+
+        def closing_clock():
+            # Close from another thread while a decision holds the lock
+            if armed:
+                closer = armed.pop()
+                closer.start()
+                closer.join(0.1)
+            return clock()
+
+        node = LeasedTokenBucket(allocator, min_lease=10, clock=closing_clock)
+        for _ in range(5):
+            assert node.allow_request()
+        closer = threading.Thread(target=node.close)
+        armed.append(closer)
+        assert node.allow_request(), "The decision triggering a renewal succeeds"
+        closer.join()
+        assert not node._renewing
+        assert allocator.get_state()["tokens"] == 994, "Unused tokens returned"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_invalid_lease_sizes(self):
+        LeasedTokenBucket(TokenAllocator(10, 1), min_lease=5, max_lease=2)
@@ -0,0 +1,123 @@
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.composite import CompositeLimiter
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.keyed_store import KeyedAlignedFixedWindow, KeyedTokenBucket
+from src.rate_limiting.metrics import Metrics
+from src.rate_limiting.middleware import WSGIMiddleware
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import SlidingWindowLog
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+def wsgi_hello(environ, start_response):
+    start_response("200 OK", [])
+    return [b"Hello"]
+
+
+def samples(text: str) -> dict:
+    """Map each sample line of a rendering to its value."""
+    values = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            values[series] = float(value)
+    return values
+
+
+class TestMetrics:
+    def test_counts_decisions(self):
+        registry = Metrics()
+        limiter = TokenBucket(3, 1, clock=ManualClock(1000.0))
+        metrics = registry.instrument(limiter, "api")
+        for _ in range(5):
+            limiter.allow_request()
+        assert metrics.decisions == [2, 3], "2 denied and 3 allowed"
+        values = samples(registry.render())
+        series = 'rate_limiter_decisions_total{limiter="api",decision="%s"}'
+        assert values[series % "allowed"] == 3
+        assert values[series % "denied"] == 2
+        assert values['rate_limiter_fill_level{limiter="api"}'] == 0
+
+    def test_uninstrument_restores_method(self):
+        registry = Metrics()
+        limiter = FixedWindow(3, 1, clock=ManualClock(1000.0))
+        registry.instrument(limiter, "api")
+        assert "allow_request" in vars(limiter)
+        registry.uninstrument("api")
+        assert "allow_request" not in vars(limiter), "The class method is used again"
+        assert limiter.allow_request()
+        assert "api" not in registry.render()
+
+    def test_counts_key_groups_with_overflow(self):
+        registry = Metrics(namespace="edge")
+        limiter = KeyedTokenBucket(1, 1, clock=ManualClock(1000.0))
+        metrics = registry.instrument(
+            limiter, "api", group=lambda key: key.split(":")[0], max_groups=2
+        )
+        for key in ["free:a", "free:a", "paid:b", "trial:c", "beta:d"]:
+            limiter.allow_request(key)
+        assert metrics.groups == {
+            "free": [1, 1],
+            "paid": [0, 1],
+            "other": [0, 2],
+        }, "Groups beyond max_groups are counted as other"
+        values = samples(registry.render())
+        labels = 'limiter="api",group="other",decision="allowed"'
+        assert values["edge_group_decisions_total{%s}" % labels] == 2
+        assert values['edge_fill_level{limiter="api"}'] == 4, "Number of keys"
+
+    def test_counts_middleware_decisions(self):
+        registry = Metrics()
+        limiter = KeyedTokenBucket(3, 1, clock=ManualClock(1000.0))
+        metrics = registry.instrument(limiter, "api", group=lambda key: "clients")
+        app = WSGIMiddleware(wsgi_hello, limiter, key="ip")
+        environ = {"PATH_INFO": "/", "REMOTE_ADDR": "10.0.0.1"}
+        for _ in range(5):
+            app(environ, lambda status, headers: None)
+        assert metrics.decisions == [2, 3], "Decisions through check are counted"
+        assert metrics.groups == {"clients": [2, 3]}
+        registry.uninstrument("api")
+        assert "check" not in vars(limiter)
+
+    @pytest.mark.parametrize(
+        "limiter",
+        [
+            TokenBucket(1, 1, clock=ManualClock(1000.0)),
+            KeyedAlignedFixedWindow(1, 60, clock=ManualClock(1000.0)),
+            CompositeLimiter({"user": FixedWindow(1, 60, clock=ManualClock(1000.0))}),
+        ],
+    )
+    def test_check_counts_once(self, limiter):
+        registry = Metrics()
+        metrics = registry.instrument(limiter, "api")
+        args = ("a",) if isinstance(limiter, KeyedAlignedFixedWindow) else ()
+        limiter.check(*args)
+        limiter.check(*args)
+        assert metrics.decisions == [1, 1]
+
+    def test_samples_latency(self):
+        registry = Metrics(buckets=(1.0,))
+        limiter = SlidingWindowLog(100, 1, clock=ManualClock(1000.0))
+        metrics = registry.instrument(limiter, "api", sample_every=4)
+        for _ in range(10):
+            limiter.allow_request()
+        assert sum(metrics.latency_counts) == 2, "Every 4th decision is timed"
+        assert metrics.decisions == [0, 10], "All decisions are counted"
+        values = samples(registry.render())
+        bucket = 'rate_limiter_decision_seconds_bucket{limiter="api",le="1.0"}'
+        assert values[bucket] == 2
+        assert values['rate_limiter_decision_seconds_count{limiter="api"}'] == 2
+
+    def test_escapes_label_values(self):
+        registry = Metrics()
+        registry.instrument(SlidingWindowCounter(1, 1, 10), 'say "hi"\\')
+        assert 'limiter="say \\"hi\\"\\\\"' in registry.render()
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_instrument_twice(self):
+        registry = Metrics()
+        limiter = TokenBucket(1, 1)
+        registry.instrument(limiter, "first")
+        Metrics().instrument(limiter, "second")
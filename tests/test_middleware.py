@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.composite import CompositeLimiter
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.gcra import GCRA
+from src.rate_limiting.keyed_store import KeyedFixedWindow, KeyedGCRA
+from src.rate_limiting.leaky_bucket import LeakyBucket
+from src.rate_limiting.middleware import ASGIMiddleware, WSGIMiddleware
+from src.rate_limiting.sketch_window import SketchSlidingWindow
+from src.rate_limiting.token_bucket import TokenBucket
+
+
+async def asgi_hello(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"Hello"})
+
+
+def wsgi_hello(environ, start_response):
+    start_response("200 OK", [])
+    return [b"Hello"]
+
+
+def asgi_get(app, path="/", headers=(), client=("10.0.0.1", 4321)):
+    """Return the status and headers of an ASGI response."""
+    scope = {
+        "type": "http",
+        "path": path,
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": client,
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}
+
+
+def wsgi_get(app, path="/", environ=None):
+    """Return the status code and headers of a WSGI response."""
+    environ = {"PATH_INFO": path, "REMOTE_ADDR": "10.0.0.1", **(environ or {})}
+    response = {}
+
+    def start_response(status, headers):
+        response["status"] = int(status.split()[0])
+        response["headers"] = dict(headers)
+
+    app(environ, start_response)
+    return response["status"], response["headers"]
+
+
+class TestASGIMiddleware:
+    def test_denies_with_headers(self):
+        clock = ManualClock(1000.0)
+        app = ASGIMiddleware(asgi_hello, KeyedGCRA(2, 0.5, clock=clock), key="ip")
+        assert [asgi_get(app)[0] for _ in range(2)] == [200, 200]
+        status, headers = asgi_get(app)
+        assert status == 429
+        assert headers["retry-after"] == "2", "One request refills in 2s"
+        assert headers["ratelimit-limit"] == "2"
+        assert headers["ratelimit-remaining"] == "0"
+        assert headers["ratelimit-reset"] == "2"
+        assert asgi_get(app, client=("10.0.0.2", 1))[0] == 200, "Other IP"
+
+    def test_header_rule_falls_back_to_ip(self):
+        limiter = KeyedFixedWindow(1, 60)
+        app = ASGIMiddleware(asgi_hello, limiter, key=["header:X-API-Key", "ip"])
+        assert asgi_get(app, headers=[("x-api-key", "a")])[0] == 200
+        assert asgi_get(app, headers=[("x-api-key", "a")])[0] == 429
+        assert asgi_get(app, headers=[("x-api-key", "b")])[0] == 200
+        assert asgi_get(app)[0] == 200, "Without the header, the IP is the key"
+        assert "a" in limiter and "10.0.0.1" in limiter
+
+    def test_global_limiter(self):
+        clock = ManualClock(1000.0)
+        app = ASGIMiddleware(asgi_hello, GCRA(1, 1, clock=clock))
+        assert asgi_get(app)[0] == 200
+        status, headers = asgi_get(app, client=("10.0.0.2", 1))
+        assert status == 429, "One limit for all clients"
+        assert headers["retry-after"] == "1"
+
+    def test_unknown_wait_omits_retry_after(self):
+        limiter = SketchSlidingWindow(1, 60, 6)
+        app = ASGIMiddleware(asgi_hello, limiter, key="ip")
+        asgi_get(app)
+        status, headers = asgi_get(app)
+        assert status == 429
+        assert "retry-after" not in headers
+        assert headers["ratelimit-limit"] == "1"
+
+    def test_composite_reports_the_tightest_limit(self):
+        clock = ManualClock(1000.0)
+        limiter = CompositeLimiter(
+            {
+                "hourly": FixedWindow(100, 3600, clock=clock),
+                "burst": TokenBucket(3, 1, clock=clock),
+            }
+        )
+        app = ASGIMiddleware(asgi_hello, limiter)
+        assert [asgi_get(app)[0] for _ in range(3)] == [200] * 3
+        status, headers = asgi_get(app)
+        assert status == 429
+        assert headers["ratelimit-limit"] == "3"
+        assert headers["retry-after"] == "1"
+
+    def test_other_scopes_pass_through(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["type"])
+
+        middleware = ASGIMiddleware(app, KeyedFixedWindow(1, 60), key="ip")
+        asyncio.run(middleware({"type": "lifespan"}, None, None))
+        assert seen == ["lifespan"]
+
+
+class TestWSGIMiddleware:
+    def test_denies_with_headers(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedGCRA(1, 0.25, clock=clock)
+        app = WSGIMiddleware(wsgi_hello, limiter, key="header:X-API-Key")
+        environ = {"HTTP_X_API_KEY": "a"}
+        assert wsgi_get(app, environ=environ)[0] == 200
+        status, headers = wsgi_get(app, environ=environ)
+        assert status == 429
+        assert headers["Retry-After"] == "4"
+        assert headers["RateLimit-Reset"] == "4"
+        clock.advance(4)
+        assert wsgi_get(app, environ=environ)[0] == 200
+
+    def test_path_segments(self):
+        limiter = KeyedFixedWindow(1, 60)
+        app = WSGIMiddleware(wsgi_hello, limiter, key="path:2")
+        assert wsgi_get(app, "/v1/users/1")[0] == 200
+        assert wsgi_get(app, "/v1/users/2")[0] == 429, "Same first 2 segments"
+        assert wsgi_get(app, "/v1/orders")[0] == 200
+        assert "/v1/users" in limiter and "/v1/orders" in limiter
+
+    def test_fixed_window_retry_after(self):
+        clock = ManualClock(1000.0)
+        limiter = KeyedFixedWindow(1, 60, clock=clock)
+        app = WSGIMiddleware(wsgi_hello, limiter, key="ip")
+        wsgi_get(app)
+        clock.advance(20.5)
+        assert wsgi_get(app)[1]["Retry-After"] == "40", "The window ends in 39.5s"
+
+    def test_missing_key_shares_one_limit(self):
+        limiter = KeyedFixedWindow(1, 60)
+        app = WSGIMiddleware(wsgi_hello, limiter, key="header:X-API-Key")
+        assert wsgi_get(app)[0] == 200
+        assert wsgi_get(app)[0] == 429
+        assert "" in limiter
+
+    def test_admitted_response_is_untouched(self):
+        app = WSGIMiddleware(wsgi_hello, KeyedFixedWindow(2, 60), key="ip")
+        assert wsgi_get(app) == (200, {}), "RateLimit headers are only sent on 429"
+
+    @pytest.mark.parametrize("key", [None, "ip"])
+    def test_leaky_bucket_rejected(self, key):
+        bucket = LeakyBucket(5, 1, print, paced=True)
+        try:
+            with pytest.raises(ValueError):
+                WSGIMiddleware(wsgi_hello, bucket, key=key)
+        finally:
+            bucket.stop()
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_unknown_rule(self):
+        WSGIMiddleware(wsgi_hello, KeyedFixedWindow(1, 60), key="cookie:id")
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_no_rules(self):
+        WSGIMiddleware(wsgi_hello, KeyedFixedWindow(1, 60), key=[])
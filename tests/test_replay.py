@@ -0,0 +1,157 @@
+import gzip
+import json
+
+import pytest
+from src.rate_limiting.replay.__main__ import main
+from src.rate_limiting.replay.runner import (
+    ALGORITHMS,
+    ReplayStats,
+    build_limiter,
+    parse_config,
+    read_trace,
+    replay,
+    replay_parallel,
+)
+
+
+def write_trace(path, requests):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt") as f:
+        for timestamp, key in requests:
+            f.write(f"{timestamp} {key} GET /index.html\n")
+    return str(path)
+
+
+def burst_trace(tmp_path, name="trace.log"):
+    """Client a sends 5 requests each second for 10 seconds, b one per second."""
+    requests = []
+    for second in range(10):
+        requests += [(1_700_000_000 + second + i / 10, "a") for i in range(5)]
+        requests.append((1_700_000_000 + second + 0.5, "b"))
+    return write_trace(tmp_path / name, requests)
+
+
+class TestReplay:
+    def test_parse_config_expands_alternatives(self):
+        configs = parse_config("token_bucket:capacity=10|20,rate=1|0.5")
+        assert configs == [
+            {"algorithm": "token_bucket", "capacity": 10, "rate": 1},
+            {"algorithm": "token_bucket", "capacity": 10, "rate": 0.5},
+            {"algorithm": "token_bucket", "capacity": 20, "rate": 1},
+            {"algorithm": "token_bucket", "capacity": 20, "rate": 0.5},
+        ]
+        weighted = parse_config(
+            "sliding_window_counter:capacity=5,window_size=1,bucket_count=2,"
+            "weighted=true"
+        )
+        assert weighted[0]["weighted"] is True
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_unknown_parameter(self):
+        parse_config("fixed_window:capacity=5,rate=1")
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_unknown_algorithm(self):
+        parse_config("token_buckets:capacity=5")
+
+    def test_read_trace_skips_bad_lines(self, tmp_path):
+        path = tmp_path / "trace.csv.gz"
+        with gzip.open(path, "wt") as f:
+            f.write("ts,ip\n1.5,10.0.0.1\n\n2.5\n3.5,10.0.0.2\r\n")
+        skipped = [0]
+        requests = list(read_trace(str(path), delimiter=",", skipped=skipped))
+        assert requests == [(1.5, "10.0.0.1"), (3.5, "10.0.0.2")]
+        assert skipped == [2], "The header and the line without a key"
+
+    def test_iso_time(self, tmp_path):
+        path = tmp_path / "trace.log"
+        path.write_text("10.0.0.1 2024-01-01T00:00:01+00:00\n")
+        [(timestamp, key)] = read_trace(
+            str(path), time_field=1, key_field=0, iso_time=True
+        )
+        assert (timestamp, key) == (1704067201.0, "10.0.0.1")
+
+    def test_admission_statistics(self, tmp_path):
+        path = burst_trace(tmp_path)
+        # Windows start at a key's first request after the previous window
+        configs = parse_config("fixed_window:capacity=2,window_size=0.9")
+        report = replay(path, configs, burst_gap=0.5)
+        [result] = report["results"]
+        assert result["requests"] == 60
+        assert result["keys"] == 2
+        assert result["denied_keys"] == 1, "Only a exceeds 2 per second"
+        assert result["admitted"] == 10 * 2 + 10, "2 of a and 1 of b per window"
+        assert result["burst_size"]["max"] == 5, "a sends bursts of 5"
+        assert result["admitted_per_burst"]["max"] == 2
+        assert result["most_denied_keys"] == [
+            {"key": "a", "requests": 50, "denied": 30}
+        ]
+
+    def test_every_algorithm_replays(self, tmp_path):
+        path = burst_trace(tmp_path, "trace.log.gz")
+        configs = [
+            {"algorithm": "token_bucket", "capacity": 2, "rate": 2},
+            {"algorithm": "leaky_bucket", "bucket_size": 2, "outflow_rate": 2},
+            {"algorithm": "fixed_window", "capacity": 2, "window_size": 1},
+            {"algorithm": "sliding_window_log", "capacity": 2, "window_size": 1},
+            {
+                "algorithm": "sliding_window_counter",
+                "capacity": 2,
+                "window_size": 1,
+                "bucket_count": 5,
+            },
+            {"algorithm": "gcra", "capacity": 2, "rate": 2},
+        ]
+        assert {config["algorithm"] for config in configs} == set(ALGORITHMS)
+        report = replay(path, configs)
+        for result in report["results"]:
+            assert 0.3 < result["admit_rate"] < 0.7, f"{result['config']}"
+
+    def test_parallel_matches_sequential(self, tmp_path):
+        path = burst_trace(tmp_path)
+        configs = parse_config("token_bucket:capacity=1|2|3,rate=1|2")
+        sequential = replay(path, configs)
+        parallel = replay_parallel(path, configs, workers=2)
+        assert parallel == sequential
+
+    def test_deny_cache_option(self, tmp_path):
+        path = burst_trace(tmp_path)
+        configs = parse_config("token_bucket:capacity=1|2,rate=1")
+        assert not build_limiter(configs[0], None, 10)._denials, "Off by default"
+        plain = replay(path, configs, max_keys=1)
+        cached = replay(path, configs, max_keys=1, deny_cache=True)
+        assert cached == plain
+
+    def test_out_of_order_requests(self, tmp_path):
+        path = write_trace(tmp_path / "trace.log", [(10.0, "a"), (9.5, "a")])
+        report = replay(path, parse_config("fixed_window:capacity=1,window_size=1"))
+        assert report["out_of_order"] == 1
+        assert report["results"][0]["denied"] == 1, "Decided at time 10"
+
+    def test_stats_are_bounded(self):
+        stats = ReplayStats(burst_gap=1.0, max_keys=10, top=3)
+        for i in range(1_000):
+            stats.add(f"key-{i}", float(i), i % 2 == 0)
+        assert len(stats._active) == 10
+        report = stats.report()
+        assert report["keys"] == 1_000
+        assert report["denied_keys"] == 500
+        assert len(report["most_denied_keys"]) == 3
+
+    def test_main_writes_json(self, tmp_path, capsys):
+        path = burst_trace(tmp_path)
+        output = tmp_path / "report.json"
+        main(
+            [
+                path,
+                "--config",
+                "gcra:capacity=2,rate=1|2",
+                "--workers",
+                "1",
+                "--output",
+                str(output),
+            ]
+        )
+        report = json.loads(output.read_text())
+        assert [r["config"]["rate"] for r in report["results"]] == [1, 2]
+        assert "gcra:capacity=2,rate=2" in capsys.readouterr().out
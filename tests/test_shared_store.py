@@ -0,0 +1,92 @@
+import multiprocessing
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.shared_store import (
+    SharedFixedWindow,
+    SharedGCRA,
+    SharedTokenBucket,
+)
+
+
+@pytest.fixture
+def cleanup():
+    limiters = []
+    yield limiters.append
+    for limiter in limiters:
+        limiter.close()
+        limiter.unlink()
+
+
+def _count_admitted(limiter, requests, results):
+    results.put(sum(limiter.allow_request("client") for _ in range(requests)))
+
+
+def _run_workers(context, limiter, workers: int, requests: int) -> list:
+    results = context.Queue()
+    processes = [
+        context.Process(target=_count_admitted, args=(limiter, requests, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    admitted = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    return admitted
+
+
+class TestSharedStore:
+    def test_token_bucket_per_key(self, cleanup):
+        clock = ManualClock(1000.0)
+        limiter = SharedTokenBucket(3, 1, clock=clock, slots=64, stripes=4)
+        cleanup(limiter)
+        assert [limiter.allow_request("a") for _ in range(4)] == [True] * 3 + [False]
+        assert limiter.allow_request("b"), "Keys should be limited independently"
+        clock.advance(1)
+        assert limiter.allow_request("a"), "A token should have been refilled"
+        assert not limiter.allow_request("a")
+        assert limiter.get_key_state("a")["tokens"] == 0
+
+    def test_fixed_window_per_key(self, cleanup):
+        clock = ManualClock(1000.0)
+        limiter = SharedFixedWindow(2, 10, clock=clock, slots=64, stripes=4)
+        cleanup(limiter)
+        assert [limiter.allow_request("a") for _ in range(3)] == [True, True, False]
+        clock.advance(11)
+        assert limiter.allow_request("a"), "A new window should have started"
+        assert limiter.get_key_state("a")["counter"] == 1
+        assert limiter.get_key_state("missing") is None
+
+    def test_full_region_reuses_records(self, cleanup):
+        clock = ManualClock(1000.0)
+        limiter = SharedFixedWindow(1, 10, clock=clock, slots=4, stripes=1)
+        cleanup(limiter)
+        for i in range(4):
+            assert limiter.allow_request(f"client-{i}")
+            clock.advance(1)
+        assert limiter.allow_request("client-4"), "The oldest record is replaced"
+        assert limiter.get_key_state("client-0") is None
+        assert not limiter.allow_request("client-3"), "Recent keys keep their state"
+
+    @pytest.mark.parametrize("start_method", ["fork", "spawn"])
+    @pytest.mark.parametrize(
+        "limiter_type", [SharedTokenBucket, SharedGCRA, SharedFixedWindow]
+    )
+    def test_combined_admission_respects_limit(
+        self, cleanup, start_method, limiter_type
+    ):
+        if start_method not in multiprocessing.get_all_start_methods():
+            pytest.skip(f"{start_method} is not available")
+        context = multiprocessing.get_context(start_method)
+        # A rate or window that does not refill within the test
+        limit = 1_000_000 if limiter_type is SharedFixedWindow else 1e-6
+        limiter = limiter_type(300, limit, context=context)
+        cleanup(limiter)
+        admitted = _run_workers(context, limiter, workers=4, requests=200)
+        assert sum(admitted) == 300, f"Workers admitted {admitted} in total"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_slots_must_divide_into_stripes(self):
+        SharedTokenBucket(1, 1, slots=10, stripes=4)
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import KeyedSlidingWindowCounter
+from src.rate_limiting.sketch_window import SketchSlidingWindow
+
+
+class TestSketchSlidingWindow:
+    def test_limits_keys_independently(self):
+        clock = ManualClock(1000.0)
+        limiter = SketchSlidingWindow(3, 10, 10, clock=clock)
+        assert [limiter.allow_request("a") for _ in range(4)] == [True] * 3 + [False]
+        assert limiter.allow_request("b"), "Keys should be limited independently"
+        assert limiter.estimate("a") == 3
+        clock.advance(10)
+        assert limiter.allow_request("a"), "The first bucket left the window"
+        assert limiter.get_state()["window_requests"] == 1
+
+    def test_buckets_expire_gradually(self):
+        clock = ManualClock(1000.0)
+        limiter = SketchSlidingWindow(4, 4, 4, clock=clock)
+        for _ in range(4):
+            assert limiter.allow_request("a")
+            clock.advance(1)
+        assert limiter.allow_request("a"), "The oldest bucket expired"
+        assert not limiter.allow_request("a")
+
+    def test_never_admits_over_exact_limit(self):
+        clock = ManualClock(1000.0)
+        sketch = SketchSlidingWindow(5, 10, 5, epsilon=0.05, clock=clock)
+        exact = KeyedSlidingWindowCounter(5, 10, 5, clock=clock)
+        rng = random.Random(7)
+        for _ in range(5_000):
+            clock.advance(0.01)
+            key = int(rng.paretovariate(1.0))
+            if sketch.allow_request(key):
+                # The exact counter sees the requests the sketch admitted
+                assert exact.allow_request(key), f"Key {key} admitted beyond its limit"
+
+    def test_over_count_within_bound(self):
+        clock = ManualClock(1000.0)
+        epsilon, delta = 0.01, 0.05
+        limiter = SketchSlidingWindow(
+            10**6, 60, 6, epsilon=epsilon, delta=delta, clock=clock
+        )
+        counts = {}
+        rng = random.Random(3)
+        for _ in range(20_000):
+            key = rng.randrange(5_000)
+            counts[key] = counts.get(key, 0) + 1
+            limiter.allow_request(key)
+        bound = epsilon * sum(counts.values())
+        over = sum(limiter.estimate(key) > n + bound for key, n in counts.items())
+        assert all(limiter.estimate(key) >= n for key, n in counts.items())
+        assert over <= delta * len(counts), f"{over} keys over the error bound"
+
+    def test_heavy_hitters_are_counted_exactly(self):
+        clock = ManualClock(1000.0)
+        limiter = SketchSlidingWindow(
+            5, 2, 2, epsilon=0.9, delta=0.5, heavy_hitters=2, clock=clock
+        )
+        noisy = 0
+        cells = limiter._cells(noisy)
+        quiet = next(k for k in range(1, 1_000) if limiter._cells(k) == cells)
+        for _ in range(5):
+            assert limiter.allow_request(noisy)
+        assert not limiter.allow_request(quiet), "Collides with the noisy key"
+        assert not limiter.allow_request(noisy)
+        assert not limiter.allow_request(noisy)
+        assert limiter.offenders() == [(noisy, 2), (quiet, 1)]
+        clock.advance(2)
+        allowed = [limiter.allow_request(quiet) for _ in range(6)]
+        assert allowed == [True] * 5 + [False], "Tracked keys are counted alone"
+        assert limiter.estimate(noisy) == 0
+
+    def test_memory_is_fixed(self):
+        limiter = SketchSlidingWindow(10, 60, 6, epsilon=0.01)
+        size = limiter.get_state()["sketch_bytes"]
+        for i in range(10_000):
+            limiter.allow_request(f"client-{i}")
+        assert limiter.get_state()["sketch_bytes"] == size
+        assert size == 4 * 272 * 5 * 7
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_invalid_epsilon(self):
+        SketchSlidingWindow(10, 60, 6, epsilon=0)
@@ -1,6 +1,7 @@
 import pytest
 import time
 from unittest.mock import ANY
+from src.rate_limiting.clock import ManualClock
 from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
 
 
@@ -45,3 +46,30 @@ class TestSlidingWindowCounter:
     ):
         sliding_counter = SlidingWindowCounter(capacity, window_size, bucket_count)
         assert sliding_counter.get_rate_limit() == (capacity, window_size)
+
+    def test_bucket_expiry_is_constant_time(self):
+        clock = ManualClock(100.0)
+        sliding_counter = SlidingWindowCounter(3, 10, 10_000, clock=clock)
+        for _ in range(3):
+            assert sliding_counter.allow_request()
+        assert not sliding_counter.allow_request(), "Window should be full"
+        clock.advance(9.999)
+        assert not sliding_counter.allow_request(), "Requests are still in window"
+        clock.advance(0.002)
+        assert sliding_counter.allow_request(), "Oldest bucket should have expired"
+        assert sliding_counter.get_state()["total_requests_in_buckets"] == 1
+
+    def test_weighted_window(self):
+        clock = ManualClock(100.0)
+        sliding_counter = SlidingWindowCounter(4, 2, 1, weighted=True, clock=clock)
+        for _ in range(4):
+            assert sliding_counter.allow_request()
+        clock.advance(2.5)
+        # Previous window counts 4 * 0.75 = 3 requests, leaving room for one.
+        assert sliding_counter.allow_request()
+        assert not sliding_counter.allow_request()
+        clock.advance(1)
+        # Previous window counts 4 * 0.25 = 1 plus 1 request in current window.
+        assert sliding_counter.allow_request()
+        assert sliding_counter.allow_request()
+        assert not sliding_counter.allow_request()
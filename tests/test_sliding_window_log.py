@@ -1,7 +1,11 @@
 import pytest
 import time
 from unittest.mock import ANY
-from src.rate_limiting.sliding_window_log import SlidingWindowLog
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.sliding_window_log import (
+    CompactSlidingWindowLog,
+    SlidingWindowLog,
+)
 
 
 class TestSlidingWindowLog:
@@ -36,3 +40,66 @@ class TestSlidingWindowLog:
     def test_sliding_window_log_rate_limit(self, capacity, window_size):
         sliding_log = SlidingWindowLog(capacity, window_size)
         assert sliding_log.get_rate_limit() == (capacity, window_size)
+
+    def test_request_cost(self):
+        sliding_log = SlidingWindowLog(5, 2)
+        assert sliding_log.allow_request(3)
+        assert not sliding_log.allow_request(3), "Should not exceed capacity"
+        assert sliding_log.allow_request(2)
+        assert sliding_log.get_state()["log_summary"]["requests_count"] == 5
+
+
+class TestCompactSlidingWindowLog:
+    def test_ring_wraps_around(self):
+        clock = ManualClock(100.0)
+        sliding_log = CompactSlidingWindowLog(3, 2, clock=clock)
+        for _ in range(10):
+            for _ in range(3):
+                assert sliding_log.allow_request()
+            assert not sliding_log.allow_request(), "Ring should be full"
+            clock.advance(2.1)
+        assert sliding_log.get_state() == {
+            "capacity": 3,
+            "window_size": 2,
+            "precision": None,
+            "log_summary": {"requests_count": 3, "oldest_request_timestamp": ANY},
+        }
+
+    def test_matches_deque_log(self):
+        clock = ManualClock(100.0)
+        reference = SlidingWindowLog(5, 2, clock=clock)
+        sliding_log = CompactSlidingWindowLog(5, 2, clock=clock)
+        for i in range(200):
+            clock.advance((i * 7919 % 13) / 20)
+            assert sliding_log.allow_request() == reference.allow_request()
+
+    def test_approximate_log_delays_by_at_most_one_sub_bucket(self):
+        clock = ManualClock(100.0)
+        sliding_log = CompactSlidingWindowLog(2, 4, precision=4, clock=clock)
+        assert sliding_log.allow_request()
+        clock.advance(0.5)
+        assert sliding_log.allow_request()
+        assert not sliding_log.allow_request()
+        clock.advance(4)
+        assert not sliding_log.allow_request(), "Sub-bucket is still in window"
+        clock.advance(0.6)
+        assert sliding_log.allow_request()
+        assert sliding_log.allow_request()
+        assert not sliding_log.allow_request()
+
+    def test_approximate_log_never_over_admits(self):
+        clock = ManualClock(100.0)
+        sliding_log = CompactSlidingWindowLog(10, 1, precision=3, clock=clock)
+        admitted = []
+        for i in range(2000):
+            clock.advance((i * 7919 % 17) / 200)
+            if sliding_log.allow_request():
+                admitted.append(clock())
+        for i, t in enumerate(admitted):
+            in_window = [u for u in admitted[i:] if u - t <= 1]
+            assert len(in_window) <= 10
+
+    @pytest.mark.xfail(raises=ValueError)
+    @pytest.mark.parametrize("params", [(-2, 4, None), (5, -2, None), (5, 2, 0)])
+    def test_valid_params(self, params):
+        CompactSlidingWindowLog(*params)
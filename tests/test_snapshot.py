@@ -0,0 +1,151 @@
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import (
+    KeyedFixedWindow,
+    KeyedGCRA,
+    KeyedLeakyBucket,
+    KeyedSlidingWindowCounter,
+    KeyedSlidingWindowLog,
+    KeyedTokenBucket,
+)
+from src.rate_limiting.snapshot import Snapshot
+
+STORES = {
+    "token_bucket": lambda clock, **kw: KeyedTokenBucket(5, 2, clock=clock, **kw),
+    "gcra": lambda clock, **kw: KeyedGCRA(5, 2, clock=clock, **kw),
+    "fixed_window": lambda clock, **kw: KeyedFixedWindow(5, 3, clock=clock, **kw),
+    "sliding_window_log": lambda clock, **kw: KeyedSlidingWindowLog(
+        5, 3, clock=clock, **kw
+    ),
+    "compact_sliding_window_log": lambda clock, **kw: KeyedSlidingWindowLog(
+        5, 3, precision=6, clock=clock, **kw
+    ),
+    "sliding_window_counter": lambda clock, **kw: KeyedSlidingWindowCounter(
+        5, 3, 6, clock=clock, **kw
+    ),
+    "leaky_bucket": lambda clock, **kw: KeyedLeakyBucket(5, 2, clock=clock, **kw),
+}
+KEYS = ["alice", b"bob", 42]
+
+
+def drive(store, clock, steps=30):
+    decisions = []
+    for step in range(steps):
+        for key in KEYS[: 1 + step % 3]:
+            decisions.append(store.allow_request(key))
+        clock.advance(0.25)
+    return decisions
+
+
+class TestSnapshot:
+    @pytest.mark.parametrize("name", STORES)
+    def test_restored_store_decides_like_the_original(self, name, tmp_path):
+        path = tmp_path / "state.snap"
+        clock = ManualClock(1000.0)
+        original = STORES[name](clock)
+        drive(original, clock)
+        assert original.snapshot(path, wall_clock=lambda: 5000.0) == 3
+
+        # A new process, whose clock has another origin, restores 1.5s later
+        restored_clock = ManualClock(7.0)
+        restored = STORES[name](restored_clock)
+        assert restored.restore(path, wall_clock=lambda: 5001.5) == 3
+        clock.advance(1.5)
+        assert drive(restored, restored_clock) == drive(
+            original, clock
+        ), f"Restored {name} should continue where the original left off"
+
+    def test_keys_are_restored_lazily(self, tmp_path):
+        path = tmp_path / "state.snap"
+        clock = ManualClock(1000.0)
+        original = KeyedTokenBucket(3, 1, clock=clock)
+        for key in KEYS:
+            for _ in range(3):
+                original.allow_request(key)
+        original.snapshot(path)
+
+        restored = KeyedTokenBucket(3, 1, clock=ManualClock(1000.0))
+        restored.restore(path)
+        assert len(restored) == 0, "Records should only be built on demand"
+        assert not restored.allow_request("alice"), "Alice used all her tokens"
+        assert len(restored) == 1
+        assert (
+            restored.snapshot(tmp_path / "again.snap") == 3
+        ), "Keys not requested since the restore should be kept"
+        assert not restored.allow_request(42)
+        assert restored.allow_request("carol"), "New keys start with a full bucket"
+
+    def test_thread_safe_store(self, tmp_path):
+        path = tmp_path / "state.snap"
+        clock = ManualClock(1000.0)
+        original = KeyedFixedWindow(2, 10, clock=clock, thread_safe=True, stripes=4)
+        for i in range(100):
+            original.allow_request(f"client-{i}")
+            original.allow_request(f"client-{i}")
+        assert original.snapshot(path) == 100
+        restored = KeyedFixedWindow(2, 10, clock=clock, thread_safe=True, stripes=4)
+        restored.restore(path)
+        assert not any(restored.allow_request(f"client-{i}") for i in range(100))
+
+    def test_columns_are_memory_mapped(self, tmp_path):
+        path = tmp_path / "state.snap"
+        store = KeyedLeakyBucket(5, 1, clock=ManualClock(1000.0))
+        for key in KEYS:
+            store.allow_request(key)
+        store.snapshot(path)
+        snapshot = Snapshot(path)
+        assert list(snapshot.columns["level"]) == [1.0, 1.0, 1.0]
+        assert [snapshot.key(row) for row in range(3)] == KEYS
+        assert snapshot.find("mallory") is None
+        snapshot.close()
+
+    def test_snapshot_over_the_restored_file(self, tmp_path):
+        path = tmp_path / "state.snap"
+        clock = ManualClock(1000.0)
+        original = KeyedTokenBucket(3, 1, clock=clock)
+        for key in KEYS:
+            original.allow_request(key)
+        original.snapshot(path)
+        restored = KeyedTokenBucket(3, 1, clock=clock)
+        restored.restore(path)
+        assert restored.allow_request("alice")
+        assert restored.snapshot(path) == 3, "Mapped file is replaced, not rewritten"
+        assert [p.name for p in tmp_path.iterdir()] == ["state.snap"]
+        assert restored.allow_request(b"bob"), "Old mapping is still readable"
+
+    def test_snapshot_closed_after_last_key(self, tmp_path, monkeypatch):
+        path = tmp_path / "state.snap"
+        original = KeyedTokenBucket(3, 1, clock=ManualClock(1000.0))
+        for key in KEYS:
+            original.allow_request(key)
+        original.snapshot(path)
+        closed = []
+        monkeypatch.setattr(Snapshot, "close", lambda snapshot: closed.append(1))
+        restored = KeyedTokenBucket(3, 1, clock=ManualClock(1000.0))
+        restored.restore(path)
+        for key in KEYS[:-1]:
+            restored.allow_request(key)
+        assert not closed
+        restored.allow_request(KEYS[-1])
+        assert closed == [1], "Mapping should be closed once every key is restored"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_configuration_must_match(self, tmp_path):
+        path = tmp_path / "state.snap"
+        KeyedTokenBucket(5, 1).snapshot(path)
+        KeyedTokenBucket(10, 1).restore(path)
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_store_must_be_empty(self, tmp_path):
+        path = tmp_path / "state.snap"
+        store = KeyedTokenBucket(5, 1)
+        store.snapshot(path)
+        store.allow_request("alice")
+        store.restore(path)
+
+    @pytest.mark.xfail(raises=TypeError)
+    def test_unsupported_key_type(self, tmp_path):
+        store = KeyedTokenBucket(5, 1)
+        store.allow_request(("tuple", "key"))
+        store.snapshot(tmp_path / "state.snap")
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.redis_stand_in import StandInRedisServer
+from src.rate_limiting.redis_storage import RedisError, RedisStorage
+from src.rate_limiting.storage import (
+    MemoryStorage,
+    Script,
+    StoredFixedWindow,
+    StoredGCRA,
+    StoredLeakyBucket,
+    StoredSlidingWindowCounter,
+    StoredSlidingWindowLog,
+    StoredTokenBucket,
+)
+
+LIMITERS = {
+    "token_bucket": lambda storage: StoredTokenBucket(5, 5, storage=storage),
+    "gcra": lambda storage: StoredGCRA(5, 5, storage=storage),
+    "fixed_window": lambda storage: StoredFixedWindow(5, 1, storage=storage),
+    "sliding_window_log": lambda storage: StoredSlidingWindowLog(5, 1, storage=storage),
+    "sliding_window_counter": lambda storage: StoredSlidingWindowCounter(
+        5, 1, 10, storage=storage
+    ),
+    "leaky_bucket": lambda storage: StoredLeakyBucket(5, 5, storage=storage),
+}
+
+
+@pytest.fixture
+def server():
+    with StandInRedisServer(ManualClock(1000.0)) as server:
+        yield server
+
+
+@pytest.fixture
+def redis(server):
+    storage = RedisStorage(*server.address, pipeline_size=4)
+    yield storage
+    storage.close()
+
+
+class TestMemoryStorage:
+    @pytest.mark.parametrize("name", LIMITERS)
+    def test_limits_each_key(self, name):
+        clock = ManualClock(1000.0)
+        limiter = LIMITERS[name](MemoryStorage(clock))
+        results = [limiter.allow_request("a") for _ in range(6)]
+        assert results == [True] * 5 + [False], f"{name} should admit 5 per window"
+        assert limiter.allow_request("b"), "Keys should be limited independently"
+        clock.advance(1.5)
+        assert limiter.allow_request("a"), f"{name} should admit again later"
+
+    def test_cost_is_debited(self):
+        limiter = StoredTokenBucket(5, 1, storage=MemoryStorage(ManualClock(1000.0)))
+        assert limiter.allow_request("a", 4)
+        assert not limiter.allow_request("a", 2), "Only 1 token should be left"
+        assert limiter.allow_request("a", 1)
+
+    @pytest.mark.parametrize("name", LIMITERS)
+    def test_check_cannot_tell_the_wait(self, name):
+        limiter = LIMITERS[name](MemoryStorage(ManualClock(1000.0)))
+        assert limiter.check("a", 5) == (True, 0.0)
+        assert limiter.check("a") == (False, None)
+
+    def test_expired_keys_are_swept(self):
+        clock = ManualClock(1000.0)
+        storage = MemoryStorage(clock)
+        limiter = StoredFixedWindow(5, 1, storage=storage)
+        for i in range(100):
+            limiter.allow_request(f"client-{i}")
+        clock.advance(2)
+        limiter.allow_request("client-0")
+        assert len(storage) == 1, "Records of idle keys should be dropped"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_invalid_limit(self):
+        StoredTokenBucket(0, 1)
+
+
+class TestRedisStorage:
+    @pytest.mark.parametrize("name", LIMITERS)
+    def test_matches_memory_storage(self, name, server, redis):
+        memory_clock = ManualClock(1000.0)
+        memory = LIMITERS[name](MemoryStorage(memory_clock))
+        remote = LIMITERS[name](redis)
+        for step in range(40):
+            key = f"client-{step % 3}"
+            assert remote.allow_request(key) == memory.allow_request(
+                key
+            ), f"{name} should decide the same on Redis at step {step}"
+            server._clock.advance(0.07)
+            memory_clock.advance(0.07)
+
+    def test_limit_is_shared_between_clients(self, server):
+        storages = [RedisStorage(*server.address) for _ in range(2)]
+        gateways = [StoredFixedWindow(4, 1, storage=s) for s in storages]
+        results = [gateways[i % 2].allow_request("client") for i in range(6)]
+        assert results == [True] * 4 + [False] * 2, "Gateways should share a limit"
+        for storage in storages:
+            storage.close()
+
+    def test_batch_is_pipelined(self, server, redis):
+        limiter = StoredTokenBucket(3, 1, storage=redis)
+        limiter.allow_request("warm-up")  # loads the script
+        before = server.commands
+        results = limiter.allow_batch(["a"] * 4 + ["b"] * 2)
+        assert results == [True] * 3 + [False] + [True] * 2
+        assert server.commands - before == 6, "Batch should need no extra commands"
+
+    def test_batch_with_costs(self, redis):
+        limiter = StoredTokenBucket(3, 1, storage=redis)
+        assert limiter.allow_batch(["a", "a", "b"], [2, 2, 3]) == [True, False, True]
+
+    def test_scripts_are_reloaded(self, server, redis):
+        limiter = StoredTokenBucket(3, 1, storage=redis)
+        assert limiter.allow_request("a")
+        server.execute(b"SCRIPT", b"FLUSH")
+        assert limiter.allow_batch(["a", "a", "a"]) == [
+            True,
+            True,
+            False,
+        ], "Requests should be retried exactly once after loading the script"
+
+    def test_concurrent_clients_do_not_over_admit(self, server):
+        storage = RedisStorage(*server.address, pool_size=4)
+        limiter = StoredSlidingWindowLog(50, 1, storage=storage)
+        admitted = []
+
+        def worker():
+            admitted.extend(r for r in limiter.allow_batch(["client"] * 20) if r)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        storage.close()
+        assert len(admitted) == 50, "Exactly the limit should be admitted"
+
+    def test_error_reply_is_raised(self, redis):
+        unknown = Script("unknown", "return 1", lambda state, now: (True, None, 1))
+        with pytest.raises(RedisError):
+            redis.evaluate(unknown, "a", ())
@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.composite import CompositeLimiter
+from src.rate_limiting.fixed_window import FixedWindow
+from src.rate_limiting.keyed_store import KeyedFixedWindow, KeyedTokenBucket
+from src.rate_limiting.sliding_window_counter import SlidingWindowCounter
+from src.rate_limiting.sliding_window_log import SlidingWindowLog
+from src.rate_limiting.synchronized import SynchronizedLimiter
+from src.rate_limiting.token_bucket import TokenBucket
+
+THREADS = 16
+REQUESTS_PER_THREAD = 2_000
+
+
+@pytest.fixture
+def frequent_switching():
+    """Switch threads often to make races between check and update likely."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def hammer(allow, *args) -> int:
+    barrier = threading.Barrier(THREADS)
+
+    def worker():
+        barrier.wait()
+        return sum(allow(*args) for _ in range(REQUESTS_PER_THREAD))
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return sum(pool.map(lambda _: worker(), range(THREADS)))
+
+
+class TestSynchronizedLimiter:
+    @pytest.mark.parametrize(
+        "limiter",
+        [
+            TokenBucket(500, 1),
+            FixedWindow(500, 3600),
+            SlidingWindowLog(500, 3600),
+            SlidingWindowCounter(500, 3600, 10),
+        ],
+    )
+    def test_no_over_admission(self, limiter, frequent_switching):
+        limiter = SynchronizedLimiter(limiter)
+        assert hammer(limiter.allow_request) == 500
+
+    def test_delegates_state(self):
+        limiter = SynchronizedLimiter(FixedWindow(4, 2))
+        assert limiter.allow_request()
+        assert limiter.get_state()["counter"] == 1
+        assert limiter.get_rate_limit() == (4, 2)
+
+    def test_acquire_and_composite(self):
+        clock = ManualClock(1000.0)
+        limiter = SynchronizedLimiter(TokenBucket(1, 1, clock=clock))
+        assert asyncio.run(limiter.acquire())
+        assert limiter._wait_time() == 1
+        composite = CompositeLimiter(
+            {"user": limiter, "global": FixedWindow(1, 60, clock=clock)}
+        )
+        clock.advance(1)
+        assert composite.allow_request()
+        clock.advance(1)
+        assert not composite.allow_request(), "The global limit denies"
+        assert limiter.get_state()["tokens"] == 1, "The user limit is refunded"
+
+
+class TestStripedKeyedStore:
+    def test_no_over_admission(self, frequent_switching):
+        limiter = KeyedTokenBucket(100, 1, thread_safe=True, clock=ManualClock(1000.0))
+        keys = [f"client-{i}" for i in range(8)]
+        barrier = threading.Barrier(THREADS)
+
+        def worker(offset):
+            barrier.wait()
+            admitted = 0
+            for i in range(REQUESTS_PER_THREAD):
+                admitted += limiter.allow_request(keys[(offset + i) % len(keys)])
+            return admitted
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            assert sum(pool.map(worker, range(THREADS))) == 100 * len(keys)
+
+    def test_max_keys_is_split_between_stripes(self):
+        limiter = KeyedFixedWindow(1, 10, max_keys=64, thread_safe=True, stripes=4)
+        for key in range(1_000):
+            limiter.allow_request(key)
+        assert len(limiter) <= 64
+        assert limiter.get_state()["max_keys"] == 64
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_valid_stripes(self):
+        KeyedTokenBucket(5, 2, thread_safe=True, stripes=0)
@@ -1,5 +1,8 @@
 import time
+
+import pytest
 from unittest.mock import ANY
+from src.rate_limiting.clock import ManualClock
 from src.rate_limiting.token_bucket import TokenBucket
 
 
@@ -28,6 +31,27 @@ class TestTokenBucket:
         time.sleep(1.1)  # Wait for tokens to be refilled
         assert bucket.allow_request(), "Token should be refilled after waiting"
 
+    def test_frequent_checks_keep_partial_refills(self):
+        clock = ManualClock(1000.0)
+        bucket = TokenBucket(10, 50, clock=clock)
+        admitted = 0
+        for _ in range(1_000):
+            clock.advance(0.01)
+            admitted += bucket.allow_request()
+            admitted += bucket.allow_request()
+        assert 10 + 499 <= admitted <= 10 + 500, "A burst, then 50 per second"
+
+    def test_wait_time_keeps_partial_refills(self):
+        clock = ManualClock(1000.0)
+        bucket = TokenBucket(1, 2, clock=clock)
+        assert bucket.allow_request()
+        clock.advance(0.25)
+        assert bucket._wait_time() == pytest.approx(0.25)
+        clock.advance(0.125)
+        assert bucket._wait_time() == pytest.approx(0.125), "Progress is kept"
+        clock.advance(0.125)
+        assert bucket.allow_request()
+
     def test_token_state(self):
         """Test that state is correctly returned."""
         bucket = TokenBucket(2, 1)
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.rate_limiting.clock import ManualClock
+from src.rate_limiting.keyed_store import KeyedFixedWindow, KeyedTokenBucket
+from src.rate_limiting.vectorized import FixedWindowArray, TokenBucketArray
+
+
+class TestVectorized:
+    def test_duplicate_keys_are_decided_in_order(self):
+        limiter = TokenBucketArray(4, 2, 1, clock=ManualClock(1000.0))
+        mask = limiter.allow_batch([0, 1, 0, 0, 1, 2])
+        assert mask.tolist() == [True, True, True, False, True, True]
+
+    def test_smaller_cost_admitted_after_denial(self):
+        limiter = TokenBucketArray(2, 5, 1, clock=ManualClock(1000.0))
+        mask = limiter.allow_batch([0, 0, 0, 0], [3, 3, 2, 1])
+        assert mask.tolist() == [True, False, True, False]
+
+    def test_refill(self):
+        clock = ManualClock(1000.0)
+        limiter = TokenBucketArray(2, capacity=2, rate=1, clock=clock)
+        assert limiter.allow_batch([0, 0, 0]).tolist() == [True, True, False]
+        clock.advance(1.5)
+        assert limiter.allow_batch([0, 0]).tolist() == [True, False]
+        clock.advance(0.5)
+        assert limiter.allow_request(0), "Half tokens should carry over"
+
+    def test_fixed_window(self):
+        clock = ManualClock(1000.0)
+        limiter = FixedWindowArray(3, capacity=2, window_size=2, clock=clock)
+        assert limiter.allow_batch([1, 1, 1, 2]).tolist() == [True, True, False, True]
+        clock.advance(2.1)
+        assert limiter.allow_batch([1, 1, 1]).tolist() == [True, True, False]
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_token_bucket_matches_reference(self, seed):
+        rng = random.Random(seed)
+        clock = ManualClock(1000.0)
+        limiter = TokenBucketArray(20, capacity=5, rate=3, clock=clock)
+        reference = KeyedTokenBucket(5, 3, clock=clock)
+        for _ in range(30):
+            clock.advance(rng.random())
+            keys = [rng.randrange(20) for _ in range(rng.randrange(1, 60))]
+            costs = [rng.randint(1, 3) for _ in keys]
+            expected = [reference.allow_request(k, c) for k, c in zip(keys, costs)]
+            assert limiter.allow_batch(keys, costs).tolist() == expected
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_fixed_window_matches_reference(self, seed):
+        rng = random.Random(seed)
+        clock = ManualClock(1000.0)
+        limiter = FixedWindowArray(20, capacity=4, window_size=2, clock=clock)
+        reference = KeyedFixedWindow(4, 2, clock=clock)
+        for key in range(20):
+            reference.allow_request(key)
+            limiter.allow_request(key)
+        for _ in range(30):
+            clock.advance(rng.random())
+            keys = [rng.randrange(20) for _ in range(rng.randrange(1, 60))]
+            expected = [reference.allow_request(k) for k in keys]
+            assert limiter.allow_batch(keys).tolist() == expected
+
+    @pytest.mark.parametrize("keys", [[0, -1], [1, 4]])
+    def test_keys_out_of_range(self, keys):
+        limiter = TokenBucketArray(4, 1, 1, clock=ManualClock(1000.0))
+        with pytest.raises(ValueError):
+            limiter.allow_batch(keys)
+        assert limiter.allow_batch([0, 1, 2, 3]).all(), "No key was debited"
+
+    @pytest.mark.xfail(raises=ValueError)
+    @pytest.mark.parametrize("params", [(0, 2, 1), (4, -2, 1), (4, 2, -1)])
+    def test_valid_params(self, params):
+        TokenBucketArray(*params)